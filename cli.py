@@ -1,13 +1,24 @@
 #!/usr/bin/env python3
-import sqlite3
 import sys
 import os
-import json
-import subprocess
-import tempfile
-from datetime import datetime
-import platform
-import shutil
+import time
+
+# Only modules needed by a plain lookup are imported here. Everything else
+# (json, subprocess, tempfile, datetime, csv, hashlib, gzip, ...) is imported
+# inside the function that uses it, so a launch of the frozen executable does
+# not pay for code paths it never runs. tests/test_startup.py enforces this.
+
+# Column order used everywhere a criteria combination is spelled out
+# (roster files, DB queries, JSON entries).
+CRITERIA_FIELDS = (
+    "Genero",
+    "Assiduidade",
+    "Pontualidade",
+    "Participacao",
+    "Interesse",
+    "Empenho",
+    "Dificuldades",
+)
 
 def get_application_path():
     """Get the absolute path to the application directory."""
@@ -20,8 +31,20 @@ def get_application_path():
     return application_path
 
 
-def find_resource(name):
-    """Find a resource file (like base.db or base.json) in a sensible order:
+# Human-readable names for the rules used by find_resource(), shown by `--where`.
+RESOURCE_RULES = {
+    "env": "variável SINT_BASE_DIR",
+    "cwd": "pasta atual",
+    "app": "pasta da aplicação",
+    "app-dist": "pasta dist/ da aplicação",
+    "parent": "pasta acima da aplicação",
+    "parent-dist": "pasta dist/ acima da aplicação",
+    "fallback": "predefinição (ficheiro não existe)",
+}
+
+def _candidate_dirs():
+    """
+    Directories to search, in priority order, as (rule, directory):
 
     When running as a frozen executable:
     1. Directory specified by `SINT_BASE_DIR` environment variable (if set)
@@ -34,52 +57,139 @@ def find_resource(name):
     3. Application directory (script location) - this will be used as fallback
     4. Parent of application directory
 
-    Returns an absolute path (may not exist). Prefer existing files if found.
+    Application and parent directories are also checked for a 'dist' subfolder.
     """
     app_dir = get_application_path()
-    is_frozen = getattr(sys, 'frozen', False)
-    
-    # 1) env override (always first)
+    parent = os.path.dirname(app_dir)
+    candidates = []
     env_dir = os.getenv('SINT_BASE_DIR')
     if env_dir:
-        p = os.path.join(env_dir, name)
-        if os.path.exists(p):
-            return os.path.abspath(p)
-
-    # 2) For frozen executables, prioritize app dir to work from any CWD
-    if is_frozen:
-        p = os.path.join(app_dir, name)
-        if os.path.exists(p):
-            return os.path.abspath(p)
+        candidates.append(("env", env_dir))
+    if not getattr(sys, 'frozen', False):
+        candidates.append(("cwd", os.getcwd()))
+    candidates += [
+        ("app", app_dir),
+        ("app-dist", os.path.join(app_dir, 'dist')),
+        ("parent", parent),
+        ("parent-dist", os.path.join(parent, 'dist')),
+    ]
+    return candidates
+
+def probe_resources(names):
+    """
+    Resolve several resource names in one pass over the candidate directories,
+    listing each directory at most once. Returns {name: (abs_path, rule)}.
+    """
+    found = {}
+    listed = set()
+    for rule, folder in _candidate_dirs():
+        folder = os.path.abspath(folder)
+        if folder in listed:
+            continue
+        listed.add(folder)
+        try:
+            entries = set(os.listdir(folder))
+        except OSError:
+            continue
+        for name in names:
+            if name not in found and name in entries:
+                found[name] = (os.path.abspath(os.path.join(folder, name)), rule)
+        if len(found) == len(names):
+            break
+    for name in names:
+        if name not in found:
+            # Fallback: return application dir path (even if it doesn't exist)
+            found[name] = (os.path.abspath(os.path.join(get_application_path(), name)), "fallback")
+    return found
+
+# Resolved locations are cached per user so the next start costs one stat per
+# file. Set SINT_NO_CACHE=1 to bypass the cache, SINT_CACHE_DIR to move it.
+RESOURCE_NAMES = ("base.db", "base.json")
+_RESOLVED = {}
+
+def get_cache_dir():
+    cache_dir = os.getenv("SINT_CACHE_DIR")
+    if cache_dir:
+        return cache_dir
+    if os.name == "nt":
+        base = os.getenv("LOCALAPPDATA") or os.path.expanduser("~")
     else:
-        # For scripts, check CWD only if it actually has the file
-        p = os.path.join(os.getcwd(), name)
-        if os.path.exists(p):
-            return os.path.abspath(p)
-
-    # 3) application directory (script location) - fallback for both cases
-    p = os.path.join(app_dir, name)
-    if os.path.exists(p):
-        return os.path.abspath(p)
-
-    # 3b) check common 'dist' subdirectory (useful for distributions)
-    p = os.path.join(app_dir, 'dist', name)
-    if os.path.exists(p):
-        return os.path.abspath(p)
-
-    # 4) parent of application directory
-    parent = os.path.dirname(app_dir)
-    p = os.path.join(parent, name)
-    if os.path.exists(p):
-        return os.path.abspath(p)
+        base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "sintese")
+
+def _resource_cache_path():
+    return os.path.join(get_cache_dir(), "resources.cache")
 
-    # Parent 'dist' as well
-    p = os.path.join(parent, 'dist', name)
-    if os.path.exists(p):
-        return os.path.abspath(p)
+def _resource_cache_key():
+    """Everything the search order depends on; a different context gets its own entries."""
+    frozen = getattr(sys, 'frozen', False)
+    return "|".join((
+        "frozen" if frozen else "script",
+        os.getenv('SINT_BASE_DIR') or "",
+        get_application_path(),
+        "" if frozen else os.getcwd(),
+    ))
 
-    # Fallback: return application dir path (even if it doesn't exist)
-    return os.path.abspath(os.path.join(app_dir, name))
+def _read_resource_cache():
+    """Cache lines are 'key<TAB>name<TAB>rule<TAB>path'. Returns {(key, name): (path, rule)}."""
+    entries = {}
+    try:
+        with open(_resource_cache_path(), "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) == 4:
+                    entries[(parts[0], parts[1])] = (parts[3], parts[2])
+    except OSError:
+        pass
+    return entries
+
+def _write_resource_cache(entries):
+    try:
+        os.makedirs(get_cache_dir(), exist_ok=True)
+        with open(_resource_cache_path(), "w", encoding="utf-8") as f:
+            for (key, name), (path, rule) in entries.items():
+                f.write(f"{key}\t{name}\t{rule}\t{path}\n")
+    except OSError:
+        pass  # the cache is only an optimisation
+
+def resolve_resource(name, refresh=False):
+    """
+    Return (abs_path, rule, source) for a resource, where source is 'memory',
+    'cache' or 'probe'. A cached location is trusted after a single stat.
+    """
+    key = _resource_cache_key()
+    if not refresh and (key, name) in _RESOLVED:
+        path, rule = _RESOLVED[(key, name)]
+        return path, rule, "memory"
+
+    use_cache = not os.getenv("SINT_NO_CACHE")
+    entries = _read_resource_cache() if use_cache else {}
+    if not refresh and (key, name) in entries:
+        path, rule = entries[(key, name)]
+        if os.path.exists(path):
+            _RESOLVED[(key, name)] = (path, rule)
+            return path, rule, "cache"
+
+    names = tuple(dict.fromkeys((name,) + RESOURCE_NAMES))
+    probed = probe_resources(names)
+    for n, (path, rule) in probed.items():
+        _RESOLVED[(key, n)] = (path, rule)
+        if use_cache:
+            if rule == "fallback":
+                entries.pop((key, n), None)
+            else:
+                entries[(key, n)] = (path, rule)
+    if use_cache:
+        _write_resource_cache(entries)
+    path, rule = probed[name]
+    return path, rule, "probe"
+
+def find_resource(name):
+    """Find a resource file (like base.db or base.json); see _candidate_dirs() for the order.
+
+    Returns an absolute path (may not exist). Prefer existing files if found.
+    """
+    return resolve_resource(name)[0]
 
 def get_database_path():
     """
@@ -117,302 +227,3620 @@ def ask_yesno(prompt):
             return 0
         print("Resposta inválida — escreva s ou n.")
 
-def copy_to_clipboard(text):
+# Single-keypress input: in a terminal each answer is one key, echoed at once.
+KEY_BACK = ("b", "\x7f", "\b", "\x1b[D")   # b, backspace, left arrow
+KEY_QUIT = ("q", "\x1b", "\x04")           # q, Esc, Ctrl-D
+KEY_REPEAT = ("r",)
+KEY_CONTINUE = ("\r", "\n", " ")
+
+class QuitRequested(Exception):
+    """The user pressed the quit hotkey."""
+
+def raw_input_available():
+    """True when stdin is a terminal that supports single-key reads (and SINT_NO_RAW is unset)."""
+    if os.getenv("SINT_NO_RAW"):
+        return False
     try:
-        import pyperclip
-        pyperclip.copy(text)
+        if not sys.stdin.isatty():
+            return False
+    except (AttributeError, ValueError):
+        return False
+    try:
+        import msvcrt  # noqa: F401
         return True
-    except Exception:
+    except ImportError:
         pass
-    # Fallback to tkinter (standard on most Python Windows installs)
     try:
+        import termios  # noqa: F401
+        import tty  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def read_key():
+    """Read one keypress without waiting for Enter (escape sequences come back whole)."""
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+    if msvcrt is not None:
+        ch = msvcrt.getwch()
+        if ch in ("\x00", "\xe0"):  # arrows / function keys arrive as two codes
+            return "\x1b[D" if msvcrt.getwch() == "K" else ""
+        return ch
+
+    import termios
+    import tty
+    fd = sys.stdin.fileno()
+    old = termios.tcgetattr(fd)
+    try:
+        tty.setcbreak(fd)  # keeps Ctrl-C working, unlike full raw mode
+        return os.read(fd, 8).decode("utf-8", "ignore")
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, old)
+
+def interpret_key(key, index):
+    """Map a key pressed at question `index` to (action, value)."""
+    k = key.lower() if len(key) == 1 else key
+    if k in KEY_QUIT:
+        return "quit", None
+    if k in KEY_BACK:
+        return "back", None
+    if k in KEY_REPEAT:
+        return "repeat", None
+    if index == 0:
+        if k in ("m", "f"):
+            return "answer", k.upper()
+    elif k in ("s", "y", "1"):
+        return "answer", 1
+    elif k in ("n", "0"):
+        return "answer", 0
+    return None, None
+
+def ask_key(prompt, choices):
+    """Single-key prompt; choices maps keys to (value, echo). Quit keys raise QuitRequested."""
+    while True:
+        sys.stdout.write(prompt)
+        sys.stdout.flush()
+        key = read_key()
+        k = key.lower() if len(key) == 1 else key
+        if k in choices:
+            value, echo = choices[k]
+            print(echo)
+            return value
+        if k in KEY_QUIT:
+            print("sair")
+            raise QuitRequested()
+        print("?")
+
+class PyperclipClipboard:
+    name = "pyperclip"
+
+    def __init__(self):
+        import pyperclip
+        self._copy = pyperclip.copy
+
+    def copy(self, text):
+        self._copy(text)
+
+class CommandClipboard:
+    """Pipe the text into a clipboard tool (wl-copy, xclip, xsel, pbcopy)."""
+
+    def __init__(self, argv):
+        self.argv = argv
+        self.name = argv[0]
+
+    def copy(self, text):
+        import subprocess
+        subprocess.run(self.argv, input=text.encode("utf-8"), check=True, timeout=5,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+class TkClipboard:
+    """One hidden Tk root kept for the whole process instead of one per copy."""
+    name = "tkinter"
+
+    def __init__(self):
         import tkinter as tk
-        root = tk.Tk()
-        root.withdraw()
-        root.clipboard_clear()
-        root.clipboard_append(text)
-        root.update()
-        root.destroy()
+        self.root = tk.Tk()
+        self.root.withdraw()
+
+    def copy(self, text):
+        self.root.clipboard_clear()
+        self.root.clipboard_append(text)
+        self.root.update()
+
+def _clipboard_candidates():
+    """Backend factories in preference order; each may raise if unavailable."""
+    import shutil
+
+    yield PyperclipClipboard
+    commands = []
+    if os.getenv("WAYLAND_DISPLAY"):
+        commands.append(["wl-copy"])
+    commands += [["xclip", "-selection", "clipboard"], ["xsel", "--clipboard", "--input"], ["pbcopy"]]
+    for argv in commands:
+        if shutil.which(argv[0]):
+            yield lambda argv=argv: CommandClipboard(argv)
+    # Fallback to tkinter (standard on most Python Windows installs)
+    yield TkClipboard
+
+# The working backend is detected on the first copy and reused afterwards.
+_CLIPBOARD = None
+
+def set_clipboard_backend(backend):
+    """Force a backend (any object with copy(text)); None re-enables detection."""
+    global _CLIPBOARD
+    _CLIPBOARD = backend
+
+def get_clipboard_backend():
+    return _CLIPBOARD
+
+def copy_to_clipboard(text):
+    global _CLIPBOARD
+    if _CLIPBOARD is not None:
+        try:
+            _CLIPBOARD.copy(text)
+            return True
+        except Exception:
+            _CLIPBOARD = None  # stopped working; look for another one below
+
+    for factory in _clipboard_candidates():
+        try:
+            backend = factory()
+            backend.copy(text)
+        except Exception:
+            continue
+        _CLIPBOARD = backend
         return True
-    except Exception:
+    return False
+
+class ClipboardQueue:
+    """Collect several texts and put them on the clipboard together for one paste."""
+
+    def __init__(self, separator="\n\n"):
+        self.separator = separator
+        self.texts = []
+
+    def __len__(self):
+        return len(self.texts)
+
+    def add(self, text):
+        self.texts.append(text)
+
+    def replace_last(self, text):
+        if self.texts:
+            self.texts[-1] = text
+        else:
+            self.texts.append(text)
+
+    def flush(self):
+        """Copy all queued texts at once; the queue is emptied only if the copy worked."""
+        if not self.texts:
+            return True
+        if copy_to_clipboard(self.separator.join(self.texts)):
+            self.texts = []
+            return True
         return False
 
 def build_and_run_query(db_path, genero, assid, punt, part, inter, empen, diff):
-    where = []
-    params = []
-    if genero:
-        where.append("Genero = ?")
-        params.append(genero)
-    where.append("Assiduidade = ?")
-    params.append(assid)
-    where.append("Pontualidade = ?")
-    params.append(punt)
-    where.append("Participacao = ?")
-    params.append(part)
-    where.append("Interesse = ?")
-    params.append(inter)
-    where.append("Empenho = ?")
-    params.append(empen)
-    where.append("Dificuldades = ?")
-    params.append(diff)
-
-    where_sql = " AND ".join(where) if where else "1"
-    sql = f"SELECT Texto FROM sinteses WHERE {where_sql} LIMIT 1;"
-
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-    cur.execute(sql, params)
-    row = cur.fetchone()
-    conn.close()
+    """
+    Cold lookup straight from base.db, with the same answer as TextTable: the
+    lowest variant of the combination, from its sinteses row or else rendered
+    from the gender template.
+    """
+    import sqlite3
+
+    criteria = (genero, assid, punt, part, inter, empen, diff)
+    conn = connect_db(db_path)
+    try:
+        try:
+            row = conn.execute(SELECT_TEXT_SQL, criteria).fetchone()
+        except sqlite3.OperationalError as e:
+            if "no such column" not in str(e):
+                raise
+            # Not yet migrated (no Variante column, no templates): one text per combination
+            row = conn.execute(f"SELECT Texto, 0 FROM sinteses WHERE {CRITERIA_WHERE_SQL} LIMIT 1",
+                               criteria).fetchone()
+            return row[0] if row else None
+        if row is not None and row[1] == 0:
+            return row[0]
+        try:
+            below = row[1] if row else sys.maxsize
+            template = conn.execute(SELECT_TEMPLATE_SQL, criteria[1:] + (below,)).fetchone()
+        except sqlite3.OperationalError as e:
+            if "no such table" not in str(e):
+                raise
+            template = None
+    finally:
+        conn.close()
+    if template is not None:
+        return render_template(template[0], genero)
     return row[0] if row else None
 
-def backup_json():
-    """Create a timestamped backup of base.json."""
-    json_path = get_json_path()
-    if not os.path.exists(json_path):
-        print(f"✗ base.json não encontrado em: {json_path}")
-        return False
+CRITERIA_WHERE_SQL = (
+    "Genero = ? AND Assiduidade = ? AND Pontualidade = ? AND "
+    "Participacao = ? AND Interesse = ? AND Empenho = ? AND Dificuldades = ?"
+)
+# Each combination can hold several variants; Variante 0 is the original text.
+SELECT_TEXT_SQL = f"SELECT Texto, Variante FROM sinteses WHERE {CRITERIA_WHERE_SQL} ORDER BY Variante LIMIT 1"
+SELECT_VARIANT_SQL = f"SELECT Texto FROM sinteses WHERE {CRITERIA_WHERE_SQL} AND Variante = ?"
+SELECT_ROW_SQL = f"SELECT id, Texto FROM sinteses WHERE {CRITERIA_WHERE_SQL} AND Variante = ?"
+UPDATE_TEXT_SQL = f"UPDATE sinteses SET Texto = ? WHERE {CRITERIA_WHERE_SQL} AND Variante = ?"
+UPSERT_TEXT_SQL = (
+    "INSERT INTO sinteses (Texto, Genero, Assiduidade, Pontualidade, Participacao, "
+    "Interesse, Empenho, Dificuldades) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (Genero, Assiduidade, Pontualidade, Participacao, Interesse, Empenho, Dificuldades, Variante) "
+    "DO UPDATE SET Texto = excluded.Texto"
+)
+UPSERT_VARIANT_SQL = (
+    "INSERT INTO sinteses (Texto, Genero, Assiduidade, Pontualidade, Participacao, "
+    "Interesse, Empenho, Dificuldades, Variante) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (Genero, Assiduidade, Pontualidade, Participacao, Interesse, Empenho, Dificuldades, Variante) "
+    "DO UPDATE SET Texto = excluded.Texto"
+)
+
+def update_params(criteria, new_text):
+    """UPDATE_TEXT_SQL parameters for a criteria dict (Variante defaults to 0)."""
+    return [new_text] + [criteria[field] for field in CRITERIA_FIELDS] + [criteria.get("Variante", 0)]
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_path = f"{json_path}.backup.{timestamp}"
+# base.db may be shared by several teachers: WAL lets readers work while one
+# writer commits, and the busy timeout makes writers queue instead of failing
+# with "database is locked". WAL needs shared memory, so a DB on a network
+# share that does not support it should use SINT_JOURNAL_MODE=delete.
+# The mode is stored in the file, so it is set by the schema check that every
+# writer runs (migrate_db/ensure_schema), never by a plain lookup.
+BUSY_TIMEOUT_MS = 5000
+JOURNAL_MODES = ("wal", "delete", "truncate", "persist")
 
+def connect_db(db_path):
+    """Open base.db with the configured busy timeout (SINT_BUSY_TIMEOUT, ms)."""
+    import sqlite3
+
+    return sqlite3.connect(db_path, timeout=_env_int("SINT_BUSY_TIMEOUT", BUSY_TIMEOUT_MS) / 1000)
+
+def set_journal_mode(conn):
+    """Switch the database to SINT_JOURNAL_MODE (default WAL) if it is not in it already."""
+    import sqlite3
+
+    mode = os.environ.get("SINT_JOURNAL_MODE", "wal").strip().lower()
+    if mode not in JOURNAL_MODES:
+        return
     try:
-        # Use shutil.copy2 to preserve metadata and handle binary-safe copying
-        shutil.copy2(json_path, backup_path)
-        print(f"✓ Backup criado: {os.path.basename(backup_path)}")
-        return True
-    except Exception as e:
-        # Provide a clearer message for troubleshooting
-        print(f"✗ Erro ao criar backup: {e}")
-        return False
+        if conn.execute("PRAGMA journal_mode").fetchone()[0] != mode:
+            conn.execute(f"PRAGMA journal_mode = {mode}")
+    except sqlite3.Error:
+        pass  # read-only or locked: keep the current mode
 
+# Schema versions are tracked with PRAGMA user_version; see MIGRATIONS below.
+SCHEMA_VERSION = 9
 
-def backup_db():
-    """Create a timestamped backup of base.db."""
-    # Backups for base.db have been disabled per user request — keep function
-    # for compatibility. We still verify the DB exists before proceeding.
-    db_path = get_database_path()
-    if not os.path.exists(db_path):
-        print(f"✗ base.db não encontrado em: {db_path}")
-        return False
+SINTESES_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS sinteses (
+    id INTEGER PRIMARY KEY,
+    Texto TEXT,
+    Genero TEXT,
+    Assiduidade INTEGER,
+    Pontualidade INTEGER,
+    Participacao INTEGER,
+    Interesse INTEGER,
+    Empenho INTEGER,
+    Dificuldades INTEGER
+)
+"""
 
-    # No backup created; return True to allow operations to continue.
-    print("⚠ Backup automático de base.db desativado; avançando sem backup.")
-    return True
+CRITERIA_INDEX_SQL = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_sinteses_criteria ON sinteses "
+    "(Genero, Assiduidade, Pontualidade, Participacao, Interesse, Empenho, Dificuldades)"
+)
+
+VARIANT_INDEX_SQL = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_sinteses_criteria ON sinteses "
+    "(Genero, Assiduidade, Pontualidade, Participacao, Interesse, Empenho, Dificuldades, Variante)"
+)
+
+def _migrate_v1(conn):
+    """Drop duplicate rows (keeping the first one per combination) and add the unique index."""
+    removed = conn.execute(
+        "DELETE FROM sinteses WHERE id NOT IN ("
+        "SELECT MIN(id) FROM sinteses GROUP BY " + ", ".join(CRITERIA_FIELDS) + ")"
+    ).rowcount
+    conn.execute(CRITERIA_INDEX_SQL)
+    return removed
+
+def _migrate_v2(conn):
+    """Key/value table remembering what was last synced from base.json."""
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+    )
+
+def _migrate_v3(conn):
+    """Text variants: a Variante column (0 for existing rows) and the unique index extended with it."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(sinteses)")}
+    if "Variante" not in columns:
+        conn.execute("ALTER TABLE sinteses ADD COLUMN Variante INTEGER NOT NULL DEFAULT 0")
+    conn.execute("DROP INDEX IF EXISTS idx_sinteses_criteria")
+    conn.execute(VARIANT_INDEX_SQL)
+
+TEMPLATE_FIELDS = CRITERIA_FIELDS[1:]
+TEMPLATE_FLAGS_WHERE_SQL = " AND ".join(f"{f} = ?" for f in TEMPLATE_FIELDS)
+TEMPLATE_WHERE_SQL = TEMPLATE_FLAGS_WHERE_SQL + " AND Variante = ?"
+# Lowest-variant gender template below a given variant, for build_and_run_query()
+SELECT_TEMPLATE_SQL = (
+    f"SELECT Template FROM templates WHERE {TEMPLATE_FLAGS_WHERE_SQL} AND Variante < ? ORDER BY Variante LIMIT 1"
+)
+
+def _migrate_v4(conn):
+    """Gender templates: one text per flag combination and variant, rendered for M and F (see fold_db)."""
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS templates (id INTEGER PRIMARY KEY, Template TEXT NOT NULL, "
+        + ", ".join(f"{f} INTEGER" for f in TEMPLATE_FIELDS)
+        + ", Variante INTEGER NOT NULL DEFAULT 0)"
+    )
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_templates_flags ON templates ("
+        + ", ".join(TEMPLATE_FIELDS) + ", Variante)"
+    )
+
+# The tables holding texts and their text column
+TEXT_COLUMNS = (("sinteses", "Texto"), ("templates", "Template"))
+
+# Full-text shadow index over sinteses.Texto, kept in step by triggers
+# (external-content FTS5 tables store only the index). Templates are searched
+# through their renderings instead (see search_texts).
+FTS_TABLES = (("sinteses_fts", "sinteses", "Texto"),)
+
+def _fts_sql(fts, table, column, tokenizer):
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({column}, content='{table}', "
+        f"content_rowid='id', tokenize='{tokenizer}')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {column} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+def _migrate_v5(conn):
+    """FTS5 indexes for `sintese search`; skipped when this SQLite has no FTS5 (search then scans)."""
+    import sqlite3
+
+    for fts, table, column in FTS_TABLES:
+        for tokenizer in ("unicode61 remove_diacritics 2", "unicode61"):
+            try:
+                for sql in _fts_sql(fts, table, column, tokenizer):
+                    conn.execute(sql)
+                break
+            except sqlite3.OperationalError as e:
+                if "no such module" in str(e):
+                    return
+                conn.execute(f"DROP TABLE IF EXISTS {fts}")
+
+def _migrate_v6(conn):
+    """Row versions for optimistic updates: a trigger bumps Versao whenever the text changes."""
+    for table, column in TEXT_COLUMNS:
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if "Versao" not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN Versao INTEGER NOT NULL DEFAULT 0")
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_versao AFTER UPDATE OF {column} ON {table} "
+            f"WHEN new.Versao = old.Versao BEGIN "
+            f"UPDATE {table} SET Versao = old.Versao + 1 WHERE id = new.id; END"
+        )
+
+def _migrate_v7(conn):
+    """Edit history: one row per text change (old and new text, when, who) for `history` and `undo`."""
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS sinteses_history (id INTEGER PRIMARY KEY, "
+        "Tabela TEXT NOT NULL, Linha INTEGER NOT NULL, Codigo TEXT NOT NULL, "
+        "Variante INTEGER NOT NULL DEFAULT 0, TextoAntigo TEXT, TextoNovo TEXT, "
+        "Quando TEXT NOT NULL, Utilizador TEXT)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_history_codigo ON sinteses_history (Codigo, Variante)")
+
+def _migrate_v8(conn):
+    """Digest of each base.json text as last synced, so sync can tell which side changed a text."""
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS sync_base (Codigo TEXT NOT NULL, Variante INTEGER NOT NULL, "
+        "Digest BLOB NOT NULL, PRIMARY KEY (Codigo, Variante))"
+    )
 
-def open_text_in_editor(text):
+def _migrate_v9(conn):
+    """Drop templates_fts: it indexed template markup, where inflected words cannot be found."""
+    for trigger in ("ai", "ad", "au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS templates_fts_{trigger}")
+    conn.execute("DROP TABLE IF EXISTS templates_fts")
+
+# (target version, step) pairs applied in order by migrate_db()
+MIGRATIONS = [
+    (1, _migrate_v1),
+    (2, _migrate_v2),
+    (3, _migrate_v3),
+    (4, _migrate_v4),
+    (5, _migrate_v5),
+    (6, _migrate_v6),
+    (7, _migrate_v7),
+    (8, _migrate_v8),
+    (9, _migrate_v9),
+]
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def has_sinteses_table(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sinteses'"
+    ).fetchone() is not None
+
+def migrate_db(conn):
     """
-    Open text in an editor (VSCode -> notepad -> nano) and return the edited text.
-    Returns None if user cancels or validation fails.
+    Set the journal mode, create the sinteses table if needed and apply pending
+    MIGRATIONS in one transaction. Returns {"from": old_version, "to": new_version,
+    "removed": duplicates_dropped}.
     """
-    # Create temporary file
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False, encoding='utf-8') as tmp:
-        tmp.write(text)
-        tmp_path = tmp.name
-    
+    set_journal_mode(conn)
+    version = get_schema_version(conn)
+    result = {"from": version, "to": version, "removed": 0}
+    if version >= SCHEMA_VERSION and has_sinteses_table(conn):
+        return result
+
+    isolation = conn.isolation_level
+    conn.isolation_level = None
     try:
-        # Try VSCode first
+        conn.execute("BEGIN IMMEDIATE")
         try:
-            result = subprocess.run(['code', '--wait', tmp_path], capture_output=True, timeout=300)
-            if result.returncode == 0:
-                with open(tmp_path, 'r', encoding='utf-8') as f:
-                    return f.read()
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            pass
-        
-        # Fallback to notepad on Windows
-        if platform.system() == 'Windows':
-            try:
-                subprocess.run(['notepad', tmp_path], check=False)
-                with open(tmp_path, 'r', encoding='utf-8') as f:
-                    return f.read()
-            except FileNotFoundError:
-                pass
-        
-        # Fallback to nano on Linux/Mac
-        if platform.system() in ('Linux', 'Darwin'):
-            try:
-                subprocess.run(['nano', tmp_path], check=False)
-                with open(tmp_path, 'r', encoding='utf-8') as f:
-                    return f.read()
-            except FileNotFoundError:
-                pass
-        
-        print("✗ Nenhum editor disponível (VSCode, notepad ou nano)")
-        return None
-    
+            conn.execute(SINTESES_TABLE_SQL)
+            for target, step in MIGRATIONS:
+                if version < target:
+                    result["removed"] += step(conn) or 0
+                    conn.execute(f"PRAGMA user_version = {target}")
+                    version = target
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
     finally:
-        # Clean up temporary file
+        conn.isolation_level = isolation
+    result["to"] = version
+    return result
+
+def ensure_schema(conn):
+    """
+    Migrate an existing sinteses table in place (and set the journal mode);
+    never creates one and never fails the caller. For connections that write.
+    """
+    import sqlite3
+
+    try:
+        if not has_sinteses_table(conn):
+            return
+        set_journal_mode(conn)
+        if get_schema_version(conn) < SCHEMA_VERSION:
+            result = migrate_db(conn)
+            if result["removed"]:
+                print(f"⚠ Base de dados migrada: {result['removed']} entradas duplicadas removidas.")
+    except sqlite3.Error as e:
+        print(f"⚠ Não foi possível atualizar o esquema da base de dados: {e}")
+
+GENDER_BITS = {"M": 0, "F": 1}
+TABLE_SIZE = 2 * 2 ** 6  # gender x six binary flags
+
+def pack_criteria(genero, assid, punt, part, inter, empen, diff):
+    """
+    Pack a criteria combination into a 7-bit code: the gender is the high bit
+    (M=0, F=1) followed by the six flags in build_and_run_query() order.
+    """
+    return (GENDER_BITS[genero] << 6 | (1 if assid else 0) << 5 | (1 if punt else 0) << 4
+            | (1 if part else 0) << 3 | (1 if inter else 0) << 2 | (1 if empen else 0) << 1
+            | (1 if diff else 0))
+
+def unpack_criteria(code):
+    """Inverse of pack_criteria(): returns (genero, assid, punt, part, inter, empen, diff)."""
+    genero = "F" if code >> 6 & 1 else "M"
+    return (genero,) + tuple(code >> shift & 1 for shift in range(5, -1, -1))
+
+class VariantRotation:
+    """
+    Hands out text variants so that, within one class or session, no variant
+    of a combination repeats before all of them were used. Each code keeps an
+    int bitmap of the variants already given; the next one is the lowest clear
+    bit (free & -free), so a pick is a few integer operations whatever the count.
+    """
+
+    def __init__(self):
+        self.used = {}
+
+    def pick(self, code, count):
+        """Index (0..count-1) of the next variant for code."""
+        if count <= 1:
+            return 0
+        full = (1 << count) - 1
+        used = self.used.get(code, 0) & full
+        if used == full:
+            used = 0  # every variant was used once: start a new round
+        free = ~used & full
+        bit = free & -free
+        self.used[code] = used | bit
+        return bit.bit_length() - 1
+
+    def reset(self):
+        self.used.clear()
+
+class TextTable:
+    """
+    All sínteses loaded once into a TABLE_SIZE-slot list indexed by packed
+    criteria code. slots holds the original text (lowest Variante); codes with
+    more than one variant also have ((variante, texto), ...) in variants.
+    """
+
+    def __init__(self, slots, variants=None):
+        self.slots = slots
+        self.variants = variants or {}
+
+    @classmethod
+    def load(cls, db_path):
+        conn = connect_db(db_path)
         try:
-            os.unlink(tmp_path)
-        except:
-            pass
+            return cls.from_connection(conn)
+        finally:
+            conn.close()
 
-def validate_text(text):
-    """Validate edited text. Returns (valid, message)."""
-    text = text.strip()
-    if not text:
-        return False, "✗ Texto não pode estar vazio."
-    if len(text) < 10:
-        return False, "✗ Texto demasiado curto. Mínimo 10 caracteres."
-    return True, "✓ Texto validado com sucesso."
+    @classmethod
+    def from_connection(cls, conn):
+        import sqlite3
 
-def ask_edit_confirmation():
-    """Ask if user wants to edit the text."""
-    return bool(ask_yesno("Deseja editar este texto?"))
+        slots = [None] * TABLE_SIZE
+        columns = ", ".join(CRITERIA_FIELDS)
+        try:
+            rows = conn.execute(
+                f"SELECT Texto, Variante, {columns} FROM sinteses ORDER BY Variante, id"
+            ).fetchall()
+        except sqlite3.OperationalError:
+            # Not yet migrated (no Variante column): one text per combination
+            rows = conn.execute(f"SELECT Texto, 0, {columns} FROM sinteses ORDER BY id").fetchall()
 
-def ask_satisfaction():
-    """Ask if user is satisfied with the edited text."""
-    return bool(ask_yesno("Satisfeito com a edição?"))
+        found = {}
+        # Folded templates are rendered for both genders; a sinteses row for
+        # the same combination and variant overrides the rendering.
+        for template, variante, *flags in read_templates(conn):
+            for genero in GENDER_BITS:
+                found.setdefault(pack_criteria(genero, *flags), {})[variante] = render_template(template, genero)
+        seen = set()
+        for texto, variante, genero, *flags in rows:
+            if genero not in GENDER_BITS:
+                continue
+            code = pack_criteria(genero, *flags)
+            # Keep the first row per combination, like build_and_run_query()'s LIMIT 1
+            if (code, variante) in seen:
+                continue
+            seen.add((code, variante))
+            found.setdefault(code, {})[variante] = texto
+
+        variants = {}
+        for code, texts in found.items():
+            ordered = tuple(sorted(texts.items()))
+            slots[code] = ordered[0][1]
+            if len(ordered) > 1:
+                variants[code] = ordered
+        return cls(slots, variants)
+
+    def get(self, code):
+        return self.slots[code]
+
+    def lookup(self, genero, assid, punt, part, inter, empen, diff):
+        return self.slots[pack_criteria(genero, assid, punt, part, inter, empen, diff)]
+
+    def pick(self, code, rotation):
+        """(variante, texto) for code, rotating through its variants when there are several."""
+        texts = self.variants.get(code)
+        if texts is None:
+            return 0, self.slots[code]
+        return texts[rotation.pick(code, len(texts))]
+
+    def remember(self, code, variante, texto):
+        """Keep the table in step with an update of one variant."""
+        texts = self.variants.get(code)
+        if texts is not None:
+            self.variants[code] = tuple((v, texto if v == variante else t) for v, t in texts)
+            if variante == texts[0][0]:
+                self.slots[code] = texto
+        elif variante == 0:
+            self.slots[code] = texto
+
+    def _code_range(self, answers):
+        prefix = 0
+        for i, value in enumerate(answers):
+            prefix = prefix << 1 | (GENDER_BITS[value] if i == 0 else (1 if value else 0))
+        width = len(CRITERIA_FIELDS) - len(answers)
+        return prefix << width, (prefix + 1) << width
+
+    def candidates(self, answers):
+        """Slots still possible after the leading answers (in CRITERIA_FIELDS order)."""
+        start, stop = self._code_range(answers)
+        return self.slots[start:stop]
 
-def update_entry_in_json_and_db(db_path, json_path, criteria, new_text):
+    def determined(self, answers):
+        """The text if the leading answers already fix it, else None."""
+        candidates = self.candidates(answers)
+        first = candidates[0]
+        if first is None:
+            return None
+        for texto in candidates:
+            if texto != first:
+                return None
+        if self.variants:
+            # Variants rotate per code, so the remaining answers still matter
+            start, stop = self._code_range(answers)
+            if any(start <= code < stop for code in self.variants):
+                return None
+        return first
+
+# One table per database path, loaded on first use and kept for the process lifetime.
+_TEXT_TABLES = {}
+
+def get_text_table(db_path):
+    """Return the cached TextTable for db_path, loading it on first use."""
+    table = _TEXT_TABLES.get(db_path)
+    if table is None:
+        table = _TEXT_TABLES[db_path] = TextTable.load(db_path)
+    return table
+
+def forget_text_table(db_path=None):
+    """Drop the cached table(s) so the next lookup reloads from the database."""
+    if db_path is None:
+        _TEXT_TABLES.clear()
+    else:
+        _TEXT_TABLES.pop(db_path, None)
+
+# Compiled text pack (`sintese pack`): every text of base.db in one file that
+# lookups slice through mmap without opening SQLite. Layout, little-endian:
+#   header   PACK_HEADER: magic, format, entry count, base.db size, mtime and digest
+#   codes    TABLE_SIZE x PACK_CODE (first entry, entry count), indexed by pack_criteria()
+#   entries  PACK_ENTRY (variante, blob offset, byte length), in variant order per code
+#   blob     the UTF-8 texts
+PACK_SUFFIX = ".pack"
+PACK_MAGIC = b"SINP"
+PACK_FORMAT = 1
+PACK_HEADER = "<4sHHIQq16s"
+PACK_CODE = "<II"
+PACK_ENTRY = "<III"
+
+def get_pack_path(db_path):
+    return os.path.splitext(db_path)[0] + PACK_SUFFIX
+
+def _pack_source_matches(db_path, size, mtime_ns, digest):
     """
-    Update an entry in both JSON and database.
-    criteria = {Genero, Assiduidade, Pontualidade, Participacao, Interesse, Empenho, Dificuldades}
+    True when base.db is the file the pack was built from: same size and
+    mtime, or (e.g. after a copy) same content digest. Commits still in the
+    WAL make the pack stale.
     """
-    # Update JSON
     try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Find and update the entry
-        found = False
-        for item in data:
-            # Check if all criteria match (handle both Participacao and Participação)
-            participacao_val = item.get("Participacao") if item.get("Participacao") is not None else item.get("Participação")
-            if (item.get("Genero") == criteria["Genero"] and
-                item.get("Assiduidade") == criteria["Assiduidade"] and
-                item.get("Pontualidade") == criteria["Pontualidade"] and
-                participacao_val == criteria["Participacao"] and
-                item.get("Interesse") == criteria["Interesse"] and
-                item.get("Empenho") == criteria["Empenho"] and
-                item.get("Dificuldades") == criteria["Dificuldades"]):
-                item["Texto"] = new_text
-                found = True
-                break
-        
-        if not found:
-            print("✗ Entrada não encontrada em base.json")
+        if os.path.getsize(db_path + "-wal"):
             return False
-        
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    
-    except Exception as e:
-        print(f"✗ Erro ao atualizar JSON: {e}")
-        return False
-    
-    # Update Database
+    except OSError:
+        pass
     try:
-        conn = sqlite3.connect(db_path)
-        cur = conn.cursor()
-        
-        where_clause = (
-            "Genero = ? AND Assiduidade = ? AND Pontualidade = ? AND "
-            "Participacao = ? AND Interesse = ? AND Empenho = ? AND Dificuldades = ?"
-        )
-        params = [
-            new_text,
-            criteria["Genero"],
-            criteria["Assiduidade"],
-            criteria["Pontualidade"],
-            criteria["Participacao"],
-            criteria["Interesse"],
-            criteria["Empenho"],
-            criteria["Dificuldades"]
-        ]
-        
-        cur.execute(f"UPDATE sinteses SET Texto = ? WHERE {where_clause}", params)
-        conn.commit()
-        rows_updated = cur.rowcount
-        conn.close()
-        
-        if rows_updated > 0:
-            print("✓ Texto atualizado com sucesso em base.json e base.db")
-            return True
-        else:
-            print("✗ Entrada não encontrada na base de dados")
-            return False
-    
-    except Exception as e:
-        print(f"✗ Erro ao atualizar base de dados: {e}")
+        st = os.stat(db_path)
+    except OSError:
         return False
+    if (st.st_size, st.st_mtime_ns) == (size, mtime_ns):
+        return True
+    return st.st_size == size and bytes.fromhex(_file_digest(db_path)) == digest
 
+def build_pack(db_path, pack_path=None):
+    """Compile db_path's texts (as TextTable sees them) into a pack. Returns (texts, bytes)."""
+    import struct
 
-def update_entry_in_db(db_path, criteria, new_text):
-    """Update the Texto field in the database only (no JSON changes)."""
+    conn = connect_db(db_path)
     try:
-        conn = sqlite3.connect(db_path)
-        cur = conn.cursor()
-
-        where_clause = (
-            "Genero = ? AND Assiduidade = ? AND Pontualidade = ? AND "
-            "Participacao = ? AND Interesse = ? AND Empenho = ? AND Dificuldades = ?"
-        )
-        params = [
-            new_text,
-            criteria["Genero"],
-            criteria["Assiduidade"],
-            criteria["Pontualidade"],
-            criteria["Participacao"],
-            criteria["Interesse"],
-            criteria["Empenho"],
-            criteria["Dificuldades"]
-        ]
-
-        cur.execute(f"UPDATE sinteses SET Texto = ? WHERE {where_clause}", params)
-        conn.commit()
-        rows_updated = cur.rowcount
+        table = TextTable.from_connection(conn)
+    finally:
         conn.close()
+    # Stat after closing: the last connection checkpoints the WAL into base.db
+    st = os.stat(db_path)
+    digest = bytes.fromhex(_file_digest(db_path))
 
-        if rows_updated > 0:
-            print("✓ Texto atualizado com sucesso em base.db")
-            return True
-        else:
-            print("✗ Entrada não encontrada na base de dados")
-            return False
+    codes, entries, blob = [], [], []
+    offset = 0
+    for code in range(TABLE_SIZE):
+        texts = table.variants.get(code) or ([] if table.slots[code] is None else [(0, table.slots[code])])
+        codes.append(struct.pack(PACK_CODE, len(entries), len(texts)))
+        for variante, texto in texts:
+            data = texto.encode("utf-8")
+            entries.append(struct.pack(PACK_ENTRY, variante, offset, len(data)))
+            blob.append(data)
+            offset += len(data)
+    header = struct.pack(PACK_HEADER, PACK_MAGIC, PACK_FORMAT, 0, len(entries),
+                         st.st_size, st.st_mtime_ns, digest)
+    content = b"".join([header] + codes + entries + blob)
+    write_file_atomic(pack_path or get_pack_path(db_path), content)
+    return len(entries), len(content)
 
-    except Exception as e:
-        print(f"✗ Erro ao atualizar base de dados: {e}")
-        return False
+class TextPack:
+    """
+    A pack opened with mmap. Nothing is read up front: each lookup reads its
+    offset table entries and decodes only the requested text. Same lookup()
+    interface as TextTable.
+    """
 
-def main():
-    press_enter_prompt()
-    db_path = get_database_path()
-    json_path = get_json_path()
-    
-    # Check if database exists
-    if not os.path.exists(db_path):
-        print(f"\n❌ ERRO: Base de dados não encontrada!")
-        print(f"   Esperado em: {db_path}")
-        print(f"\n💡 Solução:")
-        print(f"   1. Certifique-se que 'base.db' está na mesma pasta que o executável")
-        print(f"   2. Ou execute 'python create_sqlite_db.py' para criar a base de dados")
-        sys.exit(1)
-    
-    genero = ask_gender()
-    assid = ask_yesno("O aluno é assíduo?")
-    punt = ask_yesno("O aluno é pontual?")
-    part = ask_yesno("O aluno é participativo?")
-    inter = ask_yesno("O aluno mostra interesse?")
-    empen = ask_yesno("O aluno mostra empenho?")
-    diff = ask_yesno("O aluno mostra dificuldades?")
-
-    texto = build_and_run_query(db_path, genero, assid, punt, part, inter, empen, diff)
-    if not texto:
-        print("Nenhuma correspondência encontrada para os filtros definidos.")
-        return
+    def __init__(self, mm, count):
+        import struct
 
-    print("\n--- Texto encontrado ---\n")
+        self.mm = mm
+        self.code_size = struct.calcsize(PACK_CODE)
+        self.entry_size = struct.calcsize(PACK_ENTRY)
+        self.codes_at = struct.calcsize(PACK_HEADER)
+        self.entries_at = self.codes_at + TABLE_SIZE * self.code_size
+        self.blob_at = self.entries_at + count * self.entry_size
+
+    @classmethod
+    def open(cls, db_path, pack_path=None):
+        """The pack for db_path, or None when it is missing, unreadable or stale."""
+        import mmap
+        import struct
+
+        try:
+            with open(pack_path or get_pack_path(db_path), "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            magic, fmt, _, count, size, mtime_ns, digest = struct.unpack_from(PACK_HEADER, mm)
+            if magic == PACK_MAGIC and fmt == PACK_FORMAT and _pack_source_matches(db_path, size, mtime_ns, digest):
+                return cls(mm, count)
+        except struct.error:
+            pass
+        mm.close()
+        return None
+
+    def texts(self, code):
+        """[(variante, texto), ...] for a packed criteria code."""
+        import struct
+
+        first, count = struct.unpack_from(PACK_CODE, self.mm, self.codes_at + code * self.code_size)
+        result = []
+        for i in range(first, first + count):
+            variante, offset, length = struct.unpack_from(PACK_ENTRY, self.mm, self.entries_at + i * self.entry_size)
+            start = self.blob_at + offset
+            result.append((variante, self.mm[start:start + length].decode("utf-8")))
+        return result
+
+    def get(self, code):
+        """The lowest-variant text for code, like TextTable.slots[code]."""
+        import struct
+
+        first, count = struct.unpack_from(PACK_CODE, self.mm, self.codes_at + code * self.code_size)
+        if not count:
+            return None
+        _, offset, length = struct.unpack_from(PACK_ENTRY, self.mm, self.entries_at + first * self.entry_size)
+        start = self.blob_at + offset
+        return self.mm[start:start + length].decode("utf-8")
+
+    def lookup(self, genero, assid, punt, part, inter, empen, diff):
+        return self.get(pack_criteria(genero, assid, punt, part, inter, empen, diff))
+
+    def close(self):
+        self.mm.close()
+
+def lookup_text(db_path, genero, assid, punt, part, inter, empen, diff):
+    """
+    Hot-path lookup: index into the in-memory table. Falls back to
+    build_and_run_query() when the slot is empty.
+    """
+    texto = get_text_table(db_path).lookup(genero, assid, punt, part, inter, empen, diff)
+    if texto is None:
+        texto = build_and_run_query(db_path, genero, assid, punt, part, inter, empen, diff)
+    return texto
+
+def _remember_text(db_path, criteria, new_text):
+    """Keep an already-loaded table in step with a successful DB update."""
+    table = _TEXT_TABLES.get(db_path)
+    if table is not None:
+        code = pack_criteria(*(criteria[f] for f in CRITERIA_FIELDS))
+        table.remember(code, criteria.get("Variante", 0), new_text)
+
+# Gender templates: a text stored once per flag combination, with inflection
+# placeholders {masculino|feminino} rendered per gender ("{O|A} alun{o|a} é
+# assídu{o|a}"). fold_pair() derives a template from an existing M/F pair and
+# retemplate() carries an edit of one rendering over to the template.
+def _tokenize(text):
+    import re
+    return re.findall(r"\w+|\W+", text)
+
+def _template_tokens(template):
+    """[(masculine, feminine), ...] word/separator tokens of a template."""
+    import re
+    masculine = re.sub(r"\{([^{}|]*)\|([^{}|]*)\}", r"\1", template)
+    feminine = re.sub(r"\{([^{}|]*)\|([^{}|]*)\}", r"\2", template)
+    m_tokens, f_tokens = _tokenize(masculine), _tokenize(feminine)
+    if len(m_tokens) != len(f_tokens):
+        raise ValueError(f"modelo inválido (formas com palavras diferentes): {template!r}")
+    return list(zip(m_tokens, f_tokens))
+
+def _join_template_tokens(tokens):
+    out = []
+    for m, f in tokens:
+        if m == f:
+            out.append(m)
+            continue
+        prefix = os.path.commonprefix([m, f])
+        out.append(f"{prefix}{{{m[len(prefix):]}|{f[len(prefix):]}}}")
+    return "".join(out)
+
+def render_template(template, genero):
+    """The M or F text of a template; texts without placeholders render as-is."""
+    if "{" not in template:
+        return template
+    import re
+    return re.sub(r"\{([^{}|]*)\|([^{}|]*)\}", r"\1" if genero == "M" else r"\2", template)
+
+# Word pairs that differ between the genders without following an ending rule
+GENDER_WORDS = {("O", "A"), ("o", "a"), ("ele", "ela"), ("Ele", "Ela"), ("do", "da"), ("no", "na"),
+                ("pelo", "pela"), ("um", "uma"), ("Um", "Uma"), ("dele", "dela"), ("ao", "à")}
+GENDER_ENDINGS = (("o", "a"), ("os", "as"), ("or", "ora"), ("ores", "oras"), ("u", "ua"))
+
+def is_gender_pair(m, f):
+    """True when m/f are the masculine/feminine forms of one word."""
+    if (m, f) in GENDER_WORDS:
+        return True
+    for m_end, f_end in GENDER_ENDINGS:
+        if m.endswith(m_end) and f.endswith(f_end) and m[:-len(m_end)] == f[:-len(f_end)] and m[:-len(m_end)]:
+            return True
+    return False
+
+def fold_pair(m_text, f_text):
+    """(template, None) when the two texts differ only by gender inflection, else (None, reason)."""
+    m_tokens, f_tokens = _tokenize(m_text), _tokenize(f_text)
+    if len(m_tokens) != len(f_tokens):
+        return None, "os textos têm conteúdo diferente"
+    for m, f in zip(m_tokens, f_tokens):
+        if m != f and not is_gender_pair(m, f):
+            return None, f"palavras diferentes: {m!r} / {f!r}"
+    return _join_template_tokens(list(zip(m_tokens, f_tokens))), None
+
+def template_lexicon(templates):
+    """
+    {genero: {word: (m, f)}} from the inflected words of existing templates,
+    plus "neutral": the words they use unchanged in both genders.
+    """
+    lexicon = {"M": {}, "F": {}, "neutral": set()}
+    for template in templates:
+        for m, f in _template_tokens(template):
+            if m != f:
+                lexicon["M"][m] = (m, f)
+                lexicon["F"][f] = (m, f)
+            else:
+                lexicon["neutral"].add(m)
+    return lexicon
+
+class UnknownGenderWords(ValueError):
+    """A template edit adds words that look inflected but whose other form is unknown."""
+
+    def __init__(self, words):
+        super().__init__("sem forma conhecida no outro género: " + ", ".join(words))
+        self.words = words
+
+def _looks_inflected(word, genero):
+    side = 0 if genero == "M" else 1
+    return word.isalpha() and any(word.endswith(pair[side]) and len(word) > len(pair[side])
+                                  for pair in GENDER_ENDINGS)
+
+def retemplate(template, genero, new_text, lexicon=None):
+    """
+    Template for an edited rendering: unchanged tokens keep their inflection
+    (aligned with difflib), new words become inflected when the lexicon (or
+    GENDER_WORDS) knows their other form, and other new words are the same for
+    both. A new word with a gender ending (GENDER_ENDINGS) that is neither
+    known nor used unchanged by the templates could be copied into the other
+    gender wrongly ("participativa e criativa" -> "participativo e criativa"),
+    so UnknownGenderWords is raised instead.
+    """
+    import difflib
+
+    side = 0 if genero == "M" else 1
+    old_tokens = _template_tokens(template)
+    rendered = [pair[side] for pair in old_tokens]
+    new_tokens = _tokenize(new_text)
+    known = dict((lexicon or {}).get(genero, {}))
+    for pair in GENDER_WORDS:
+        known.setdefault(pair[side], pair)
+    neutral = set((lexicon or {}).get("neutral", ())) | {m for m, f in old_tokens if m == f}
+
+    result, unknown = [], []
+    matcher = difflib.SequenceMatcher(None, rendered, new_tokens, autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == "equal":
+            result.extend(old_tokens[i1:i2])
+            continue
+        for token in new_tokens[j1:j2]:
+            if token not in known and token not in neutral and _looks_inflected(token, genero):
+                unknown.append(token)
+            result.append(known.get(token, (token, token)))
+    if unknown:
+        raise UnknownGenderWords(list(dict.fromkeys(unknown)))
+    return _join_template_tokens(result)
+
+def read_templates(conn):
+    """(template, variante, *flags) rows; empty before the templates table exists."""
+    import sqlite3
+
+    try:
+        return conn.execute(
+            "SELECT Template, Variante, " + ", ".join(TEMPLATE_FIELDS) + " FROM templates"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return []
+
+def fold_db(conn, dry_run=False):
+    """
+    Fold every M/F pair of sinteses rows that differ only by inflection into one
+    template (removing both rows), in one transaction. Returns
+    {"folded": n, "unfolded": [(code, reason), ...]}.
+    """
+    migrate_db(conn)
+    pairs = {}
+    for row_id, texto, variante, genero, *flags in conn.execute(
+        "SELECT id, Texto, Variante, " + ", ".join(CRITERIA_FIELDS) + " FROM sinteses ORDER BY id"
+    ):
+        pairs.setdefault(tuple(flags) + (variante,), {})[genero] = (row_id, texto)
+
+    report = {"folded": 0, "unfolded": []}
+    with conn:
+        for key, rows in sorted(pairs.items()):
+            if set(rows) != {"M", "F"}:
+                continue
+            template, reason = fold_pair(rows["M"][1], rows["F"][1])
+            if template is None:
+                label = "".join(str(v) for v in key[:-1]) + (f" v{key[-1]}" if key[-1] else "")
+                report["unfolded"].append((label, reason))
+                continue
+            report["folded"] += 1
+            if dry_run:
+                continue
+            conn.execute(
+                "INSERT INTO templates (Template, " + ", ".join(TEMPLATE_FIELDS) + ", Variante) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (" + ", ".join(TEMPLATE_FIELDS)
+                + ", Variante) DO UPDATE SET Template = excluded.Template",
+                (template,) + key,
+            )
+            conn.executemany("DELETE FROM sinteses WHERE id = ?", [(rows["M"][0],), (rows["F"][0],)])
+    return report
+
+class EditConflict(Exception):
+    """The text changed since it was read: another user saved first."""
+
+    def __init__(self, current, version):
+        super().__init__("o texto foi alterado por outro utilizador entretanto")
+        self.current = current
+        self.version = version
+
+def read_version(conn, criteria):
+    """
+    (version, texto) for what currently provides criteria's text, where
+    version is (table, id, Versao) of the sinteses row or gender template;
+    (None, None) when nothing does. Pass version to write_text(expected=...).
+    """
+    import sqlite3
+
+    row = conn.execute(
+        f"SELECT id, Versao, Texto FROM sinteses WHERE {CRITERIA_WHERE_SQL} AND Variante = ?",
+        update_params(criteria, None)[1:],
+    ).fetchone()
+    if row:
+        return ("sinteses", row[0], row[1]), row[2]
+    try:
+        row = conn.execute(f"SELECT id, Versao, Template FROM templates WHERE {TEMPLATE_WHERE_SQL}",
+                           _template_key(criteria)).fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    if row:
+        return ("templates", row[0], row[1]), render_template(row[2], criteria["Genero"])
+    return None, None
+
+def write_text(conn, criteria, new_text, both_genders=False, expected=None):
+    """
+    Store an edited text for criteria (dict with optional Variante) without
+    committing. A sinteses row is updated in place. A text rendered from a
+    template gets a row for this gender only, which overrides the template;
+    with both_genders=True (after the user has seen other_gender_preview())
+    the template is updated instead, so both genders change with one write,
+    unless the edit adds words whose other form is unknown (UnknownGenderWords),
+    in which case only this gender changes.
+    With expected (a version from read_version()) the write happens only if
+    the text is still at that version, else EditConflict is raised.
+    Returns [(criteria, text), ...] for every rendering written; empty if none matched.
+    """
+    import sqlite3
+
+    if expected is not None:
+        # Check and write under one write lock so no other writer slips in between
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        version, current = read_version(conn, criteria)
+        if version != expected:
+            raise EditConflict(current, version)
+    key = _template_key(criteria)
+    code = format_code(tuple(criteria[f] for f in CRITERIA_FIELDS))
+    row = conn.execute(SELECT_ROW_SQL, update_params(criteria, None)[1:]).fetchone()
+    if row:
+        conn.execute(UPDATE_TEXT_SQL, update_params(criteria, new_text))
+        record_history(conn, [("sinteses", row[0], code, key[-1], row[1], new_text)])
+        return [(criteria, new_text)]
+    try:
+        row = conn.execute(f"SELECT id, Template FROM templates WHERE {TEMPLATE_WHERE_SQL}", key).fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    if row is None:
+        return []
+    template_id, template = row
+    new_template = None
+    if both_genders:
+        try:
+            lexicon = template_lexicon(t for t, *_ in read_templates(conn))
+            new_template = retemplate(template, criteria["Genero"], new_text, lexicon)
+        except UnknownGenderWords:
+            pass
+    if new_template is None:
+        cursor = conn.execute(UPSERT_VARIANT_SQL, (new_text,) + tuple(criteria[f] for f in CRITERIA_FIELDS) + key[-1:])
+        record_history(conn, [("sinteses", cursor.lastrowid, code, key[-1], None, new_text)])
+        return [(criteria, new_text)]
+    conn.execute("UPDATE templates SET Template = ? WHERE id = ?", (new_template, template_id))
+    record_history(conn, [("templates", template_id, "*" + code[1:], key[-1], template, new_template)])
+    return [(dict(criteria, Genero=genero), render_template(new_template, genero)) for genero in GENDER_BITS]
+
+def current_user():
+    """Who is editing, for the history: SINT_USER, else the login name."""
+    user = os.environ.get("SINT_USER")
+    if user:
+        return user
+    import getpass
+    try:
+        return getpass.getuser()
+    except Exception:
+        return None
+
+def record_history(conn, entries):
+    """
+    Append [(table, row_id, code, variante, old, new), ...] to sinteses_history
+    in the caller's transaction (old is None for an inserted row). Skipped on
+    a database without the table.
+    """
+    import sqlite3
+
+    when = time.strftime("%Y-%m-%d %H:%M:%S")
+    user = current_user()
+    try:
+        conn.executemany(
+            "INSERT INTO sinteses_history (Tabela, Linha, Codigo, Variante, TextoAntigo, TextoNovo, "
+            "Quando, Utilizador) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [entry + (when, user) for entry in entries],
+        )
+    except sqlite3.OperationalError as e:
+        if "no such table" not in str(e):
+            raise
+
+HISTORY_COLUMNS = "id, Quando, Utilizador, Codigo, Variante, TextoAntigo, TextoNovo"
+
+def list_history(conn, code=None, limit=20):
+    """Newest history entries first, all or for one code (including its gender template)."""
+    if code is None:
+        return conn.execute(
+            f"SELECT {HISTORY_COLUMNS} FROM sinteses_history ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+    return conn.execute(
+        f"SELECT {HISTORY_COLUMNS} FROM sinteses_history WHERE Codigo IN (?, ?) ORDER BY id DESC LIMIT ?",
+        (code, "*" + code[1:], limit),
+    ).fetchall()
+
+def undo_edit(conn, history_id=None, force=False):
+    """
+    Revert one history entry (the latest when history_id is None): its row
+    gets the old text back, or is deleted if the edit inserted it. The undo
+    is recorded too, so it can be undone. Refuses (ValueError) when the text
+    changed after that edit, unless force. The check and the write happen
+    under one write lock (BEGIN IMMEDIATE), so no other writer slips in
+    between. Returns (code, variante, before, after).
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        if history_id is None:
+            row = conn.execute(
+                "SELECT id, Tabela, Linha, Codigo, Variante, TextoAntigo, TextoNovo "
+                "FROM sinteses_history ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+        else:
+            row = conn.execute(
+                "SELECT id, Tabela, Linha, Codigo, Variante, TextoAntigo, TextoNovo "
+                "FROM sinteses_history WHERE id = ?", (history_id,)
+            ).fetchone()
+        if row is None:
+            raise ValueError("nada para desfazer" if history_id is None else f"edição #{history_id} não existe")
+        history_id, table, row_id, code, variante, old, new = row
+        column = dict(TEXT_COLUMNS)[table]
+        current = conn.execute(f"SELECT {column} FROM {table} WHERE id = ?", (row_id,)).fetchone()
+        current = current[0] if current else None
+        if current != new and not force:
+            raise ValueError(f"{code}[{variante}] foi alterado depois da edição #{history_id} (use --force)")
+        if current is None and old is not None:
+            raise ValueError(f"{code}[{variante}] já não existe na base de dados")
+        if old is None:
+            conn.execute(f"DELETE FROM {table} WHERE id = ?", (row_id,))
+        else:
+            conn.execute(f"UPDATE {table} SET {column} = ? WHERE id = ?", (old, row_id))
+        record_history(conn, [(table, row_id, code, variante, current, old)])
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return code, variante, current, old
+
+def _template_key(criteria):
+    return tuple(criteria[f] for f in TEMPLATE_FIELDS) + (criteria.get("Variante", 0),)
+
+def _template_for(conn, criteria):
+    """The template behind criteria's text, or None when a sinteses row (or nothing) provides it."""
+    import sqlite3
+
+    if conn.execute(SELECT_VARIANT_SQL, update_params(criteria, None)[1:]).fetchone():
+        return None
+    try:
+        row = conn.execute(f"SELECT Template FROM templates WHERE {TEMPLATE_WHERE_SQL}",
+                           _template_key(criteria)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+def other_gender_preview(conn, criteria, new_text):
+    """
+    The other gender's text an edit would produce, or None when the text is
+    not template-backed. Raises UnknownGenderWords when the edit cannot be
+    carried over to the other gender.
+    """
+    template = _template_for(conn, criteria)
+    if template is None:
+        return None
+    lexicon = template_lexicon(t for t, *_ in read_templates(conn))
+    other = "F" if criteria["Genero"] == "M" else "M"
+    return render_template(retemplate(template, criteria["Genero"], new_text, lexicon), other)
+
+# Personalisation: the generic subject ("O aluno", "da aluna", ...) becomes the
+# student's name on its first mention and a pronoun after that. Each text is
+# compiled once into literal segments plus slots, so personalising a roster is
+# a list fill and a join per student instead of a regex pass.
+PERSON_PHRASES = (
+    # (masculine, feminine, slot)
+    ("O aluno", "A aluna", "Nome"),
+    ("o aluno", "a aluna", "nome"),
+    ("do aluno", "da aluna", "do"),
+    ("ao aluno", "à aluna", "ao"),
+    ("no aluno", "na aluna", "no"),
+    ("pelo aluno", "pela aluna", "pelo"),
+    ("Ele", "Ela", "Ele"),
+    ("ele", "ela", "ele"),
+    ("dele", "dela", "dele"),
+)
+# A repeated subject is not named twice
+PERSON_REPEAT_SLOTS = {"Nome": "Ele", "nome": "ele"}
+NAME_SLOTS = ("Nome", "nome", "do", "ao", "no", "pelo")
+
+_PERSON_PATTERN = None
+_PERSON_TEMPLATES = {}
+
+class PersonTemplate:
+    """A text split into literal segments and (position, slot) pairs."""
+
+    __slots__ = ("segments", "slots")
+
+    def __init__(self, segments, slots):
+        self.segments = segments
+        self.slots = slots
+
+    def render(self, forms):
+        parts = list(self.segments)
+        for position, slot in self.slots:
+            parts[position] = forms[slot]
+        return "".join(parts)
+
+def compile_person_template(text):
+    """Compile (and cache) text into a PersonTemplate."""
+    global _PERSON_PATTERN
+    template = _PERSON_TEMPLATES.get(text)
+    if template is not None:
+        return template
+    if _PERSON_PATTERN is None:
+        import re
+        phrases = sorted({p for m, f, _ in PERSON_PHRASES for p in (m, f)}, key=len, reverse=True)
+        _PERSON_PATTERN = re.compile(r"\b(?:" + "|".join(map(re.escape, phrases)) + r")\b")
+    slot_of = {p: slot for m, f, slot in PERSON_PHRASES for p in (m, f)}
+
+    segments, slots, seen, pos = [], [], set(), 0
+    for match in _PERSON_PATTERN.finditer(text):
+        segments.append(text[pos:match.start()])
+        slot = slot_of[match.group()]
+        if slot in PERSON_REPEAT_SLOTS and slot.lower() in seen:
+            slot = PERSON_REPEAT_SLOTS[slot]
+        seen.add(slot.lower())
+        slots.append((len(segments), slot))
+        segments.append(None)
+        pos = match.end()
+    segments.append(text[pos:])
+    template = _PERSON_TEMPLATES[text] = PersonTemplate(tuple(segments), tuple(slots))
+    return template
+
+def person_forms(nome, genero, article=True):
+    """Slot values for one student ("A Ana", "da Ana", "Ela", ...)."""
+    fem = genero == "F"
+    if article:
+        forms = {
+            "Nome": ("A " if fem else "O ") + nome, "nome": ("a " if fem else "o ") + nome,
+            "do": ("da " if fem else "do ") + nome, "ao": ("à " if fem else "ao ") + nome,
+            "no": ("na " if fem else "no ") + nome, "pelo": ("pela " if fem else "pelo ") + nome,
+        }
+    else:
+        forms = {"Nome": nome, "nome": nome, "do": "de " + nome, "ao": "a " + nome,
+                 "no": "em " + nome, "pelo": "por " + nome}
+    forms.update({"Ele": "Ela" if fem else "Ele", "ele": "ela" if fem else "ele",
+                  "dele": "dela" if fem else "dele"})
+    return forms
+
+def personalize(text, nome, genero, article=True):
+    """text with the student's name and pronouns for genero; unchanged without a name."""
+    if not text or not nome:
+        return text
+    return compile_person_template(text).render(person_forms(nome, genero, article))
+
+def depersonalize(text, nome, genero, article=True):
+    """Undo personalize() on an edited text so the name is never stored in the database."""
+    if not text or not nome:
+        return text
+    forms = person_forms(nome, genero, article)
+    generic = {slot: (f if genero == "F" else m) for m, f, slot in PERSON_PHRASES}
+    for slot in sorted(NAME_SLOTS, key=lambda s: len(forms[s]), reverse=True):
+        text = text.replace(forms[slot], generic[slot])
+    return text
+
+# Compositional engine: builds a síntese from per-criterion clause tables at
+# lookup time, so graded levels and extra criteria cost one clause each instead
+# of multiplying the rows to author. Levels 0/1 keep the meaning of the binary
+# DB flags; higher levels only exist here. Clauses are (polarity, verb, rest):
+# within a sentence, positive clauses come first and negative ones after, each
+# group joined with "e" (a verb repeated from the previous clause is dropped),
+# and the two groups with a single ", mas". {o} is the gender ending and
+# {Artigo} the subject.
+COMPOSE_GENDER = {
+    "M": {"o": "o", "Artigo": "O aluno"},
+    "F": {"o": "a", "Artigo": "A aluna"},
+}
+
+COMPOSE_CLAUSES = {
+    "Assiduidade": {0: (-1, None, "pouco assídu{o}"), 1: (1, None, "assídu{o}")},
+    "Pontualidade": {0: (-1, None, "pouco pontual"), 1: (1, None, "pontual")},
+    "Participacao": {0: (-1, None, "pouco participativ{o}"), 1: (1, None, "participativ{o}")},
+    "Interesse": {
+        0: (-1, "deverá demonstrar", "interesse pelas atividades propostas"),
+        1: (1, "revela", "interesse nas atividades propostas"),
+    },
+    "Empenho": {
+        0: (-1, None, "o empenho não foi satisfatório"),
+        1: (1, "revela", "empenho nas tarefas"),
+        2: (1, "revela", "bom empenho nas tarefas"),
+        3: (1, "revela", "um empenho muito bom nas tarefas"),
+    },
+    "TPC": {
+        0: (-1, "nem sempre realiza", "os trabalhos de casa"),
+        1: (1, "realiza", "os trabalhos de casa com regularidade"),
+    },
+    "Comportamento": {
+        0: (-1, None, "o comportamento em sala de aula deve melhorar"),
+        1: (1, "revela", "um comportamento adequado"),
+        2: (1, "revela", "um comportamento exemplar"),
+    },
+    "Dificuldades": {
+        0: None,
+        1: (1, "apresenta", "algumas dificuldades"),
+        2: (1, "apresenta", "dificuldades significativas"),
+    },
+}
+
+# Sentences in output order: (prefix, criteria). Criteria missing from a
+# profile are left out, so TPC/Comportamento are optional.
+COMPOSE_SENTENCES = (
+    ("{Artigo} é ", ("Assiduidade", "Pontualidade", "Participacao")),
+    ("", ("Interesse", "Empenho", "TPC")),
+    ("", ("Comportamento",)),
+    ("", ("Dificuldades",)),
+)
+COMPOSE_FIELDS = tuple(f for _, fields in COMPOSE_SENTENCES for f in fields)
+COMPOSE_CACHE_SIZE = 4096
+
+def _join_clauses(clauses):
+    # Clauses are grouped by polarity (positives first, order kept within each
+    # group) so there is at most one ", mas": "a, b e c, mas d e e". Joining
+    # runs in their original order ("a, mas b e c") would read c as negative.
+    runs = []  # [polarity, phrases, last verb]
+    for polarity, verb, rest in sorted(clauses, key=lambda c: -c[0]):
+        phrase = rest if verb is None else f"{verb} {rest}"
+        if runs and runs[-1][0] == polarity:
+            run = runs[-1]
+            run[1].append(rest if verb is not None and verb == run[2] else phrase)
+            run[2] = verb
+        else:
+            runs.append([polarity, [phrase], verb])
+
+    return ", mas ".join(phrases[0] if len(phrases) == 1 else ", ".join(phrases[:-1]) + " e " + phrases[-1]
+                         for _, phrases, _ in runs)
+
+def _compose(profile):
+    """Text for a profile: (genero, ((field, level), ...)) in COMPOSE_FIELDS order."""
+    genero, levels = profile
+    forms = COMPOSE_GENDER[genero]
+    levels = dict(levels)
+    sentences = []
+    for prefix, fields in COMPOSE_SENTENCES:
+        clauses = [COMPOSE_CLAUSES[f][levels[f]] for f in fields if f in levels]
+        clauses = [c for c in clauses if c is not None]
+        if not clauses:
+            continue
+        body = _join_clauses(clauses)
+        sentence = (prefix + body).format(**forms)
+        sentences.append(sentence[0].upper() + sentence[1:] + ".")
+    return " ".join(sentences)
+
+_COMPOSE_CACHED = None
+
+def compose_text(genero, levels):
+    """
+    Build the text for genero ('M'/'F') and a {criterion: level} dict, memoised
+    in an LRU cache. Raises ValueError for unknown criteria or levels.
+    """
+    global _COMPOSE_CACHED
+    if genero not in COMPOSE_GENDER:
+        raise ValueError(f"género inválido: {genero!r}")
+    for field, level in levels.items():
+        table = COMPOSE_CLAUSES.get(field)
+        if table is None:
+            raise ValueError(f"critério desconhecido: {field}")
+        if level not in table:
+            raise ValueError(f"nível inválido para {field}: {level} (válidos: {min(table)}–{max(table)})")
+    if _COMPOSE_CACHED is None:
+        import functools
+        _COMPOSE_CACHED = functools.lru_cache(maxsize=COMPOSE_CACHE_SIZE)(_compose)
+    profile = (genero, tuple((f, levels[f]) for f in COMPOSE_FIELDS if f in levels))
+    return _COMPOSE_CACHED(profile)
+
+def resolve_profile(db_path, genero, levels):
+    """
+    (texto, source) for a profile. A profile the binary schema can express (the
+    six CRITERIA_FIELDS flags, nothing else) uses the authored DB row when there
+    is one (source "db"); anything else is composed (source "composto").
+    """
+    binary = (set(levels) == set(CRITERIA_FIELDS[1:])
+              and all(levels[f] in (0, 1) for f in CRITERIA_FIELDS[1:]))
+    if binary and db_path:
+        texto = lookup_text(db_path, genero, *(levels[f] for f in CRITERIA_FIELDS[1:]))
+        if texto is not None:
+            return texto, "db"
+    return compose_text(genero, levels), "composto"
+
+# Backups are gzip snapshots kept in a "backups" folder next to the file being
+# protected. A snapshot is skipped when the data has not changed since the last
+# one, and old snapshots are pruned: the newest SINT_BACKUP_KEEP are kept, plus
+# the newest one of each of the last SINT_BACKUP_DAILY days.
+BACKUP_DIR_NAME = "backups"
+BACKUP_KEEP_LAST = 10
+BACKUP_KEEP_DAILY = 14
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, ""))
+    except ValueError:
+        return default
+
+def get_backup_dir(path):
+    return os.path.join(os.path.dirname(os.path.abspath(path)), BACKUP_DIR_NAME)
+
+def _backup_timestamp(filename, name):
+    """'base.db.20251217_171718_123456.gz' -> datetime, or None for foreign files."""
+    from datetime import datetime
+    stamp = filename[len(name) + 1:-len(".gz")]
+    try:
+        return datetime.strptime(stamp, "%Y%m%d_%H%M%S_%f")
+    except ValueError:
+        return None
+
+def list_backups(path):
+    """Snapshots of path as (datetime, full_path), newest first."""
+    folder = get_backup_dir(path)
+    name = os.path.basename(path)
+    if not os.path.isdir(folder):
+        return []
+    found = []
+    for filename in os.listdir(folder):
+        if filename.startswith(name + ".") and filename.endswith(".gz"):
+            stamp = _backup_timestamp(filename, name)
+            if stamp is not None:
+                found.append((stamp, os.path.join(folder, filename)))
+    found.sort(reverse=True)
+    return found
+
+def prune_backups(path, keep_last=None, keep_daily=None):
+    """Apply the retention policy to path's snapshots; returns the removed paths."""
+    keep_last = _env_int("SINT_BACKUP_KEEP", BACKUP_KEEP_LAST) if keep_last is None else keep_last
+    keep_daily = _env_int("SINT_BACKUP_DAILY", BACKUP_KEEP_DAILY) if keep_daily is None else keep_daily
+    backups = list_backups(path)
+
+    keep = {p for _, p in backups[:keep_last]}
+    days = set()
+    for stamp, p in backups:
+        day = stamp.date()
+        if day in days:
+            continue
+        if len(days) >= keep_daily:
+            break
+        days.add(day)
+        keep.add(p)
+
+    removed = []
+    for _, p in backups:
+        if p not in keep:
+            try:
+                os.unlink(p)
+                removed.append(p)
+            except OSError:
+                pass
+    return removed
+
+def _write_snapshot(path, data, fingerprint=None):
+    """
+    Store data as a compressed snapshot of path unless it matches the last one.
+    Returns the snapshot path, or None when it was skipped as unchanged.
+    """
+    import gzip
+    import hashlib
+    from datetime import datetime
+
+    folder = get_backup_dir(path)
+    name = os.path.basename(path)
+    state_path = os.path.join(folder, f".{name}.last")
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            last_digest = f.read().split(":")[-1].strip()
+    except OSError:
+        last_digest = None
+
+    state = f"{fingerprint}:{digest}" if fingerprint else digest
+    if digest == last_digest and list_backups(path):
+        write_file_atomic(state_path, state)
+        return None
+
+    os.makedirs(folder, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    backup_path = os.path.join(folder, f"{name}.{stamp}.gz")
+    write_file_atomic(backup_path, gzip.compress(data, compresslevel=6))
+    write_file_atomic(state_path, state)
+    prune_backups(path)
+    return backup_path
+
+def _unchanged_since_last_backup(path):
+    """Cheap pre-check: size and mtime equal to those recorded by the last snapshot."""
+    st = os.stat(path)
+    fingerprint = f"{st.st_size}-{st.st_mtime_ns}"
+    # Committed SQLite pages may still live in the WAL file
+    if os.path.exists(path + "-wal"):
+        wal = os.stat(path + "-wal")
+        fingerprint += f"-{wal.st_size}-{wal.st_mtime_ns}"
+    state_path = os.path.join(get_backup_dir(path), f".{os.path.basename(path)}.last")
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            unchanged = f.read().split(":")[0] == fingerprint
+    except OSError:
+        unchanged = False
+    return fingerprint, unchanged and bool(list_backups(path))
+
+def _report_backup(backup_path):
+    if backup_path is None:
+        print("✓ Sem alterações desde o último backup.")
+    else:
+        print(f"✓ Backup criado: {os.path.basename(backup_path)}")
+
+def backup_json(json_path=None):
+    """Create a compressed snapshot of base.json (skipped if unchanged)."""
+    json_path = json_path or get_json_path()
+    if not os.path.exists(json_path):
+        print(f"✗ base.json não encontrado em: {json_path}")
+        return False
+
+    try:
+        fingerprint, unchanged = _unchanged_since_last_backup(json_path)
+        if unchanged:
+            _report_backup(None)
+            return True
+        with open(json_path, "rb") as f:
+            data = f.read()
+        _report_backup(_write_snapshot(json_path, data, fingerprint))
+        return True
+    except Exception as e:
+        # Provide a clearer message for troubleshooting
+        print(f"✗ Erro ao criar backup: {e}")
+        return False
+
+
+def backup_db(db_path=None):
+    """
+    Create a compressed snapshot of base.db (skipped if unchanged).
+
+    Uses sqlite3's online backup API into an in-memory copy, so the snapshot is
+    consistent even while other processes read or write the database.
+    """
+    import sqlite3
+
+    db_path = db_path or get_database_path()
+    if not os.path.exists(db_path):
+        print(f"✗ base.db não encontrado em: {db_path}")
+        return False
+
+    try:
+        fingerprint, unchanged = _unchanged_since_last_backup(db_path)
+        if unchanged:
+            _report_backup(None)
+            return True
+        src = sqlite3.connect(db_path)
+        dst = sqlite3.connect(":memory:")
+        try:
+            src.backup(dst)
+            data = dst.serialize()
+        finally:
+            dst.close()
+            src.close()
+        _report_backup(_write_snapshot(db_path, data, fingerprint))
+        return True
+    except Exception as e:
+        print(f"✗ Erro ao criar backup: {e}")
+        return False
+
+class Editor:
+    """An external editor command; the file to edit is appended to argv."""
+
+    def __init__(self, argv):
+        self.argv = argv
+        self.name = os.path.basename(argv[0])
+
+    def edit_file(self, path):
+        import subprocess
+        return subprocess.run(self.argv + [path], check=False).returncode == 0
+
+def _editor_candidates():
+    """Editors to try, in order: $VISUAL, $EDITOR, VSCode, notepad (Windows), nano/vi."""
+    import shlex
+    import shutil
+
+    commands = []
+    for var in ("VISUAL", "EDITOR"):
+        value = os.getenv(var)
+        if value:
+            commands.append(shlex.split(value, posix=os.name != "nt"))
+    commands.append(["code", "--wait"])
+    if os.name == "nt":
+        commands.append(["notepad"])
+    else:
+        commands += [["nano"], ["vi"]]
+
+    for argv in commands:
+        exe = shutil.which(argv[0]) if argv else None
+        if exe:
+            yield Editor([exe] + argv[1:])
+
+# Detected on first use and reused; editors that fail are skipped afterwards.
+_EDITOR = None
+_FAILED_EDITORS = set()
+
+def set_editor(editor):
+    """Force an editor (any object with edit_file(path) -> bool); None re-enables detection."""
+    global _EDITOR
+    _EDITOR = editor
+    _FAILED_EDITORS.clear()
+
+def get_editor():
+    global _EDITOR
+    if _EDITOR is None:
+        _EDITOR = next((e for e in _editor_candidates() if tuple(e.argv) not in _FAILED_EDITORS), None)
+    return _EDITOR
+
+# Private folder (mkdtemp: mode 0700, unpredictable name) holding the files
+# handed to the editor; created on first use, removed by remove_editor_files().
+_EDIT_DIR = None
+
+def get_editor_file(entry_key=None):
+    """One temp file per entry (e.g. the packed criteria code), reused across edit rounds."""
+    global _EDIT_DIR
+    if _EDIT_DIR is None or not os.path.isdir(_EDIT_DIR):
+        import atexit
+        import tempfile
+        _EDIT_DIR = tempfile.mkdtemp(prefix="sintese-")
+        atexit.register(remove_editor_files)
+    name = f"entrada_{entry_key}.txt" if entry_key is not None else "edicao.txt"
+    return os.path.join(_EDIT_DIR, name)
+
+def remove_editor_files():
+    """Delete the editor folder (texts may contain student names); called when a session ends."""
+    global _EDIT_DIR
+    if _EDIT_DIR is not None:
+        import shutil
+        shutil.rmtree(_EDIT_DIR, ignore_errors=True)
+        _EDIT_DIR = None
+
+def open_text_in_editor(text, entry_key=None):
+    """
+    Open text in an editor ($VISUAL/$EDITOR -> VSCode -> notepad/nano) and return the edited text.
+    Returns None if no editor works.
+    """
+    global _EDITOR
+    path = get_editor_file(entry_key)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+    while True:
+        editor = get_editor()
+        if editor is None:
+            print("✗ Nenhum editor disponível (defina EDITOR, ou instale VSCode, notepad ou nano)")
+            return None
+        try:
+            ok = editor.edit_file(path)
+        except OSError:
+            ok = False
+        if ok:
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        print(f"⚠ O editor '{editor.name}' falhou; a tentar outro...")
+        _FAILED_EDITORS.add(tuple(getattr(editor, "argv", ())))
+        _EDITOR = None
+
+INLINE_EDIT_HELP = """Edição rápida:
+  antigo => novo   substituir um excerto
+  + frase          acrescentar no fim
+  = texto          substituir o texto todo
+  e                abrir o editor completo
+  ENTER            terminar"""
+
+def edit_text_inline(text, entry_key=None):
+    """
+    Small in-terminal editor for quick fixes, so a one-word change does not
+    need an editor process. Returns the edited text.
+    """
+    print(INLINE_EDIT_HELP)
+    while True:
+        command = input("> ").strip()
+        if not command:
+            return text
+        if command == "e":
+            edited = open_text_in_editor(text, entry_key)
+            return text if edited is None else edited
+        if command.startswith("="):
+            text = command[1:].strip()
+        elif command.startswith("+"):
+            text = text.rstrip() + " " + command[1:].strip()
+        elif "=>" in command:
+            old, new = (part.strip() for part in command.split("=>", 1))
+            if not old or old not in text:
+                print(f"✗ Excerto não encontrado: {old!r}")
+                continue
+            text = text.replace(old, new)
+        else:
+            print("✗ Comando não reconhecido.")
+            print(INLINE_EDIT_HELP)
+            continue
+        print(f"\n{text}\n")
+
+def validate_text(text):
+    """Validate edited text. Returns (valid, message)."""
+    text = text.strip()
+    if not text:
+        return False, "✗ Texto não pode estar vazio."
+    if len(text) < 10:
+        return False, "✗ Texto demasiado curto. Mínimo 10 caracteres."
+    return True, "✓ Texto validado com sucesso."
+
+def ask_edit_confirmation():
+    """Ask if user wants to edit the text."""
+    return bool(ask_yesno("Deseja editar este texto?"))
+
+def ask_edit_mode(raw=False):
+    """Ask if and how to edit: None, 'editor' or 'inline' (quick in-terminal edit)."""
+    if raw:
+        return ask_key("Deseja editar este texto? (s/n, r = edição rápida) ", {
+            "s": ("editor", "sim"), "y": ("editor", "sim"),
+            "n": (None, "não"), "\r": (None, "não"), "\n": (None, "não"),
+            "r": ("inline", "edição rápida"),
+        })
+    while True:
+        v = input("Deseja editar este texto? (s/n, r = edição rápida): ").strip().lower()
+        if v in ("y", "yes", "s", "sim"):
+            return "editor"
+        if v in ("r", "rapida", "rápida"):
+            return "inline"
+        if v in ("n", "no"):
+            return None
+        print("Resposta inválida — escreva s, n ou r.")
+
+def ask_satisfaction():
+    """Ask if user is satisfied with the edited text."""
+    return bool(ask_yesno("Satisfeito com a edição?"))
+
+# Edits to base.json are appended to "<base.json>.journal" (one JSON object per
+# line) instead of rewriting the whole file; the journal is folded back into
+# base.json by compact_json_journal() once it grows past this size.
+JSON_JOURNAL_SUFFIX = ".journal"
+JSON_JOURNAL_MAX_BYTES = 256 * 1024
+
+def get_json_journal_path(json_path):
+    return json_path + JSON_JOURNAL_SUFFIX
+
+def read_json_journal(json_path):
+    """
+    Return the journaled edits as a list of entries. A torn last line (crash
+    during an append) is ignored.
+    """
+    import json
+
+    journal_path = get_json_journal_path(json_path)
+    if not os.path.exists(journal_path):
+        return []
+    records = []
+    with open(journal_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+def append_lines(path, data):
+    """
+    Append data (whole lines, bytes) to path with a single fsync. A torn last
+    line left by a crash is cut off first, so the new lines are not glued to it.
+    """
+    with open(path, "a+b") as f:
+        end = size = f.seek(0, os.SEEK_END)
+        while end:
+            start = max(0, end - 4096)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end != size:
+            f.truncate(end)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+def append_json_edit(json_path, criteria, new_text):
+    """Durably append one edit to the journal; writes a single short line."""
+    return append_json_edits(json_path, [(criteria, new_text)])
+
+def append_json_edits(json_path, edits):
+    """Append [(criteria, new_text), ...] to the journal with a single fsync."""
+    import json
+
+    lines = []
+    for criteria, new_text in edits:
+        record = {field: criteria[field] for field in CRITERIA_FIELDS}
+        if criteria.get("Variante"):
+            record["Variante"] = criteria["Variante"]
+        record["Texto"] = new_text
+        lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+    data = "".join(lines).encode("utf-8")
+    append_lines(get_json_journal_path(json_path), data)
+    return len(data)
+
+def load_json_entries(json_path):
+    """base.json with the journal applied on top (last edit per combination and variant wins)."""
+    import json
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    journal = read_json_journal(json_path)
+    if not journal:
+        return data
+
+    index = {}
+    for pos, item in enumerate(data):
+        index.setdefault(json_entry_key(item), pos)
+    for record in journal:
+        key = json_entry_key(record)
+        pos = index.get(key)
+        if pos is None:
+            index[key] = len(data)
+            data.append(record)
+        else:
+            data[pos] = dict(data[pos], Texto=record["Texto"])
+    return data
+
+def write_file_atomic(path, content):
+    """
+    Write to a temp file next to path, fsync it and swap it in with os.replace().
+    The result keeps path's permissions (a new file gets the usual umask ones,
+    not mkstemp's 0600), so colleagues sharing the folder can still read it.
+    """
+    import shutil
+    import tempfile
+
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=folder)
+    try:
+        if isinstance(content, bytes):
+            f = os.fdopen(fd, "wb")
+        else:
+            f = os.fdopen(fd, "w", encoding="utf-8")
+        with f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def compact_json_journal(json_path):
+    """
+    Fold the journal into base.json with an atomic rewrite, then drop the
+    journal. Replaying a journal twice is harmless, so a crash between the two
+    steps loses nothing. Returns the number of journaled edits applied.
+    """
+    import json
+
+    journal = read_json_journal(json_path)
+    if not journal:
+        return 0
+    data = load_json_entries(json_path)
+    write_file_atomic(json_path, json.dumps(data, ensure_ascii=False, indent=2))
+    os.unlink(get_json_journal_path(json_path))
+    return len(journal)
+
+def update_entry_in_json_and_db(db_path, json_path, criteria, new_text, expected=None):
+    """
+    Update an entry in both JSON and database.
+    criteria = {Genero, Assiduidade, Pontualidade, Participacao, Interesse, Empenho, Dificuldades}
+
+    The DB row (or gender template, see write_text) is updated through the
+    criteria index. Only once that commit succeeds does the JSON side get one
+    journal line per rendering written, in a single append (see
+    append_json_edits), so a failed commit leaves nothing in the journal. If
+    the append itself fails the DB keeps the edit and the error is reported.
+    """
+    try:
+        conn = connect_db(db_path)
+        try:
+            ensure_schema(conn)
+            written = write_text(conn, criteria, new_text, expected=expected)
+            if not written:
+                conn.rollback()
+                print("✗ Entrada não encontrada na base de dados")
+                return False
+            conn.commit()
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"✗ Erro ao atualizar base de dados: {e}")
+        return False
+
+    for entry, texto in written:
+        _remember_text(db_path, entry, texto)
+    try:
+        append_json_edits(json_path, written)
+    except Exception as e:
+        print(f"✗ Erro ao atualizar JSON (base.db já foi atualizada): {e}")
+        return False
+
+    print("✓ Texto atualizado com sucesso em base.json e base.db" + _genders_note(written))
+
+    try:
+        if os.path.getsize(get_json_journal_path(json_path)) > JSON_JOURNAL_MAX_BYTES:
+            compact_json_journal(json_path)
+    except Exception as e:
+        # The edit is already durable in the journal; compaction can be retried later.
+        print(f"⚠ Não foi possível compactar o diário de base.json: {e}")
+    return True
+
+
+def _genders_note(written):
+    return " (ambos os géneros)" if len(written) > 1 else ""
+
+def update_entry_in_db(db_path, criteria, new_text, expected=None):
+    """Update the Texto field in the database only (no JSON changes)."""
+    try:
+        conn = connect_db(db_path)
+        try:
+            ensure_schema(conn)
+            written = write_text(conn, criteria, new_text, expected=expected)
+            conn.commit()
+        finally:
+            conn.close()
+
+        if written:
+            for entry, texto in written:
+                _remember_text(db_path, entry, texto)
+            print("✓ Texto atualizado com sucesso em base.db" + _genders_note(written))
+            return True
+        else:
+            print("✗ Entrada não encontrada na base de dados")
+            return False
+
+    except Exception as e:
+        print(f"✗ Erro ao atualizar base de dados: {e}")
+        return False
+
+def list_variants(db_path, criteria):
+    """[(variante, texto), ...] for a criteria tuple, in variant order."""
+    conn = connect_db(db_path)
+    try:
+        migrate_db(conn)
+        table = TextTable.from_connection(conn)
+    finally:
+        conn.close()
+    code = pack_criteria(*criteria)
+    if code in table.variants:
+        return list(table.variants[code])
+    return [] if table.slots[code] is None else [(0, table.slots[code])]
+
+def add_variant(db_path, json_path, criteria, new_text):
+    """
+    Add a new variant for a criteria tuple to base.db and the base.json journal
+    (so `sintese sync` keeps it). Returns the new Variante number.
+    """
+    conn = connect_db(db_path)
+    try:
+        migrate_db(conn)
+        with conn:
+            variante = conn.execute(
+                f"SELECT COALESCE(MAX(Variante), -1) + 1 FROM (SELECT Variante FROM sinteses "
+                f"WHERE {CRITERIA_WHERE_SQL} UNION ALL SELECT Variante FROM templates "
+                f"WHERE {TEMPLATE_FLAGS_WHERE_SQL})",
+                tuple(criteria) + tuple(criteria[1:]),
+            ).fetchone()[0]
+            conn.execute(UPSERT_VARIANT_SQL, (new_text,) + tuple(criteria) + (variante,))
+            append_json_edit(json_path, dict(zip(CRITERIA_FIELDS, criteria), Variante=variante), new_text)
+    finally:
+        conn.close()
+    forget_text_table(db_path)
+    return variante
+
+SEARCH_MARKS = ("[", "]")
+SEARCH_TTY_MARKS = ("\x1b[1;33m", "\x1b[0m")
+SEARCH_SNIPPET_TOKENS = 16
+
+def has_fts(conn):
+    """True when the v5 full-text index exists (SQLite built with FTS5)."""
+    return conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN (?)",
+        tuple(fts for fts, _, _ in FTS_TABLES),
+    ).fetchone()[0] == len(FTS_TABLES)
+
+def fts_phrase(phrase):
+    """An FTS5 query matching phrase as a whole (quotes doubled, no operators)."""
+    return '"' + phrase.replace('"', '""') + '"'
+
+def _phrase_pattern(phrase):
+    """
+    Regex for phrase as whole words, ignoring case and accents like the FTS5
+    index (remove_diacritics): "assidua" matches "Assídua".
+    """
+    import re
+    import unicodedata
+
+    accented = {}
+    for code in range(0xC0, 0x250):
+        base = unicodedata.normalize("NFD", chr(code))[0]
+        if base != chr(code) and base.isascii() and base.isalpha():
+            accented.setdefault(base.lower(), []).append(chr(code))
+    parts = []
+    for ch in phrase.strip():
+        base = unicodedata.normalize("NFD", ch)[0].lower()
+        if ch.isspace():
+            if parts[-1] != r"\s+":
+                parts.append(r"\s+")
+        elif base in accented:
+            parts.append("[" + base + "".join(accented[base]) + "]")
+        else:
+            parts.append(re.escape(ch))
+    pattern = "".join(parts)
+    if phrase.strip()[:1].isalnum():
+        pattern = r"\b" + pattern
+    if phrase.strip()[-1:].isalnum():
+        pattern += r"\b"
+    return re.compile(pattern, re.IGNORECASE)
+
+def _scan_snippet(texto, pattern, marks):
+    return pattern.sub(lambda m: marks[0] + m.group(0) + marks[1], texto)
+
+RENDERINGS_FTS = "temp.template_renderings_fts"
+
+def _template_matches(conn, query, marks, raw):
+    """
+    search_texts() rows for templates, matched on their M and F renderings (in
+    a temporary FTS5 table with the index's tokenizer, or by scanning) that no
+    sinteses row overrides. A template matching in both renderings is one row with '*' as the gender and
+    the template as text; otherwise the row is for the gender that matched.
+    """
+    import re
+
+    # A sinteses row for the same gender overrides the rendering, which lookups then never show
+    overridden = set(conn.execute(
+        "SELECT Genero, " + ", ".join(TEMPLATE_FIELDS) + ", Variante FROM sinteses"
+    ))
+    renderings = []
+    for template_id, template, *flags, variante in conn.execute(
+        "SELECT id, Template, " + ", ".join(TEMPLATE_FIELDS) + ", Variante FROM templates"
+    ):
+        for genero in GENDER_BITS:
+            if (genero, *flags, variante) in overridden:
+                continue
+            renderings.append((template_id, genero, tuple(flags), variante, template,
+                               render_template(template, genero)))
+    hits = []
+    if has_fts(conn):
+        sql = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = ?", (FTS_TABLES[0][0],)
+        ).fetchone()[0]
+        tokenizer = re.search(r"tokenize='([^']*)'", sql).group(1)
+        started = not conn.in_transaction
+        conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {RENDERINGS_FTS} USING fts5(Texto, tokenize='{tokenizer}')")
+        conn.execute(f"DELETE FROM {RENDERINGS_FTS}")
+        conn.executemany(f"INSERT INTO {RENDERINGS_FTS} (rowid, Texto) VALUES (?, ?)",
+                         [(i, rendering[-1]) for i, rendering in enumerate(renderings)])
+        hits = conn.execute(
+            f"SELECT rowid, snippet(template_renderings_fts, 0, ?, ?, '…', ?) FROM {RENDERINGS_FTS} "
+            f"WHERE template_renderings_fts MATCH ? ORDER BY rank",
+            marks + (SEARCH_SNIPPET_TOKENS, query if raw else fts_phrase(query)),
+        ).fetchall()
+        if started:
+            conn.commit()
+    else:
+        pattern = _phrase_pattern(query)
+        hits = [(i, _scan_snippet(rendering[-1], pattern, marks))
+                for i, rendering in enumerate(renderings) if pattern.search(rendering[-1])]
+
+    matched = {}  # template id -> [(genero, snippet, rendering), ...], in rank order
+    for i, snippet in hits:
+        template_id, genero, flags, variante, template, rendering = renderings[i]
+        matched.setdefault((template_id, flags, variante, template), []).append((genero, snippet, rendering))
+    rows = []
+    for (template_id, flags, variante, template), genders in matched.items():
+        genero, snippet, rendering = genders[0]
+        if len(genders) == len(GENDER_BITS):
+            genero, rendering = "*", template
+        rows.append(("templates", template_id, genero) + flags + (variante, snippet, rendering))
+    return rows
+
+def search_texts(conn, query, marks=SEARCH_MARKS, raw=False):
+    """
+    Texts matching query, best first: [(table, row_id, code, variante, snippet, texto), ...].
+
+    query is a phrase (raw=True passes FTS5 syntax through). Templates are
+    matched on their renderings (see _template_matches). Without FTS5 the
+    texts are scanned for the phrase instead (raw queries need FTS5).
+    """
+    migrate_db(conn)
+    flags = ", ".join("t." + f for f in TEMPLATE_FIELDS)
+    matches = []
+    if has_fts(conn):
+        match = query if raw else fts_phrase(query)
+        for fts, table, column in FTS_TABLES:
+            matches += conn.execute(
+                f"SELECT '{table}', t.id, t.Genero, {flags}, t.Variante, "
+                f"snippet({fts}, 0, ?, ?, '…', ?), t.{column} "
+                f"FROM {fts} JOIN {table} t ON t.id = {fts}.rowid "
+                f"WHERE {fts} MATCH ? ORDER BY rank",
+                marks + (SEARCH_SNIPPET_TOKENS, match),
+            ).fetchall()
+    elif raw:
+        raise ValueError("pesquisa avançada indisponível: este SQLite não tem FTS5")
+    else:
+        pattern = _phrase_pattern(query)
+        for row in conn.execute(f"SELECT 'sinteses', t.id, t.Genero, {flags}, t.Variante, t.Texto FROM sinteses t"):
+            if pattern.search(row[-1]):
+                matches.append(row[:-1] + (_scan_snippet(row[-1], pattern, marks), row[-1]))
+    matches += _template_matches(conn, query, marks, raw)
+    return [(table, row_id, format_code(key), variante, snippet, texto)
+            for table, row_id, *key, variante, snippet, texto in matches]
+
+def replace_phrase_in(texto, phrase, replacement):
+    """
+    texto with every occurrence of phrase (whole words, ignoring case and
+    accents) replaced. An occurrence starting with a capital (start of a
+    sentence) keeps it.
+    """
+    def sub(m):
+        if m.group(0)[:1].isupper():
+            return replacement[:1].upper() + replacement[1:]
+        return replacement
+    return _phrase_pattern(phrase).sub(sub, texto)
+
+def replace_phrase(conn, phrase, replacement, dry_run=False):
+    """
+    Replace phrase in every matching text of sinteses and templates in one
+    transaction. A template is edited through its renderings: when the new
+    M and F texts still fold (fold_pair) the template changes, otherwise each
+    changed gender gets its own row overriding it. Returns [(code, variante,
+    before, after), ...]; nothing is written when dry_run is set or any result
+    fails validate_text() (ValueError).
+    """
+    changes = []
+    for table, row_id, code, variante, _, texto in search_texts(conn, phrase):
+        if table == "sinteses":
+            after = replace_phrase_in(texto, phrase, replacement)
+            if after != texto:
+                changes.append((table, row_id, code, variante, texto, after))
+            continue
+        template = conn.execute("SELECT Template FROM templates WHERE id = ?", (row_id,)).fetchone()[0]
+        before = {genero: render_template(template, genero) for genero in GENDER_BITS}
+        after = {genero: replace_phrase_in(text, phrase, replacement) for genero, text in before.items()}
+        folded = fold_pair(after["M"], after["F"])[0]
+        if folded is not None:
+            if folded != template:
+                changes.append((table, row_id, "*" + code[1:], variante, template, folded))
+            continue
+        for genero in GENDER_BITS:
+            if after[genero] != before[genero]:
+                changes.append(("sinteses", None, genero + code[1:], variante, before[genero], after[genero]))
+    for _, _, code, variante, _, after in changes:
+        valid, message = validate_text(after)
+        if not valid:
+            raise ValueError(f"{code}[{variante}]: {message}")
+    if changes and not dry_run:
+        with conn:
+            for table, column in TEXT_COLUMNS:
+                conn.executemany(
+                    f"UPDATE {table} SET {column} = ? WHERE id = ?",
+                    [(after, row_id) for t, row_id, _, _, _, after in changes
+                     if t == table and row_id is not None],
+                )
+            history = [change for change in changes if change[1] is not None]
+            for _, row_id, code, variante, _, after in changes:
+                if row_id is None:
+                    cursor = conn.execute(UPSERT_VARIANT_SQL, (after,) + parse_code(code) + (variante,))
+                    history.append(("sinteses", cursor.lastrowid, code, variante, None, after))
+            record_history(conn, history)
+    return [(code, variante, before, after) for _, _, code, variante, before, after in changes]
+
+def replacement_edits(changes):
+    """base.json journal edits for replace_phrase() results (both renderings of a template)."""
+    edits = []
+    for code, variante, _, after in changes:
+        genders = GENDER_BITS if code[0] == "*" else (code[0],)
+        for genero in genders:
+            criteria = dict(zip(CRITERIA_FIELDS, parse_code(genero + code[1:])), Variante=variante)
+            edits.append((criteria, after if code[0] != "*" else render_template(after, genero)))
+    return edits
+
+# Patch files: one edit per line, "CODE new text" or "CODE s/regex/replacement/[gi]".
+# CODE is F110101, F110101[1] for a variant, or *110101 for a gender template;
+# blank lines and lines starting with # are ignored.
+PATCH_FLAGS = "gi"
+
+def _split_substitution(expr):
+    """'s/a/b/g' -> ('a', 'b', 'g'); any delimiter after 's', escaped with a backslash."""
+    delim = expr[1]
+    parts, current, i = [], [], 2
+    while i < len(expr):
+        c = expr[i]
+        if c == "\\" and i + 1 < len(expr) and expr[i + 1] == delim:
+            current.append(delim)
+            i += 2
+            continue
+        if c == delim:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(c)
+        i += 1
+    parts.append("".join(current))
+    if len(parts) != 3 or any(f not in PATCH_FLAGS for f in parts[2]):
+        raise ValueError(f"substituição inválida: {expr!r} (esperado s/regex/novo/[gi])")
+    return parts
+
+def parse_patch_line(line):
+    """
+    (code, variante, edit) for one patch line, or None for blank/comment lines.
+    edit is a function from the current text to the new one. Raises ValueError.
+    """
+    import re
+
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    code, _, rest = line.partition(" ")
+    rest = rest.strip()
+    variante = 0
+    match = re.fullmatch(r"(.+)\[(\d+)\]", code)
+    if match:
+        code, variante = match.group(1), int(match.group(2))
+    if code.startswith("*"):
+        parse_code("M" + code[1:])
+    else:
+        code = format_code(parse_code(code))
+    if not rest:
+        raise ValueError(f"{code}: falta o texto")
+    if len(rest) > 2 and rest[0] == "s" and not rest[1].isalnum() and not rest[1].isspace():
+        pattern, replacement, flags = _split_substitution(rest)
+        try:
+            regex = re.compile(pattern, re.IGNORECASE if "i" in flags else 0)
+        except re.error as e:
+            raise ValueError(f"{code}: expressão regular inválida: {e}")
+        count = 0 if "g" in flags else 1
+        return code, variante, lambda texto: regex.sub(replacement, texto, count=count)
+    return code, variante, lambda texto: rest
+
+def read_patch(lines):
+    """[(line_number, code, variante, edit), ...]; every bad line is reported in one ValueError."""
+    edits, errors = [], []
+    for number, line in enumerate(lines, 1):
+        try:
+            parsed = parse_patch_line(line)
+        except ValueError as e:
+            errors.append(f"linha {number}: {e}")
+            continue
+        if parsed is not None:
+            edits.append((number,) + parsed)
+    if errors:
+        raise ValueError("\n".join(errors))
+    return edits
+
+def apply_patch(conn, edits, dry_run=False):
+    """
+    Apply read_patch() edits in one transaction: all texts are read with one
+    query per table, edited in memory and written with executemany. A gender
+    code backed by a template gets its own row for that gender (see
+    write_text); only a *code edits the template, i.e. both genders. Every
+    result must pass validate_text(), else nothing is written (ValueError).
+    A dry run only reads, in a deferred transaction that never blocks writers.
+    Returns [(code, variante, before, after), ...].
+    """
+    import re
+
+    fields = ", ".join(TEMPLATE_FIELDS)
+    conn.execute("BEGIN" if dry_run else "BEGIN IMMEDIATE")
+    try:
+        rows = {}
+        for row_id, texto, genero, *flags, variante in conn.execute(
+            f"SELECT id, Texto, Genero, {fields}, Variante FROM sinteses"
+        ):
+            rows.setdefault((format_code((genero,) + tuple(flags)), variante), ("sinteses", row_id, texto))
+        for row_id, template, *flags, variante in conn.execute(
+            f"SELECT id, Template, {fields}, Variante FROM templates"
+        ):
+            rows[(format_code(("*",) + tuple(flags)), variante)] = ("templates", row_id, template)
+
+        # key -> (table, row_id, before, after); row_id None is a row to insert
+        targets, order, errors = {}, [], []
+        for number, code, variante, edit in edits:
+            key = (code, variante)
+            template_key = ("*" + code[1:], variante)
+            if key in targets:
+                table, row_id, before, texto = targets[key]
+            elif key in rows:
+                table, row_id, texto = rows[key]
+                before = texto
+            elif code[0] != "*" and template_key in rows:
+                # This gender only: a new row that overrides the template's rendering
+                template = targets[template_key][3] if template_key in targets else rows[template_key][2]
+                table, row_id = "sinteses", None
+                before = texto = render_template(template, code[0])
+            else:
+                errors.append(f"linha {number}: {code}[{variante}] não existe na base de dados")
+                continue
+            try:
+                after = edit(texto)
+            except re.error as e:
+                errors.append(f"linha {number}: {e}")
+                continue
+            valid, message = validate_text(after)
+            if not valid:
+                errors.append(f"linha {number}: {code}[{variante}]: {message}")
+                continue
+            if key not in targets:
+                order.append(key)
+            targets[key] = (table, row_id, before, after)
+        if errors:
+            raise ValueError("\n".join(errors))
+
+        changes = [(table, row_id, code, variante, before, after)
+                   for code, variante in order
+                   for table, row_id, before, after in [targets[(code, variante)]]
+                   if after != before]
+        if dry_run:
+            conn.rollback()
+        else:
+            for table, column in TEXT_COLUMNS:
+                conn.executemany(
+                    f"UPDATE {table} SET {column} = ? WHERE id = ?",
+                    [(after, row_id) for t, row_id, _, _, _, after in changes
+                     if t == table and row_id is not None],
+                )
+            history = [change for change in changes if change[1] is not None]
+            for _, row_id, code, variante, _, after in changes:
+                if row_id is None:
+                    cursor = conn.execute(UPSERT_VARIANT_SQL, (after,) + parse_code(code) + (variante,))
+                    history.append(("sinteses", cursor.lastrowid, code, variante, None, after))
+            record_history(conn, history)
+            conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return [(code, variante, before, after) for _, _, code, variante, before, after in changes]
+
+def json_entry_criteria(item):
+    """Criteria tuple of a base.json entry (accepts both Participacao and Participação)."""
+    participacao = item.get("Participacao") if item.get("Participacao") is not None else item.get("Participação")
+    return (item.get("Genero"), item.get("Assiduidade"), item.get("Pontualidade"), participacao,
+            item.get("Interesse"), item.get("Empenho"), item.get("Dificuldades"))
+
+def json_entry_key(item):
+    """Criteria plus Variante (0 when absent): what identifies one row of sinteses."""
+    return json_entry_criteria(item) + (item.get("Variante") or 0,)
+
+def _text_digest(texto):
+    import hashlib
+    return hashlib.blake2b((texto or "").encode("utf-8"), digest_size=16).digest()
+
+def _file_digest(path):
+    import hashlib
+
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def sync_json_to_db(json_path, db_path, prune=True):
+    """
+    Bring base.db up to date with base.json, writing only what changed.
+
+    An unchanged base.json (same size/mtime or same content digest as the last
+    sync) is detected without parsing it. Otherwise each entry's text digest is
+    compared with the row for the same criteria and with the text as last
+    synced (sync_base): only entries changed in base.json are upserted, and a
+    text changed in base.db since the last sync (or, before any sync, one with
+    edit history) is left alone. Rows that base.json dropped are deleted the
+    same way unless prune=False. All writes happen in one transaction and are
+    recorded in sinteses_history. Returns counts for inserted/updated/unchanged/
+    deleted rows and rows kept because they were edited in base.db.
+    Raises FileNotFoundError when base.json does not exist.
+    """
+    if not os.path.exists(json_path):
+        raise FileNotFoundError(f"base.json não encontrado em: {json_path}")
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0, "kept": 0}
+    conn = connect_db(db_path)
+    try:
+        migrate_db(conn)
+        source_key = "json:" + os.path.abspath(json_path)
+        sources = [json_path, get_json_journal_path(json_path)]
+        stats = [os.stat(p) if os.path.exists(p) else None for p in sources]
+        size = "+".join(str(st.st_size) if st else "-" for st in stats)
+        mtime = "+".join(str(st.st_mtime_ns) if st else "-" for st in stats)
+        row = conn.execute("SELECT value FROM sync_state WHERE key = ?", (source_key,)).fetchone()
+        last_size, last_mtime, last_digest = row[0].split(":") if row else ("", "", "")
+        # Same sizes and mtimes: trust them without reading the files. Otherwise
+        # the content digest decides (a touched but identical file is still a no-op).
+        if (last_size, last_mtime) == (size, mtime):
+            file_digest = last_digest
+        else:
+            file_digest = "+".join(_file_digest(p) for p, st in zip(sources, stats) if st)
+        state = f"{size}:{mtime}:{file_digest}"
+        if row and file_digest == last_digest:
+            if row[0] != state:
+                with conn:
+                    conn.execute("UPDATE sync_state SET value = ? WHERE key = ?", (state, source_key))
+            counts["unchanged"] = conn.execute(
+                "SELECT (SELECT COUNT(*) FROM sinteses) + 2 * (SELECT COUNT(*) FROM templates)"
+            ).fetchone()[0]
+            return counts
+
+        data = load_json_entries(json_path)
+
+        existing = {}
+        for row_id, texto, *key in conn.execute(
+            "SELECT id, Texto, " + ", ".join(CRITERIA_FIELDS) + ", Variante FROM sinteses"
+        ):
+            existing[tuple(key)] = (row_id, texto)
+        # Texts rendered from gender templates count as existing too: an
+        # unchanged rendering is left alone, a changed one becomes a row for
+        # that gender (which overrides the template).
+        rendered, templates = {}, {}
+        for template_id, template, *key in conn.execute(
+            "SELECT id, Template, " + ", ".join(TEMPLATE_FIELDS) + ", Variante FROM templates"
+        ):
+            templates[template_id] = (format_code(("*",) + tuple(key[:-1])), key[-1], template)
+            for genero in GENDER_BITS:
+                rendered[(genero,) + tuple(key)] = (template_id, render_template(template, genero))
+        base = {(code, variante): digest for code, variante, digest in conn.execute(
+            "SELECT Codigo, Variante, Digest FROM sync_base"
+        )}
+        edited = {(code, variante) for code, variante in conn.execute(
+            "SELECT DISTINCT Codigo, Variante FROM sinteses_history"
+        )}
+
+        def current_text(key):
+            if key in existing:
+                return existing[key][1]
+            return rendered[key][1] if key in rendered else None
+
+        def changed_in_db(key, code):
+            """base.db no longer holds the text last synced (or, never synced, was edited)."""
+            if (code, key[-1]) in base:
+                current = current_text(key)
+                return (_text_digest(current) if current is not None else None) != base[(code, key[-1])]
+            return current_text(key) is not None and bool(
+                {(code, key[-1]), ("*" + code[1:], key[-1])} & edited)
+
+        upserts, new_base = [], {}
+        seen = set()
+        for item in data:
+            key = json_entry_key(item)
+            if key in seen:
+                continue  # first entry per combination and variant wins, as in lookups
+            seen.add(key)
+            texto = item.get("Texto")
+            code = format_code(key[:-1])
+            digest = _text_digest(texto)
+            current = current_text(key)
+            if current is not None and _text_digest(current) == digest:
+                counts["unchanged"] += 1
+            elif base.get((code, key[-1])) == digest or changed_in_db(key, code):
+                counts["kept"] += 1  # edited in base.db; base.json did not change it since
+            else:
+                counts["updated" if current is not None else "inserted"] += 1
+                upserts.append((texto,) + key)
+            new_base[(code, key[-1])] = digest
+
+        def prunable(key):
+            return not changed_in_db(key, format_code(key[:-1]))
+
+        missing = [key for key in existing if key not in seen]
+        stale = [key for key in missing if prunable(key)]
+        # A template goes only when neither of its renderings is in the JSON
+        # and neither was changed in base.db since the last sync
+        seen_templates = {tid for key, (tid, _) in rendered.items() if key in seen}
+        orphans = {tid for tid, _ in rendered.values() if tid not in seen_templates}
+        held = {tid for key, (tid, _) in rendered.items() if tid in orphans and not prunable(key)}
+        stale_templates = sorted(orphans - held)
+        if prune:
+            counts["deleted"] = len(stale) + 2 * len(stale_templates)
+            counts["kept"] += len(missing) - len(stale) + 2 * len(held)
+        else:
+            counts["unchanged"] += len(missing) + 2 * len(orphans)
+            stale, stale_templates = [], []
+
+        history = []
+        with conn:
+            for texto, *key in upserts:
+                conn.execute(UPSERT_VARIANT_SQL, [texto] + key)
+                row_id = conn.execute(SELECT_ROW_SQL, key).fetchone()[0]
+                before = existing[tuple(key)][1] if tuple(key) in existing else None
+                history.append(("sinteses", row_id, format_code(key[:-1]), key[-1], before, texto))
+            for key in stale:
+                row_id, texto = existing[key]
+                conn.execute("DELETE FROM sinteses WHERE id = ?", (row_id,))
+                history.append(("sinteses", row_id, format_code(key[:-1]), key[-1], texto, None))
+            for tid in stale_templates:
+                code, variante, template = templates[tid]
+                conn.execute("DELETE FROM templates WHERE id = ?", (tid,))
+                history.append(("templates", tid, code, variante, template, None))
+            record_history(conn, history)
+            gone = [(format_code(key[:-1]), key[-1]) for key in stale]
+            gone += [(genero + code[1:], variante) for code, variante, _ in map(templates.get, stale_templates)
+                     for genero in GENDER_BITS]
+            conn.executemany("DELETE FROM sync_base WHERE Codigo = ? AND Variante = ?", gone)
+            conn.executemany(
+                "INSERT OR REPLACE INTO sync_base (Codigo, Variante, Digest) VALUES (?, ?, ?)",
+                [(code, variante, digest) for (code, variante), digest in new_base.items()
+                 if base.get((code, variante)) != digest],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)",
+                (source_key, state),
+            )
+    finally:
+        conn.close()
+
+    if counts["inserted"] or counts["updated"] or counts["deleted"]:
+        forget_text_table(db_path)
+    return counts
+
+PENDING_EDITS_SUFFIX = ".pending"
+FLUSH_EDITS = 20
+FLUSH_SECONDS = 60
+
+def get_pending_edits_path(db_path):
+    return db_path + PENDING_EDITS_SUFFIX
+
+class EditQueue:
+    """
+    Write-behind buffer for session edits. Each edit is appended durably to
+    base.db.pending (one JSON line) and the queued edits are applied to base.db
+    together in one transaction by flush(): at session end, after
+    SINT_FLUSH_SECONDS or once SINT_FLUSH_EDITS are waiting. A journal left
+    behind by a crash is loaded again on the next start. Edits that conflict
+    with a colleague's change stay queued (and journaled) until resolve().
+    """
+
+    def __init__(self, db_path, max_edits=None, max_seconds=None):
+        self.path = get_pending_edits_path(db_path)
+        self.max_edits = _env_int("SINT_FLUSH_EDITS", FLUSH_EDITS) if max_edits is None else max_edits
+        self.max_seconds = _env_int("SINT_FLUSH_SECONDS", FLUSH_SECONDS) if max_seconds is None else max_seconds
+        # [(criteria, text, both_genders, expected), ...] in the order they were made
+        self.pending = []
+        # [(edit, current version), ...] left in pending by the last flush()
+        self.conflicts = []
+        self.since = None
+        self.flushed = 0
+        self.flushes = 0
+        self.recovered = self._load()
+
+    @staticmethod
+    def _key(criteria):
+        return tuple(criteria[f] for f in CRITERIA_FIELDS) + (criteria.get("Variante", 0),)
+
+    def _queue(self, criteria, text, both_genders, expected):
+        self.pending.append((criteria, text, both_genders, expected))
+        if self.since is None:
+            self.since = time.monotonic()
+
+    def _load(self):
+        import json
+
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn last line
+                expected = tuple(record["versao"]) if record.get("versao") else None
+                self._queue(record["criteria"], record["texto"], record.get("ambos", True), expected)
+        return len(self.pending)
+
+    def __len__(self):
+        return len(self.pending)
+
+    @staticmethod
+    def _line(criteria, text, both_genders, expected):
+        import json
+
+        record = {"criteria": dict(criteria), "texto": text, "ambos": both_genders,
+                  "versao": list(expected) if expected else None}
+        return json.dumps(record, ensure_ascii=False) + "\n"
+
+    def add(self, criteria, text, both_genders=True, expected=None):
+        """Journal one edit (fsync'd) and queue it."""
+        append_lines(self.path, self._line(criteria, text, both_genders, expected).encode("utf-8"))
+        self._queue(dict(criteria), text, both_genders, expected)
+
+    def _rewrite(self):
+        """Make the journal hold exactly the queued edits (removed when there are none)."""
+        if self.pending:
+            write_file_atomic(self.path, "".join(self._line(*edit) for edit in self.pending))
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+
+    def resolve(self, overwrite):
+        """
+        Settle the conflicts left by flush(): overwrite(criteria, mine) -> True
+        re-queues the edit against the colleague's version (it replaces their
+        text at the next flush), False drops it, None leaves it undecided.
+        """
+        decided = {}
+        for edit, version in self.conflicts:
+            choice = overwrite(edit[0], edit[1])
+            if choice is not None:
+                decided[id(edit)] = (edit[:3] + (version,)) if choice else None
+        self.pending = [decided.get(id(edit), edit) for edit in self.pending]
+        self.pending = [edit for edit in self.pending if edit is not None]
+        self.conflicts = [(edit, version) for edit, version in self.conflicts if id(edit) not in decided]
+        self._rewrite()
+
+    def get(self, criteria):
+        """(version the first queued edit started from, latest queued text) for criteria, or None."""
+        key = self._key(criteria)
+        edits = [(expected, text) for c, text, _, expected in self.pending if self._key(c) == key]
+        return (edits[0][0], edits[-1][1]) if edits else None
+
+    def due(self):
+        return bool(self.pending) and (len(self.pending) >= self.max_edits
+                                       or time.monotonic() - self.since >= self.max_seconds)
+
+    def flush(self, conn):
+        """
+        Apply every queued edit in one transaction, each under a savepoint so
+        an edit whose text changed in base.db meanwhile is skipped without
+        losing the others. Written edits leave the journal; conflicting ones
+        stay in it (and in pending) until resolve(). Returns (written, conflicts):
+        [(criteria, text), ...] renderings written and [(criteria, mine, theirs), ...].
+        """
+        if not self.pending:
+            return [], []
+        written, conflicts, kept = [], [], []
+        # Edits queued from the same version of a row follow each other: after
+        # one is written, the next expects the version it produced (renamed),
+        # and after a conflict the rest are conflicts too (failed).
+        renamed, failed = {}, set()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for edit in self.pending:
+                criteria, text, both_genders, expected = edit
+                while expected in renamed:
+                    expected = renamed[expected]
+                if expected in failed:
+                    version, current = read_version(conn, criteria)
+                    conflicts.append((criteria, text, current))
+                    kept.append((edit, version))
+                    continue
+                conn.execute("SAVEPOINT edit")
+                try:
+                    written += write_text(conn, criteria, text, both_genders, expected)
+                    version = read_version(conn, criteria)[0]
+                    if expected is not None and version[:2] == expected[:2]:
+                        renamed[expected] = version
+                except EditConflict as conflict:
+                    conn.execute("ROLLBACK TO edit")
+                    # Replaying an edit that was committed just before a crash is not a conflict
+                    if conflict.current == text:
+                        renamed[expected] = conflict.version
+                    else:
+                        failed.add(expected)
+                        conflicts.append((criteria, text, conflict.current))
+                        kept.append((edit, conflict.version))
+                conn.execute("RELEASE edit")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        self.flushed += len(self.pending) - len(kept)
+        self.flushes += 1
+        self.pending = [edit for edit, _ in kept]
+        self.conflicts = kept
+        self.since = time.monotonic() if kept else None
+        self._rewrite()
+        return written, conflicts
+
+class Session:
+    """
+    State kept for a whole interactive session: the resolved DB/JSON paths,
+    one open sqlite3 connection (its statement cache keeps SELECT_TEXT_SQL and
+    UPDATE_TEXT_SQL prepared) and per-session counters.
+    """
+
+    def __init__(self, db_path=None, json_path=None, queue_clipboard=False, raw_keys=None,
+                 ask_names=False, article=True, write_behind=True):
+        self.db_path = db_path or get_database_path()
+        self.json_path = json_path or get_json_path()
+        self.conn = connect_db(self.db_path)
+        ensure_schema(self.conn)
+        self.table = None
+        # With a queue, texts are collected and copied together on request
+        self.clipboard_queue = ClipboardQueue() if queue_clipboard else None
+        # Single-keypress answers when the terminal allows it (None = detect)
+        self.raw_keys = raw_input_available() if raw_keys is None else raw_keys
+        self.last_criteria = None
+        # Ask each student's name and personalise the text with it
+        self.ask_names = ask_names
+        self.article = article
+        # Variants of the same combination are not repeated within a session
+        self.rotation = VariantRotation()
+        self.last_variant = 0
+        self.backed_up = False
+        self.students = 0
+        self.lookups = 0
+        self.lookup_seconds = 0.0
+        self.updates = 0
+        # Edits are journaled and committed in batches (write_behind=False: one by one)
+        self.write_behind = write_behind
+        self.edits = EditQueue(self.db_path)
+        if self.edits.recovered:
+            print(f"⚠ {self.edits.recovered} edições por gravar de uma sessão anterior recuperadas.")
+            self.flush_edits()
+
+    def get_table(self):
+        if self.table is None:
+            self.table = _TEXT_TABLES.get(self.db_path)
+            if self.table is None:
+                self.table = _TEXT_TABLES[self.db_path] = TextTable.from_connection(self.conn)
+                # Queued edits are not in base.db yet
+                for criteria, text, _, _ in self.edits.pending:
+                    _remember_text(self.db_path, criteria, text)
+        return self.table
+
+    def determined(self, criteria):
+        """Lookup for criteria whose trailing answers were skipped (None)."""
+        start = time.perf_counter()
+        answers = criteria[:criteria.index(None)]
+        texto = self.get_table().determined(answers)
+        self.last_variant = 0
+        self.lookup_seconds += time.perf_counter() - start
+        self.lookups += 1
+        return texto
+
+    def lookup(self, genero, assid, punt, part, inter, empen, diff):
+        start = time.perf_counter()
+        code = pack_criteria(genero, assid, punt, part, inter, empen, diff)
+        self.last_variant, texto = self.get_table().pick(code, self.rotation)
+        if texto is None:
+            row = self.conn.execute(
+                SELECT_TEXT_SQL, (genero, assid, punt, part, inter, empen, diff)
+            ).fetchone()
+            texto = row[0] if row else None
+        self.lookup_seconds += time.perf_counter() - start
+        self.lookups += 1
+        return texto
+
+    def journal_json(self, written):
+        """Append renderings written to base.db to the base.json journal, so a later sync keeps them."""
+        if not written:
+            return
+        try:
+            append_json_edits(self.json_path, written)
+        except OSError as e:
+            print(f"⚠ Erro ao atualizar o journal de base.json (base.db já foi atualizada): {e}")
+
+    def update(self, criteria, new_text, both_genders=True, expected=None):
+        """
+        Same contract as update_entry_in_db(), reusing the session connection.
+        EditConflict (expected no longer current) is raised for the caller to resolve.
+        With write_behind the edit is only journaled here; see flush_edits().
+        """
+        if self.write_behind:
+            try:
+                self.edits.add(criteria, new_text, both_genders, expected)
+            except OSError as e:
+                print(f"✗ Erro ao registar a edição: {e}")
+                return False
+            _remember_text(self.db_path, criteria, new_text)
+            try:
+                other = self.other_gender_preview(criteria, new_text) if both_genders else None
+            except UnknownGenderWords:
+                other = None  # write_text() will store this gender only
+            if other is not None:
+                genero = next(g for g in GENDER_BITS if g != criteria["Genero"])
+                _remember_text(self.db_path, dict(criteria, Genero=genero), other)
+            self.updates += 1
+            print("✓ Edição registada (gravação em base.db pendente)")
+            if self.edits.due():
+                self.flush_edits()
+            return True
+        try:
+            with self.conn:
+                written = write_text(self.conn, criteria, new_text, both_genders, expected)
+        except EditConflict:
+            raise
+        except Exception as e:
+            print(f"✗ Erro ao atualizar base de dados: {e}")
+            return False
+
+        if written:
+            for entry, texto in written:
+                _remember_text(self.db_path, entry, texto)
+            self.journal_json(written)
+            self.updates += 1
+            print("✓ Texto atualizado com sucesso em base.db" + _genders_note(written))
+            return True
+        print("✗ Entrada não encontrada na base de dados")
+        return False
+
+    def other_gender_preview(self, criteria, new_text):
+        return other_gender_preview(self.conn, criteria, new_text)
+
+    def read_version(self, criteria):
+        queued = self.edits.get(criteria)
+        return queued if queued is not None else read_version(self.conn, criteria)
+
+    def flush_edits(self):
+        """
+        Commit the queued edits. For each conflict the user chooses whether
+        their version replaces the colleague's; unanswered conflicts stay in
+        the journal for the next flush. False if base.db could not be written.
+        """
+        import sqlite3
+
+        count = len(self.edits)
+        try:
+            written, conflicts = self.edits.flush(self.conn)
+        except sqlite3.Error as e:
+            print(f"✗ Erro ao gravar {count} edições em base.db (ficam guardadas para a próxima vez): {e}")
+            return False
+        for entry, texto in written:
+            _remember_text(self.db_path, entry, texto)
+        self.journal_json(written)
+        if count > len(conflicts):
+            print(f"✓ {count - len(conflicts)} edições gravadas em base.db")
+        if not conflicts:
+            return True
+        self.table = None
+        forget_text_table(self.db_path)
+
+        def overwrite(criteria, mine):
+            code = format_code(tuple(criteria[f] for f in CRITERIA_FIELDS))
+            theirs = next(t for c, m, t in conflicts if c is criteria)
+            print(f"\n⚠ Conflito em {code}: outro utilizador alterou este texto entretanto.")
+            print(f"  Texto atual: {theirs or '(texto removido)'}")
+            print(f"  A sua versão: {mine}")
+            try:
+                return bool(ask_yesno("Substituir pelo seu texto?"))
+            except (EOFError, KeyboardInterrupt):
+                print(f"\n  A sua versão fica guardada em {os.path.basename(self.edits.path)}.")
+                return None
+
+        self.edits.resolve(overwrite)
+        if self.edits.due() or (self.edits and not self.edits.conflicts):
+            return self.flush_edits()
+        return True
+
+    def tick(self):
+        """Flush the queued edits when the size or time threshold is reached."""
+        if self.edits.due():
+            self.flush_edits()
+
+    def backup_once(self):
+        """Snapshot base.db before the first edit of the session (later edits are undone via history)."""
+        if not self.backed_up:
+            self.backed_up = backup_db(self.db_path)
+        return self.backed_up
+
+    def summary(self):
+        avg_ms = (self.lookup_seconds / self.lookups * 1000) if self.lookups else 0.0
+        summary = (f"Sessão: {self.students} alunos, {self.lookups} consultas "
+                   f"(média {avg_ms:.3f} ms), {self.updates} edições guardadas")
+        if self.edits.flushes or self.edits:
+            summary += (f" ({len(self.edits)} pendentes, {self.edits.flushed} gravadas "
+                        f"em {self.edits.flushes} transações)")
+        return summary
+
+    def close(self):
+        """Commit the queued edits (kept in the journal if that fails), close the connection and delete the editor files."""
+        self.flush_edits()
+        self.conn.close()
+        remove_editor_files()
+
+# Accepted spellings for roster headers, keyed by the lowercased ASCII form.
+ROSTER_COLUMNS = {
+    "nome": "Nome",
+    "aluno": "Nome",
+    "genero": "Genero",
+    "sexo": "Genero",
+    "assiduidade": "Assiduidade",
+    "pontualidade": "Pontualidade",
+    "participacao": "Participacao",
+    "interesse": "Interesse",
+    "empenho": "Empenho",
+    "dificuldades": "Dificuldades",
+}
+
+def _normalize_header(name):
+    """Lowercase a header and strip accents ('Participação' -> 'participacao')."""
+    import unicodedata
+    name = unicodedata.normalize("NFKD", (name or "").strip())
+    return name.encode("ascii", "ignore").decode("ascii").lower()
+
+def parse_flag(value):
+    """Parse a roster cell into 1/0. Accepts s/n, sim/não, y/n, 1/0 and x/blank."""
+    v = str(value if value is not None else "").strip().lower()
+    if v in ("1", "s", "sim", "y", "yes", "x", "true"):
+        return 1
+    if v in ("0", "n", "nao", "não", "no", "false", ""):
+        return 0
+    raise ValueError(f"valor inválido: {value!r}")
+
+def parse_gender(value):
+    """Parse a roster gender cell into 'M' or 'F'."""
+    v = str(value if value is not None else "").strip().upper()
+    if v in ("M", "F"):
+        return v
+    raise ValueError(f"género inválido: {value!r}")
+
+def read_roster(path):
+    """
+    Read a class roster (CSV, ';' ',' or tab separated, optional BOM).
+    Yields (line_number, nome, criteria) where criteria follows CRITERIA_FIELDS;
+    rows that cannot be parsed yield criteria=None and the error message as nome.
+    """
+    import csv
+
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=";,\t")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(f, dialect)
+
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = {}
+        for idx, name in enumerate(header):
+            key = ROSTER_COLUMNS.get(_normalize_header(name))
+            if key and key not in columns:
+                columns[key] = idx
+        missing = [c for c in ("Nome",) + CRITERIA_FIELDS if c not in columns]
+        if missing:
+            raise ValueError(f"Colunas em falta no ficheiro: {', '.join(missing)}")
+
+        for line_no, row in enumerate(reader, start=2):
+            if not any(cell.strip() for cell in row):
+                continue
+            cells = {key: (row[idx] if idx < len(row) else "") for key, idx in columns.items()}
+            try:
+                criteria = (parse_gender(cells["Genero"]),) + tuple(
+                    parse_flag(cells[field]) for field in CRITERIA_FIELDS[1:]
+                )
+            except ValueError as e:
+                yield line_no, str(e), None
+                continue
+            yield line_no, cells["Nome"].strip(), criteria
+
+def _batch_format(output_path, fmt=None):
+    """Pick the batch output format from an explicit choice or the file extension."""
+    if fmt:
+        return fmt
+    ext = os.path.splitext(output_path)[1].lower()
+    return "md" if ext in (".md", ".markdown") else "csv"
+
+def run_batch(db_path, roster_path, output_path, fmt=None, names=False, article=True):
+    """
+    Generate one síntese per roster row and stream them to output_path (CSV or Markdown).
+    Combinations with several variants rotate through them, so students with the
+    same profile get different texts until every variant was used.
+    With names=True each text is personalised with the student's name.
+    Returns a dict with counters for the run.
+    """
+    import csv
+
+    fmt = _batch_format(output_path, fmt)
+    table = get_text_table(db_path)
+    rotation = VariantRotation()
+    resolved = {}
+    stats = {"alunos": 0, "combinacoes": 0, "sem_texto": 0, "invalidas": 0}
+
+    newline = "" if fmt == "csv" else None
+    with open(output_path, "w", encoding="utf-8-sig" if fmt == "csv" else "utf-8", newline=newline) as out:
+        if fmt == "csv":
+            writer = csv.writer(out, delimiter=";")
+            writer.writerow(("Nome",) + CRITERIA_FIELDS + ("Texto",))
+
+        for line_no, nome, criteria in read_roster(roster_path):
+            if criteria is None:
+                print(f"✗ Linha {line_no}: {nome} — linha ignorada.")
+                stats["invalidas"] += 1
+                continue
+
+            texto = table.pick(pack_criteria(*criteria), rotation)[1]
+            if criteria not in resolved:
+                resolved[criteria] = texto if texto is not None else build_and_run_query(db_path, *criteria)
+            if texto is None:
+                texto = resolved[criteria]
+            if names:
+                texto = personalize(texto, nome, criteria[0], article)
+            stats["alunos"] += 1
+            if not texto:
+                stats["sem_texto"] += 1
+
+            if fmt == "csv":
+                writer.writerow((nome,) + criteria + (texto or "",))
+            else:
+                out.write(f"## {nome}\n\n{texto or '_Nenhuma correspondência encontrada._'}\n\n")
+
+    stats["combinacoes"] = len(resolved)
+    return stats
+
+def ensure_database_exists(db_path):
+    """Exit with a helpful message when base.db cannot be found."""
+    if not os.path.exists(db_path):
+        print(f"\n❌ ERRO: Base de dados não encontrada!")
+        print(f"   Esperado em: {db_path}")
+        print(f"\n💡 Solução:")
+        print(f"   1. Certifique-se que 'base.db' está na mesma pasta que o executável")
+        print(f"   2. Ou execute 'python create_sqlite_db.py' para criar a base de dados")
+        sys.exit(1)
+
+def cmd_batch(args):
+    db_path = get_database_path()
+    ensure_database_exists(db_path)
+    try:
+        stats = run_batch(db_path, args.roster, args.output, args.format,
+                          names=args.names, article=not args.no_article)
+    except (OSError, ValueError) as e:
+        print(f"✗ Erro no modo de turma: {e}")
+        return 1
+    print(f"✓ {stats['alunos']} alunos processados "
+          f"({stats['combinacoes']} combinações distintas) → {args.output}")
+    if stats["sem_texto"]:
+        print(f"⚠ {stats['sem_texto']} alunos sem texto correspondente.")
+    if stats["invalidas"]:
+        print(f"⚠ {stats['invalidas']} linhas inválidas ignoradas.")
+    return 0
+
+# Compact criteria codes: gender followed by the six flags in CRITERIA_FIELDS
+# order, e.g. "F110101". Used on the command line and by `sintese lookup`.
+CODE_LENGTH = len(CRITERIA_FIELDS)
+LOOKUP_FORMATS = ("text", "nul", "jsonl")
+
+def is_criteria_code(value):
+    """True when value looks like a compact code (M/F + six 0/1 digits)."""
+    return (len(value) == CODE_LENGTH and value[0] in "MFmf"
+            and all(c in "01" for c in value[1:]))
+
+def parse_code(code):
+    """Parse 'F110101' into a criteria tuple in CRITERIA_FIELDS order."""
+    code = code.strip()
+    if not is_criteria_code(code):
+        raise ValueError(f"código inválido: {code!r} (esperado p.ex. F110101)")
+    return (code[0].upper(),) + tuple(int(c) for c in code[1:])
+
+def format_code(criteria):
+    """Inverse of parse_code()."""
+    return criteria[0] + "".join(str(int(v)) for v in criteria[1:])
+
+def _format_lookup(code, texto, error, fmt):
+    """One output record for run_lookup()."""
+    if fmt == "jsonl":
+        import json
+        record = {"codigo": code, "texto": texto}
+        if error:
+            record["erro"] = error
+        return json.dumps(record, ensure_ascii=False) + "\n"
+    if fmt == "nul":
+        return (texto or "") + "\0"
+    return (texto or "").replace("\r", " ").replace("\n", " ") + "\n"
+
+def run_lookup(db_path, codes, out, fmt="text", client=None):
+    """
+    Resolve each code in order and write one record per code to `out` (a text
+    stream). Invalid codes and codes without text produce an empty record (or
+    a JSON record with "erro"), so output lines always match input lines.
+    With a DaemonClient the texts come from the daemon instead of db_path;
+    otherwise from the compiled pack when it is up to date (see build_pack).
+    Returns (written, failed).
+    """
+    table = (TextPack.open(db_path) or get_text_table(db_path)) if client is None else None
+    written = failed = 0
+    for raw_code in codes:
+        code = raw_code.strip()
+        if not code:
+            continue
+        texto = error = None
+        try:
+            criteria = parse_code(code)
+        except ValueError as e:
+            error = str(e)
+        else:
+            if client is not None:
+                texto = client.get(format_code(criteria))
+            else:
+                texto = table.lookup(*criteria)
+                if texto is None:
+                    texto = build_and_run_query(db_path, *criteria)
+            if texto is None:
+                error = "sem texto correspondente"
+        if error:
+            failed += 1
+            if fmt != "jsonl":
+                print(f"✗ {code}: {error}", file=sys.stderr)
+        out.write(_format_lookup(code, texto, error, fmt))
+        written += 1
+    out.flush()
+    return written, failed
+
+def use_daemon(requested=False):
+    """
+    Whether lookups should try the daemon first (--daemon or SINT_DAEMON=1).
+    Opt-in: importing socket costs more than a direct lookup in base.db, so a
+    one-shot launch is only faster through the daemon when the DB is slow to reach.
+    """
+    return requested or os.getenv("SINT_DAEMON", "") not in ("", "0")
+
+def cmd_lookup(args):
+    # A running daemon answers without resolving or opening base.db here;
+    # when none is running, fall back to the direct path.
+    client = DaemonClient.connect() if use_daemon(args.daemon) else None
+    db_path = None
+    if client is None:
+        db_path = get_database_path()
+        ensure_database_exists(db_path)
+    codes = args.codes
+    if not codes or codes == ["-"]:
+        codes = sys.stdin
+    # Texts are UTF-8 regardless of the console code page
+    out = sys.stdout
+    if hasattr(out, "reconfigure"):
+        out.reconfigure(encoding="utf-8", newline="\n" if args.format != "text" else None)
+    try:
+        _, failed = run_lookup(db_path, codes, out, args.format, client)
+    finally:
+        if client is not None:
+            client.close()
+    return 1 if failed else 0
+
+# Optional lookup daemon: a long-lived process keeps the text table in memory
+# and answers a one-line-per-request protocol, so scripted lookups skip the
+# interpreter/PyInstaller start, find_resource() and the DB load.
+#
+#   AUTH <token>                   -> OK | ERR (first line of every connection)
+#   PING                           -> OK <pid>
+#   GET F110101                    -> OK <texto> | NONE | ERR <mensagem>
+#   VERSION F110101                -> OK <versão> | NONE
+#   SET F110101 <versão> <texto>   -> OK | ERR <mensagem>
+#   RELOAD / STOP                  -> OK
+#
+# It listens on a Unix socket in the cache dir, or on a localhost TCP port
+# (recorded in daemon.port) where Unix sockets are unavailable. Either way a
+# client must first send the random token the daemon wrote to daemon.token
+# (mode 0600), so only the user who started it can read or write through it.
+# SET only writes if the text is still at <versão> (as returned by VERSION).
+# Texts travel on one line with backslash, CR and LF escaped (see escape_line()).
+DAEMON_SOCKET_NAME = "daemon.sock"
+DAEMON_PORT_NAME = "daemon.port"
+DAEMON_TOKEN_NAME = "daemon.token"
+DAEMON_CONNECT_TIMEOUT = 0.5
+
+def get_daemon_socket_path():
+    return os.path.join(get_cache_dir(), DAEMON_SOCKET_NAME)
+
+def get_daemon_port_path():
+    return os.path.join(get_cache_dir(), DAEMON_PORT_NAME)
+
+def get_daemon_token_path():
+    return os.path.join(get_cache_dir(), DAEMON_TOKEN_NAME)
+
+def write_daemon_token():
+    """Create a fresh random token in daemon.token, readable by this user only."""
+    import secrets
+
+    token = secrets.token_hex(16)
+    path = get_daemon_token_path()
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token)
+    return token
+
+def read_daemon_token():
+    try:
+        with open(get_daemon_token_path(), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def format_version(version):
+    """A read_version() version as one protocol word (table:id:Versao), '-' for none."""
+    return "-" if version is None else ":".join(str(part) for part in version)
+
+def parse_version(word):
+    if word == "-":
+        return None
+    table, _, rest = word.partition(":")
+    row_id, _, versao = rest.partition(":")
+    if table not in dict(TEXT_COLUMNS) or not row_id.isdigit() or not versao.isdigit():
+        raise ValueError(f"versão inválida: {word}")
+    return table, int(row_id), int(versao)
+
+def daemon_address():
+    """("tcp", (host, port)) or ("unix", path) of a running daemon, or None."""
+    try:
+        with open(get_daemon_port_path(), "r", encoding="utf-8") as f:
+            return "tcp", ("127.0.0.1", int(f.read().strip()))
+    except (OSError, ValueError):
+        pass
+    path = get_daemon_socket_path()
+    if os.name == "posix" and os.path.exists(path):
+        return "unix", path
+    return None
+
+def escape_line(text):
+    return text.replace("\\", "\\\\").replace("\n", "\\n").replace("\r", "\\r")
+
+def unescape_line(line):
+    return "\\".join(part.replace("\\n", "\n").replace("\\r", "\r") for part in line.split("\\\\"))
+
+class DaemonClient:
+    """Thin client for `sintese daemon`; connect() returns None when none is running."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.reader = sock.makefile("r", encoding="utf-8", newline="\n")
+
+    @classmethod
+    def connect(cls, timeout=DAEMON_CONNECT_TIMEOUT):
+        address = daemon_address()
+        token = read_daemon_token()
+        if address is None or token is None:
+            return None
+        import socket
+        family, target = address
+        sock = socket.socket(socket.AF_UNIX if family == "unix" else socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(target)
+        except OSError:
+            # Stale socket/port file left by a daemon that is gone
+            sock.close()
+            return None
+        client = cls(sock)
+        try:
+            client.request(f"AUTH {token}")
+        except (OSError, ValueError, ConnectionError):
+            client.close()
+            return None
+        sock.settimeout(None)
+        return client
+
+    def request(self, line):
+        self.sock.sendall((line + "\n").encode("utf-8"))
+        reply = self.reader.readline()
+        if not reply:
+            raise ConnectionError("o daemon fechou a ligação")
+        status, _, payload = reply.rstrip("\n").partition(" ")
+        if status == "ERR":
+            raise ValueError(payload)
+        return status, payload
+
+    def get(self, code):
+        status, payload = self.request(f"GET {code}")
+        return unescape_line(payload) if status == "OK" else None
+
+    def version(self, code):
+        status, payload = self.request(f"VERSION {code}")
+        return parse_version(payload) if status == "OK" else None
+
+    def set(self, code, text, version):
+        """Store text for code if it is still at version (from version()); ValueError otherwise."""
+        self.request(f"SET {code} {format_version(version)} {escape_line(text)}")
+        return True
+
+    def ping(self):
+        return int(self.request("PING")[1])
+
+    def stop(self):
+        self.request("STOP")
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+def _db_signature(db_path):
+    """Changes whenever base.db (or its WAL) is written by another process."""
+    sig = []
+    for path in (db_path, db_path + "-wal"):
+        try:
+            st = os.stat(path)
+            sig.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.append(None)
+    return tuple(sig)
+
+class DaemonState:
+    """Request handling for the daemon, independent of the transport."""
+
+    def __init__(self, db_path):
+        import threading
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.signature = None
+        self.requests = 0
+
+    def table(self):
+        # Edits made by other processes (an interactive session, sync) show up
+        # as a new file signature; reload the table when that happens.
+        signature = _db_signature(self.db_path)
+        if signature != self.signature:
+            forget_text_table(self.db_path)
+            self.signature = signature
+        return get_text_table(self.db_path)
+
+    def handle(self, line):
+        """Return (reply, stop) for one request line."""
+        command, _, rest = line.strip().partition(" ")
+        command = command.upper()
+        self.requests += 1
+        try:
+            with self.lock:
+                if command == "GET":
+                    criteria = parse_code(rest)
+                    texto = self.table().lookup(*criteria)
+                    if texto is None:
+                        texto = build_and_run_query(self.db_path, *criteria)
+                    return ("NONE" if texto is None else "OK " + escape_line(texto)), False
+                if command == "VERSION":
+                    criteria = dict(zip(CRITERIA_FIELDS, parse_code(rest)))
+                    conn = connect_db(self.db_path)
+                    try:
+                        ensure_schema(conn)
+                        version = read_version(conn, criteria)[0]
+                    finally:
+                        conn.close()
+                    return ("NONE" if version is None else "OK " + format_version(version)), False
+                if command == "SET":
+                    code, _, rest = rest.partition(" ")
+                    word, _, payload = rest.partition(" ")
+                    criteria = dict(zip(CRITERIA_FIELDS, parse_code(code)))
+                    expected = parse_version(word)
+                    new_text = unescape_line(payload)
+                    valid, message = validate_text(new_text)
+                    if not valid:
+                        return "ERR " + message, False
+                    self.table()
+                    return self.set_text(criteria, new_text.strip(), expected), False
+                if command == "PING":
+                    return f"OK {os.getpid()}", False
+                if command == "RELOAD":
+                    self.signature = None
+                    return "OK", False
+                if command == "STOP":
+                    return "OK", True
+        except ValueError as e:
+            return f"ERR {e}", False
+        return f"ERR comando desconhecido: {command or '(vazio)'}", False
+
+    def set_text(self, criteria, new_text, expected):
+        import sqlite3
+
+        conn = connect_db(self.db_path)
+        try:
+            ensure_schema(conn)
+            try:
+                with conn:
+                    written = write_text(conn, criteria, new_text, expected=expected)
+            except EditConflict as conflict:
+                return f"ERR conflito: o texto foi alterado (versão atual {format_version(conflict.version)})"
+            except sqlite3.Error as e:
+                return f"ERR {e}"
+        finally:
+            conn.close()
+        if not written:
+            return "ERR entrada não encontrada"
+        for entry, texto in written:
+            _remember_text(self.db_path, entry, texto)
+        self.signature = _db_signature(self.db_path)
+        return "OK"
+
+def make_daemon_server(db_path, tcp_port=None):
+    """
+    Bind the daemon server (Unix socket, or localhost TCP when tcp_port is given
+    or AF_UNIX is unavailable) and write a new daemon.token. Call
+    serve_forever(); server_close() removes the socket/port and token files.
+    """
+    import socketserver
+    import threading
+
+    import hmac
+
+    state = DaemonState(db_path)
+    state.table()  # load before accepting connections
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            # The first line must carry the token from daemon.token
+            command, _, given = self.rfile.readline().decode("utf-8", "replace").strip().partition(" ")
+            if command.upper() != "AUTH" or not hmac.compare_digest(given.encode(), token.encode()):
+                self.wfile.write("ERR não autorizado\n".encode("utf-8"))
+                return
+            self.wfile.write(b"OK\n")
+            for raw in self.rfile:
+                reply, stop = state.handle(raw.decode("utf-8", "replace").rstrip("\r\n"))
+                self.wfile.write((reply + "\n").encode("utf-8"))
+                if stop:
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+
+    os.makedirs(get_cache_dir(), mode=0o700, exist_ok=True)
+    use_unix = tcp_port is None and hasattr(socketserver, "ThreadingUnixStreamServer")
+    if use_unix:
+        path = get_daemon_socket_path()
+        if DaemonClient.connect() is not None:
+            raise RuntimeError(f"já existe um daemon ativo em {path}")
+        if os.path.exists(path):
+            os.remove(path)
+        base, address, marker = socketserver.ThreadingUnixStreamServer, path, path
+    else:
+        base, address, marker = socketserver.ThreadingTCPServer, ("127.0.0.1", tcp_port or 0), get_daemon_port_path()
+
+    class Server(base):
+        daemon_threads = True
+        allow_reuse_address = True
+
+        def server_close(self):
+            super().server_close()
+            for name in (marker, get_daemon_token_path()):
+                try:
+                    os.remove(name)
+                except OSError:
+                    pass
+
+    token = write_daemon_token()
+    if use_unix:
+        # Created with owner-only permissions from the start, not chmod'ed after bind
+        umask = os.umask(0o077)
+        try:
+            server = Server(address, Handler)
+        finally:
+            os.umask(umask)
+    else:
+        server = Server(address, Handler)
+        write_file_atomic(marker, str(server.server_address[1]))
+    server.state = state
+    return server
+
+def cmd_daemon(args):
+    if args.stop or args.status:
+        client = DaemonClient.connect()
+        if client is None:
+            print("Nenhum daemon ativo.")
+            return 1 if args.status else 0
+        try:
+            if args.stop:
+                client.stop()
+                print("✓ Daemon terminado.")
+            else:
+                print(f"✓ Daemon ativo (pid {client.ping()}).")
+        finally:
+            client.close()
+        return 0
+
+    db_path = get_database_path()
+    ensure_database_exists(db_path)
+    try:
+        server = make_daemon_server(db_path, args.tcp)
+    except (OSError, RuntimeError) as e:
+        print(f"✗ Não foi possível iniciar o daemon: {e}")
+        return 1
+    where = server.server_address
+    where = f"127.0.0.1:{where[1]}" if isinstance(where, tuple) else where
+    print(f"✓ Daemon à escuta em {where} (base: {db_path}). Ctrl+C para terminar.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    print(f"Daemon terminado após {server.state.requests} pedidos.")
+    return 0
+
+# The seven questions in CRITERIA_FIELDS (and packed-code bit) order.
+QUESTIONS = (
+    ("Genero", None),
+    ("Assiduidade", "O aluno é assíduo?"),
+    ("Pontualidade", "O aluno é pontual?"),
+    ("Participacao", "O aluno é participativo?"),
+    ("Interesse", "O aluno mostra interesse?"),
+    ("Empenho", "O aluno mostra empenho?"),
+    ("Dificuldades", "O aluno mostra dificuldades?"),
+)
+
+def ask_question(index):
+    field, prompt = QUESTIONS[index]
+    return ask_gender() if prompt is None else ask_yesno(prompt)
+
+def ask_criteria(table=None, previous=None, raw=False):
+    """
+    Ask the seven questions; returns a tuple in CRITERIA_FIELDS order.
+
+    With a TextTable, answers narrow the candidate codes as a decision tree:
+    the first n answers fix the top n bits of the packed code, so the
+    candidates are one contiguous slice of the table. As soon as every
+    candidate has the same text the remaining questions are skipped and
+    returned as None (see complete_criteria()).
+
+    raw=True answers with single keypresses (see ask_criteria_raw()).
+    """
+    if raw:
+        return ask_criteria_raw(table, previous)
+    answers = []
+    for index in range(len(QUESTIONS)):
+        if table is not None and index > 0:
+            texto = table.determined(answers)
+            if texto is not None:
+                skipped = len(QUESTIONS) - index
+                print(f"✓ Texto já determinado — {skipped} pergunta(s) dispensada(s).")
+                return tuple(answers) + (None,) * skipped
+        answers.append(ask_question(index))
+    return tuple(answers)
+
+RAW_PROMPTS = ("Qual o género do aluno? (M/F) ",) + tuple(f"{p} (s/n) " for _, p in QUESTIONS[1:])
+RAW_HELP = "(tecla única — r: repetir aluno anterior, b/←: voltar, q: sair)"
+
+def ask_criteria_raw(table=None, previous=None):
+    """
+    Question flow with one keypress per answer and hotkeys to repeat the
+    previous student's answers, go back one question, or quit.
+    """
+    print(RAW_HELP)
+    answers = []
+    while len(answers) < len(QUESTIONS):
+        index = len(answers)
+        if table is not None and index > 0 and table.determined(answers) is not None:
+            skipped = len(QUESTIONS) - index
+            print(f"✓ Texto já determinado — {skipped} pergunta(s) dispensada(s).")
+            return tuple(answers) + (None,) * skipped
+
+        sys.stdout.write(RAW_PROMPTS[index])
+        sys.stdout.flush()
+        action, value = interpret_key(read_key(), index)
+        if action == "answer":
+            print(value if index == 0 else ("sim" if value else "não"))
+            answers.append(value)
+        elif action == "back":
+            print("← voltar")
+            if answers:
+                answers.pop()
+        elif action == "repeat":
+            if previous is None:
+                print("(ainda não há aluno anterior)")
+                continue
+            print("↺ respostas do aluno anterior")
+            return tuple(previous)
+        elif action == "quit":
+            print("sair")
+            raise QuitRequested()
+        else:
+            print("?")
+    return tuple(answers)
+
+def complete_criteria(criteria):
+    """Ask the questions skipped by ask_criteria() (needed to edit one exact row)."""
+    return tuple(ask_question(i) if value is None else value for i, value in enumerate(criteria))
+
+def handle_student(session):
+    """One student: questions, lookup, clipboard and the optional editing loop."""
+    nome = input("Nome do aluno (ENTER para omitir): ").strip() if session.ask_names else ""
+    criteria = ask_criteria(session.get_table(), session.last_criteria, raw=session.raw_keys)
+    session.last_criteria = criteria
+    session.students += 1
+
+    if None in criteria:
+        texto = session.determined(criteria)
+    else:
+        texto = session.lookup(*criteria)
+    if not texto:
+        print("Nenhuma correspondência encontrada para os filtros definidos.")
+        return
+    texto = personalize(texto, nome, criteria[0], session.article)
+
+    print("\n--- Texto encontrado ---\n")
     print(texto)
-    print("\n--- A tentar copiar para a área de transferência... ---")
-    if copy_to_clipboard(texto):
-        print("Texto copiado para a área de transferência.")
+    if session.clipboard_queue is not None:
+        session.clipboard_queue.add(texto)
+        print(f"\n--- Texto adicionado à fila ({len(session.clipboard_queue)} na fila) ---")
     else:
-        print("Falha ao copiar automaticamente. Copie manualmente do ecrã se necessário.")
+        print("\n--- A tentar copiar para a área de transferência... ---")
+        if copy_to_clipboard(texto):
+            print("Texto copiado para a área de transferência.")
+        else:
+            print("Falha ao copiar automaticamente. Copie manualmente do ecrã se necessário.")
     
     # Editing loop
-    if ask_edit_confirmation():
+    edit_mode = ask_edit_mode(raw=session.raw_keys)
+    if edit_mode:
+        if None in criteria:
+            print("Para editar, responda às perguntas dispensadas:")
+            criteria = complete_criteria(criteria)
+        genero, assid, punt, part, inter, empen, diff = criteria
         criteria = {
             "Genero": genero,
             "Assiduidade": assid,
@@ -420,12 +3848,27 @@ def main():
             "Participacao": part,
             "Interesse": inter,
             "Empenho": empen,
-            "Dificuldades": diff
+            "Dificuldades": diff,
+            "Variante": session.last_variant,
         }
         
+        # Start from the stored text: a colleague may have changed it since it was loaded
+        version, current = session.read_version(criteria)
+        if current is not None and current != depersonalize(texto, nome, genero, session.article):
+            print("\n⚠ Este texto foi alterado por outro utilizador entretanto:\n")
+            texto = personalize(current, nome, genero, session.article)
+            print(texto)
+            _remember_text(session.db_path, criteria, current)
+
+        entry_key = pack_criteria(genero, assid, punt, part, inter, empen, diff)
+        if session.last_variant:
+            entry_key = f"{entry_key}v{session.last_variant}"
         while True:
-            print("\n--- Abrindo editor... ---")
-            edited_text = open_text_in_editor(texto)
+            if edit_mode == "inline":
+                edited_text = edit_text_inline(texto, entry_key)
+            else:
+                print("\n--- Abrindo editor... ---")
+                edited_text = open_text_in_editor(texto, entry_key)
             
             if edited_text is None:
                 print("❌ Editor fechado sem guardar.")
@@ -445,19 +3888,48 @@ def main():
             
             # Ask if satisfied
             if ask_satisfaction():
-                        # Backup DB before updating (we operate on DB only)
-                        if not backup_db():
+                        # One snapshot before the session's first edit; each edit is in sinteses_history
+                        if not session.backup_once():
                             print("⚠ Aviso: Não foi possível criar backup do DB. Operação cancelada.")
                             return
 
-                        # Copy to clipboard
-                        copy_to_clipboard(edited_text)
-
-                        print("\n--- Texto copiado para a área de transferência ---")
+                        # Copy to clipboard (or swap the queued text)
+                        if session.clipboard_queue is not None:
+                            session.clipboard_queue.replace_last(edited_text)
+                            print("\n--- Texto na fila atualizado ---")
+                        else:
+                            copy_to_clipboard(edited_text)
+                            print("\n--- Texto copiado para a área de transferência ---")
                         print("\n--- A tentar guardar alterações no DB... ---")
 
-                        # Update database only
-                        if update_entry_in_db(db_path, criteria, edited_text):
+                        # The database keeps the generic text, never the name
+                        stored_text = depersonalize(edited_text, nome, criteria["Genero"], session.article)
+
+                        # A template-backed text can change for both genders
+                        both_genders = True
+                        try:
+                            other = session.other_gender_preview(criteria, stored_text)
+                        except UnknownGenderWords as e:
+                            print(f"\n⚠ A alteração fica só para este género ({e}).")
+                            other, both_genders = None, False
+                        if other is not None:
+                            print("\n--- Texto correspondente para o outro género ---\n")
+                            print(other)
+                            both_genders = bool(ask_yesno("Aplicar a alteração também ao outro género?"))
+
+                        # Update database only, unless someone saved this text first
+                        while True:
+                            try:
+                                saved = session.update(criteria, stored_text, both_genders, expected=version)
+                                break
+                            except EditConflict as conflict:
+                                print("\n⚠ Conflito: outro utilizador guardou este texto entretanto:\n")
+                                print(conflict.current or "(texto removido)")
+                                if not ask_yesno("Substituir pelo seu texto?"):
+                                    print("\nAs suas alterações não foram guardadas.")
+                                    return
+                                version = conflict.version
+                        if saved:
                             print("\n✓ Alterações guardadas com sucesso!")
                             return
                         else:
@@ -468,5 +3940,580 @@ def main():
                 texto = edited_text
                 print("\nEditar novamente...")
 
+def run_session(session):
+    """Loop over students in one process until the user quits; prints the counters."""
+    queue = session.clipboard_queue
+    prompt = "\nNovo aluno? ENTER para continuar, "
+    prompt += "c para copiar a fila, q para sair: " if queue is not None else "q para sair: "
+    try:
+        while True:
+            try:
+                if session.raw_keys:
+                    sys.stdout.write(prompt)
+                    sys.stdout.flush()
+                    key = read_key()
+                    v = "" if key in KEY_CONTINUE else key.lower()
+                    print()
+                else:
+                    v = input(prompt).strip().lower()
+            except (KeyboardInterrupt, EOFError):
+                break
+            if v in ("q", "sair") or v in KEY_QUIT:
+                break
+            if v == "c" and queue is not None:
+                flush_clipboard_queue(queue)
+                continue
+            try:
+                handle_student(session)
+            except KeyboardInterrupt:
+                print("\n(aluno cancelado)")
+            except QuitRequested:
+                break
+            session.tick()
+    finally:
+        if queue:
+            flush_clipboard_queue(queue)
+        session.flush_edits()
+        print("\n" + session.summary())
+        session.close()
+
+def flush_clipboard_queue(queue):
+    count = len(queue)
+    if queue.flush():
+        print(f"✓ {count} textos copiados para a área de transferência.")
+    else:
+        print("Falha ao copiar automaticamente. Copie manualmente do ecrã se necessário.")
+
+def cmd_session(args):
+    db_path = get_database_path()
+    ensure_database_exists(db_path)
+    raw_keys = False if args.no_raw else None
+    run_session(Session(db_path, get_json_path(), queue_clipboard=args.queue, raw_keys=raw_keys,
+                        ask_names=args.names, article=not args.no_article,
+                        write_behind=not args.immediate))
+    return 0
+
+def cmd_migrate(args):
+    import sqlite3
+
+    db_path = args.db or get_database_path()
+    ensure_database_exists(db_path)
+    conn = connect_db(db_path)
+    try:
+        result = migrate_db(conn)
+    except sqlite3.Error as e:
+        print(f"✗ Erro ao migrar a base de dados: {e}")
+        return 1
+    finally:
+        conn.close()
+    if result["from"] == result["to"]:
+        print(f"✓ Esquema já está atualizado (versão {result['to']}).")
+    else:
+        print(f"✓ Esquema migrado da versão {result['from']} para {result['to']}.")
+    if result["removed"]:
+        print(f"  {result['removed']} entradas duplicadas removidas.")
+    return 0
+
+def cmd_sync(args):
+    import sqlite3
+
+    json_path = args.json or get_json_path()
+    db_path = args.db or get_database_path()
+    if not os.path.exists(json_path):
+        print(f"✗ base.json não encontrado em: {json_path}")
+        return 1
+    start = time.perf_counter()
+    try:
+        counts = sync_json_to_db(json_path, db_path, prune=not args.keep_missing)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"✗ Erro ao sincronizar: {e}")
+        return 1
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"✓ Sincronizado {os.path.basename(json_path)} → {os.path.basename(db_path)} "
+          f"em {elapsed_ms:.1f} ms")
+    print(f"  inseridas: {counts['inserted']}, atualizadas: {counts['updated']}, "
+          f"inalteradas: {counts['unchanged']}, removidas: {counts['deleted']}")
+    if counts["kept"]:
+        print(f"  mantidas (alteradas em {os.path.basename(db_path)} desde a última sincronização): "
+              f"{counts['kept']}")
+    return 0
+
+def parse_levels(assignments):
+    """Parse ["Empenho=3", "tpc=1"] into {criterion: level} (names are case/accent-insensitive)."""
+    names = {_normalize_header(f): f for f in COMPOSE_CLAUSES}
+    levels = {}
+    for item in assignments:
+        name, sep, value = item.partition("=")
+        field = names.get(_normalize_header(name))
+        if not sep or field is None:
+            raise ValueError(f"critério inválido: {item!r} (use Campo=nível, p.ex. Empenho=3)")
+        try:
+            levels[field] = int(value)
+        except ValueError:
+            raise ValueError(f"nível inválido: {item!r}") from None
+    return levels
+
+def cmd_compose(args):
+    try:
+        criteria = parse_code(args.code)
+        levels = dict(zip(CRITERIA_FIELDS[1:], criteria[1:]))
+        levels.update(parse_levels(args.levels))
+        db_path = None if args.no_db else get_database_path()
+        if db_path and not os.path.exists(db_path):
+            db_path = None
+        texto, source = resolve_profile(db_path, criteria[0], levels)
+    except ValueError as e:
+        print(f"✗ {e}")
+        return 1
+    print(texto)
+    if args.source:
+        print(f"(fonte: {source})", file=sys.stderr)
+    return 0
+
+def cmd_variants(args):
+    import sqlite3
+
+    db_path = get_database_path()
+    ensure_database_exists(db_path)
+    try:
+        criteria = parse_code(args.code)
+    except ValueError as e:
+        print(f"✗ {e}")
+        return 1
+    if args.add is not None:
+        valid, message = validate_text(args.add)
+        if not valid:
+            print(message)
+            return 1
+        backup_db(db_path)
+        try:
+            variante = add_variant(db_path, get_json_path(), criteria, args.add.strip())
+        except (OSError, sqlite3.Error) as e:
+            print(f"✗ Erro ao adicionar variante: {e}")
+            return 1
+        print(f"✓ Variante {variante} adicionada a {format_code(criteria)}.")
+    variants = list_variants(db_path, criteria)
+    if not variants:
+        print(f"Nenhum texto para {format_code(criteria)}.")
+        return 1
+    for variante, texto in variants:
+        print(f"[{variante}] {texto}")
+    return 0
+
+def _print_change(label, before, after):
+    print(f"{label}\n  - {before if before is not None else '(novo)'}\n  + {after if after is not None else '(removido)'}")
+
+def cmd_search(args):
+    import sqlite3
+
+    db_path = args.db or get_database_path()
+    ensure_database_exists(db_path)
+    phrase = " ".join(args.phrase)
+    conn = connect_db(db_path)
+    try:
+        if args.replace is None:
+            marks = SEARCH_TTY_MARKS if sys.stdout.isatty() else SEARCH_MARKS
+            start = time.perf_counter()
+            matches = search_texts(conn, phrase, marks, raw=args.fts)
+            elapsed = (time.perf_counter() - start) * 1000
+            for _, _, code, variante, snippet, _ in matches[:args.limit or None]:
+                print(f"{code}[{variante}] {snippet}")
+            print(f"{len(matches)} textos encontrados ({elapsed:.1f} ms).")
+            return 0 if matches else 1
+
+        changes = replace_phrase(conn, phrase, args.replace, dry_run=True)
+        if not changes:
+            print(f"Nenhum texto contém «{phrase}».")
+            return 1
+        for code, variante, before, after in changes:
+            _print_change(f"{code}[{variante}]", before, after)
+        if args.dry_run:
+            print(f"{len(changes)} textos seriam alterados.")
+            return 0
+        if not args.yes and not ask_yesno(f"Substituir em {len(changes)} textos?"):
+            print("Nada foi alterado.")
+            return 0
+        if not backup_db(db_path):
+            print("✗ Não foi possível criar backup; nada foi alterado.")
+            return 1
+        changes = replace_phrase(conn, phrase, args.replace)
+        # Journal the new texts so a later `sintese sync` keeps them
+        append_json_edits(get_json_path(), replacement_edits(changes))
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"✗ {e}")
+        return 1
+    finally:
+        conn.close()
+    forget_text_table(db_path)
+    print(f"✓ {len(changes)} textos alterados em base.db e base.json.")
+    return 0
+
+def cmd_history(args):
+    db_path = get_database_path()
+    ensure_database_exists(db_path)
+    code = None
+    if args.code:
+        try:
+            code = format_code(parse_code(args.code))
+        except ValueError as e:
+            print(f"✗ {e}")
+            return 1
+    conn = connect_db(db_path)
+    try:
+        migrate_db(conn)
+        entries = list_history(conn, code, args.limit)
+    finally:
+        conn.close()
+    if not entries:
+        print("Sem edições registadas.")
+        return 1
+    for history_id, when, user, entry_code, variante, before, after in entries:
+        _print_change(f"#{history_id} {when} {user or '?'} {entry_code}[{variante}]", before, after)
+    return 0
+
+def cmd_undo(args):
+    import sqlite3
+
+    db_path = get_database_path()
+    ensure_database_exists(db_path)
+    conn = connect_db(db_path)
+    try:
+        migrate_db(conn)
+        code, variante, before, after = undo_edit(conn, args.id, force=args.force)
+        # Journal the restored state so a later `sintese sync` keeps it. A
+        # removed override row leaves the template's rendering in its place.
+        if after is not None:
+            edits = replacement_edits([(code, variante, before, after)])
+        else:
+            criteria = dict(zip(CRITERIA_FIELDS, parse_code(code)), Variante=variante)
+            rendered = read_version(conn, criteria)[1]
+            edits = [(criteria, rendered)] if rendered is not None else []
+        if edits:
+            append_json_edits(get_json_path(), edits)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"✗ {e}")
+        return 1
+    finally:
+        conn.close()
+    forget_text_table(db_path)
+    _print_change(f"{code}[{variante}]", before, after)
+    print("✓ Edição desfeita.")
+    return 0
+
+def cmd_patch(args):
+    import sqlite3
+
+    db_path = args.db or get_database_path()
+    ensure_database_exists(db_path)
+    try:
+        if args.file == "-":
+            edits = read_patch(sys.stdin)
+        else:
+            with open(args.file, "r", encoding="utf-8") as f:
+                edits = read_patch(f)
+    except OSError as e:
+        print(f"✗ Não foi possível ler {args.file}: {e}")
+        return 1
+    except ValueError as e:
+        print(f"✗ Patch inválido:\n{e}")
+        return 1
+
+    conn = connect_db(db_path)
+    try:
+        migrate_db(conn)
+        changes = apply_patch(conn, edits, dry_run=True)
+        for code, variante, before, after in changes:
+            _print_change(f"{code}[{variante}]", before, after)
+        if not changes:
+            print("O patch não altera nenhum texto.")
+            return 0
+        if args.dry_run:
+            print(f"{len(changes)} textos seriam alterados.")
+            return 0
+        if not args.yes and not ask_yesno(f"Aplicar {len(changes)} alterações?"):
+            print("Nada foi alterado.")
+            return 0
+        if not backup_db(db_path):
+            print("✗ Não foi possível criar backup; nada foi alterado.")
+            return 1
+        start = time.perf_counter()
+        changes = apply_patch(conn, edits)
+        elapsed = (time.perf_counter() - start) * 1000
+    except ValueError as e:
+        print(f"✗ Patch não aplicado:\n{e}")
+        return 1
+    except sqlite3.Error as e:
+        print(f"✗ Erro ao aplicar o patch: {e}")
+        return 1
+    finally:
+        conn.close()
+    forget_text_table(db_path)
+    print(f"✓ {len(changes)} textos alterados em base.db ({elapsed:.1f} ms).")
+
+    json_path = get_json_path()
+    try:
+        # Journal the new texts so a later `sintese sync` keeps them; --json
+        # then folds the journal into base.json with one atomic rewrite
+        append_json_edits(json_path, replacement_edits(changes))
+        if args.json:
+            compact_json_journal(json_path)
+    except (OSError, ValueError) as e:
+        print(f"✗ Erro ao atualizar base.json (base.db já foi alterado): {e}")
+        return 1
+    if args.json:
+        print("✓ base.json atualizado.")
+    return 0
+
+def cmd_pack(args):
+    import sqlite3
+
+    db_path = args.db or get_database_path()
+    ensure_database_exists(db_path)
+    pack_path = get_pack_path(db_path)
+    if args.check:
+        pack = TextPack.open(db_path)
+        if pack is None:
+            state = "em falta" if not os.path.exists(pack_path) else "desatualizado"
+            print(f"✗ {pack_path}: {state} (as consultas usam base.db)")
+            return 1
+        pack.close()
+        print(f"✓ {pack_path}: atualizado")
+        return 0
+    try:
+        count, size = build_pack(db_path, pack_path)
+    except (OSError, sqlite3.Error) as e:
+        print(f"✗ Erro ao compilar {pack_path}: {e}")
+        return 1
+    print(f"✓ {pack_path}: {count} textos, {size / 1024:.1f} KB")
+    return 0
+
+def cmd_fold(args):
+    import sqlite3
+
+    db_path = args.db or get_database_path()
+    ensure_database_exists(db_path)
+    if not args.dry_run and not backup_db(db_path):
+        print("✗ Não foi possível criar backup; nada foi alterado.")
+        return 1
+    conn = connect_db(db_path)
+    try:
+        report = fold_db(conn, dry_run=args.dry_run)
+    except sqlite3.Error as e:
+        print(f"✗ Erro ao converter em modelos: {e}")
+        return 1
+    finally:
+        conn.close()
+    forget_text_table(db_path)
+
+    verb = "seriam convertidos" if args.dry_run else "convertidos"
+    print(f"✓ {report['folded']} pares M/F {verb} em modelos.")
+    if report["unfolded"]:
+        print(f"⚠ {len(report['unfolded'])} pares ficam separados (os textos não diferem só no género):")
+        for label, reason in report["unfolded"]:
+            print(f"   {label}: {reason}")
+    return 0
+
+def cmd_compact(args):
+    json_path = args.json or get_json_path()
+    if not os.path.exists(json_path):
+        print(f"✗ base.json não encontrado em: {json_path}")
+        return 1
+    try:
+        applied = compact_json_journal(json_path)
+    except (OSError, ValueError) as e:
+        print(f"✗ Erro ao compactar o diário: {e}")
+        return 1
+    if applied:
+        print(f"✓ {applied} edições do diário aplicadas a {os.path.basename(json_path)}.")
+    else:
+        print("✓ Diário vazio; nada a compactar.")
+    return 0
+
+def cmd_backup(args):
+    db_path = args.db or get_database_path()
+    ok = backup_db(db_path)
+    if args.json:
+        ok = backup_json() and ok
+    for stamp, path in list_backups(db_path)[:args.list]:
+        print(f"  {stamp:%Y-%m-%d %H:%M:%S}  {os.path.basename(path)}  "
+              f"{os.path.getsize(path) / 1024:.1f} KB")
+    return 0 if ok else 1
+
+def cmd_where(args):
+    """Print where each resource was found, by which rule, and how long it took."""
+    if args.refresh:
+        _RESOLVED.clear()
+    for name in RESOURCE_NAMES:
+        _RESOLVED.pop((_resource_cache_key(), name), None)
+        start = time.perf_counter()
+        path, rule, source = resolve_resource(name, refresh=args.refresh)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        status = "✓" if os.path.exists(path) else "✗"
+        print(f"{status} {name}: {path}")
+        print(f"    regra: {RESOURCE_RULES[rule]} ({rule}), origem: {source}, {elapsed_ms:.3f} ms")
+
+    start = time.perf_counter()
+    probe_resources(RESOURCE_NAMES)
+    print(f"\nPesquisa completa sem cache: {(time.perf_counter() - start) * 1000:.3f} ms")
+    print(f"Cache: {_resource_cache_path()}"
+          + (" (desativada por SINT_NO_CACHE)" if os.getenv("SINT_NO_CACHE") else ""))
+    return 0
+
+COMMANDS = {
+    "batch": cmd_batch,
+    "lookup": cmd_lookup,
+    "daemon": cmd_daemon,
+    "session": cmd_session,
+    "migrate": cmd_migrate,
+    "sync": cmd_sync,
+    "variants": cmd_variants,
+    "compose": cmd_compose,
+    "fold": cmd_fold,
+    "search": cmd_search,
+    "history": cmd_history,
+    "undo": cmd_undo,
+    "patch": cmd_patch,
+    "pack": cmd_pack,
+    "compact": cmd_compact,
+    "backup": cmd_backup,
+    "where": cmd_where,
+}
+
+def parse_args(argv):
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog="sintese",
+        description="Gerador de sínteses de avaliação. Sem argumentos, inicia o modo interativo.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("batch", help="gerar sínteses para uma turma a partir de um CSV")
+    p.add_argument("roster", help="CSV com Nome, Genero e os seis critérios (s/n ou 1/0)")
+    p.add_argument("-o", "--output", required=True, help="ficheiro de saída (.csv ou .md)")
+    p.add_argument("--format", choices=("csv", "md"), help="forçar o formato de saída")
+    p.add_argument("--names", action="store_true",
+                   help="personalizar os textos com o nome de cada aluno (\"A Ana é…\")")
+    p.add_argument("--no-article", action="store_true", help="nomes sem artigo (\"Ana é…\")")
+
+    p = sub.add_parser("lookup", help="textos para códigos como F110101 (argumentos ou stdin)")
+    p.add_argument("codes", nargs="*", metavar="CODIGO",
+                   help="género + seis critérios (0/1); sem códigos ou '-', lê um por linha do stdin")
+    p.add_argument("--format", choices=LOOKUP_FORMATS, default="text",
+                   help="text: uma linha por texto; nul: separados por NUL; jsonl: um objeto JSON por linha")
+    p.add_argument("-0", dest="format", action="store_const", const="nul", help="o mesmo que --format nul")
+    p.add_argument("--daemon", action="store_true",
+                   help="consultar o daemon, se estiver ativo (também SINT_DAEMON=1)")
+
+    p = sub.add_parser("daemon", help="manter os textos em memória e responder a consultas rápidas")
+    p.add_argument("--tcp", type=int, nargs="?", const=0, metavar="PORTA",
+                   help="escutar em 127.0.0.1 (porta livre por omissão) em vez de um socket Unix")
+    p.add_argument("--stop", action="store_true", help="terminar o daemon ativo")
+    p.add_argument("--status", action="store_true", help="verificar se o daemon está ativo")
+
+    p = sub.add_parser("session", help="sessão contínua: vários alunos sem reiniciar o programa")
+    p.add_argument("--queue", action="store_true",
+                   help="juntar os textos numa fila e copiá-los todos de uma vez (tecla c)")
+    p.add_argument("--no-raw", action="store_true",
+                   help="responder com ENTER em vez de uma só tecla (também SINT_NO_RAW=1)")
+    p.add_argument("--names", action="store_true", help="pedir o nome de cada aluno e usá-lo no texto")
+    p.add_argument("--no-article", action="store_true", help="nomes sem artigo (\"Ana é…\")")
+    p.add_argument("--immediate", action="store_true",
+                   help="gravar cada edição logo em base.db em vez de em lotes")
+
+    p = sub.add_parser("migrate", help="atualizar o esquema de base.db (índices, duplicados)")
+    p.add_argument("--db", help="caminho da base de dados (por omissão, base.db encontrado)")
+
+    p = sub.add_parser("sync", help="sincronizar base.db com base.json (só o que mudou)")
+    p.add_argument("--json", help="caminho de base.json")
+    p.add_argument("--db", help="caminho de base.db")
+    p.add_argument("--keep-missing", action="store_true",
+                   help="não remover entradas que já não existem em base.json")
+
+    p = sub.add_parser("variants", help="listar ou acrescentar variantes de texto para um código")
+    p.add_argument("code", metavar="CODIGO", help="género + seis critérios, p.ex. F110101")
+    p.add_argument("--add", metavar="TEXTO", help="acrescentar uma nova variante com este texto")
+
+    p = sub.add_parser("compose", help="compor um texto com níveis graduados e critérios extra")
+    p.add_argument("code", metavar="CODIGO", help="género + seis critérios, p.ex. F110101")
+    p.add_argument("levels", nargs="*", metavar="CAMPO=NIVEL",
+                   help="níveis a acrescentar ou substituir, p.ex. Empenho=3 TPC=1 Comportamento=2")
+    p.add_argument("--source", action="store_true", help="indicar se o texto veio da base ou foi composto")
+    p.add_argument("--no-db", action="store_true", help="compor sempre, ignorando os textos de base.db")
+
+    p = sub.add_parser("fold", help="juntar os textos M/F em modelos com flexão de género")
+    p.add_argument("--db", help="caminho de base.db")
+    p.add_argument("--dry-run", action="store_true", help="só mostrar o relatório, sem alterar nada")
+
+    p = sub.add_parser("search", help="pesquisar texto em todas as sínteses (e substituir uma frase)")
+    p.add_argument("phrase", nargs="+", metavar="FRASE", help="frase a procurar")
+    p.add_argument("--replace", metavar="NOVA", help="substituir a frase por NOVA em todos os textos encontrados")
+    p.add_argument("--dry-run", action="store_true", help="com --replace: só mostrar as alterações")
+    p.add_argument("--yes", "-y", action="store_true", help="com --replace: não pedir confirmação")
+    p.add_argument("--fts", action="store_true", help="usar a sintaxe FTS5 (AND, OR, NEAR, prefixo*)")
+    p.add_argument("--limit", type=int, default=0, help="mostrar no máximo N resultados")
+    p.add_argument("--db", help="caminho de base.db")
+
+    p = sub.add_parser("history", help="listar as últimas edições de textos")
+    p.add_argument("code", nargs="?", metavar="CODIGO", help="só as edições deste código, p.ex. F110101")
+    p.add_argument("--limit", type=int, default=20, help="número de edições a mostrar (20)")
+
+    p = sub.add_parser("undo", help="desfazer uma edição (por omissão a última)")
+    p.add_argument("id", nargs="?", type=int, metavar="N", help="número da edição, ver `history`")
+    p.add_argument("--force", action="store_true", help="desfazer mesmo que o texto tenha mudado depois")
+
+    p = sub.add_parser("patch", help="aplicar várias edições de um ficheiro numa só transação")
+    p.add_argument("file", metavar="FICHEIRO",
+                   help="uma linha por edição: CODIGO texto novo, ou CODIGO s/regex/novo/[gi] (- para stdin)")
+    p.add_argument("--dry-run", action="store_true", help="só mostrar as alterações")
+    p.add_argument("--yes", "-y", action="store_true", help="não pedir confirmação")
+    p.add_argument("--json", action="store_true", help="reescrever base.json com as alterações (em vez de só as registar no diário)")
+    p.add_argument("--db", help="caminho de base.db")
+
+    p = sub.add_parser("pack", help="compilar os textos num ficheiro binário para consultas rápidas")
+    p.add_argument("--check", action="store_true", help="só indicar se o ficheiro está atualizado")
+    p.add_argument("--db", help="caminho de base.db")
+
+    p = sub.add_parser("compact", help="aplicar o diário de edições a base.json")
+    p.add_argument("--json", help="caminho de base.json")
+
+    p = sub.add_parser("backup", help="criar um backup comprimido de base.db (se mudou)")
+    p.add_argument("--db", help="caminho de base.db")
+    p.add_argument("--json", action="store_true", help="incluir também base.json")
+    p.add_argument("--list", type=int, default=0, metavar="N", help="listar os N backups mais recentes")
+
+    p = sub.add_parser("where", help="mostrar onde base.db e base.json foram encontrados (também --where)")
+    p.add_argument("--refresh", action="store_true", help="ignorar a cache e pesquisar de novo")
+
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    if argv:
+        if argv[0] == "--where":
+            argv = ["where"] + list(argv[1:])
+        elif all(is_criteria_code(a) for a in argv):
+            # Plain codes skip argparse, which costs more than the lookup itself
+            from types import SimpleNamespace
+            return cmd_lookup(SimpleNamespace(codes=list(argv), format="text", daemon=False))
+        elif argv[0] == "-" or is_criteria_code(argv[0]):
+            argv = ["lookup"] + list(argv)
+        args = parse_args(argv)
+        return COMMANDS[args.command](args)
+
+    press_enter_prompt()
+    db_path = get_database_path()
+    json_path = get_json_path()
+    
+    # Check if database exists
+    ensure_database_exists(db_path)
+
+    # One student: write the edit at once, so a conflict is resolved on the spot
+    session = Session(db_path, json_path, write_behind=False)
+    try:
+        handle_student(session)
+    except QuitRequested:
+        pass
+    finally:
+        session.close()
+
 if __name__ == '__main__':
-    main()
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark: lookup latency through `sintese daemon` vs a cold start.
+
+Starts a daemon on a private cache dir, then compares
+  - a cold `cli.py <code>` launch reading base.db directly,
+  - the same launch answered by the daemon (thin client, SINT_DAEMON=1),
+  - one request on an open DaemonClient connection (no process start at all).
+
+Usage (from the project root):
+    python scripts/bench_daemon.py [launches] [requests]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+
+from cli import DaemonClient
+
+CLI = os.path.join(project_dir, "cli.py")
+CODE = "F110101"
+
+def time_launches(env, launches):
+    best = float("inf")
+    total = 0.0
+    for _ in range(launches):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, CLI, CODE], env=env, stdout=subprocess.DEVNULL, check=True)
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        total += elapsed
+    return total / launches, best
+
+def wait_for_daemon(timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        client = DaemonClient.connect()
+        if client is not None:
+            return client
+        time.sleep(0.05)
+    raise RuntimeError("o daemon não arrancou")
+
+def main():
+    launches = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ["SINT_CACHE_DIR"] = cache_dir
+        env = dict(os.environ)
+
+        cold = time_launches(env, launches)
+
+        daemon = subprocess.Popen([sys.executable, CLI, "daemon"], env=env, stdout=subprocess.DEVNULL)
+        try:
+            client = wait_for_daemon()
+            thin = time_launches(dict(env, SINT_DAEMON="1"), launches)
+
+            start = time.perf_counter()
+            for _ in range(requests):
+                client.get(CODE)
+            per_request = (time.perf_counter() - start) / requests
+            client.stop()
+            client.close()
+        finally:
+            daemon.wait(timeout=10)
+
+    print(f"{'cold start (direct DB)':<32} avg {cold[0] * 1000:8.2f} ms  best {cold[1] * 1000:8.2f} ms")
+    print(f"{'cold start (via daemon)':<32} avg {thin[0] * 1000:8.2f} ms  best {thin[1] * 1000:8.2f} ms")
+    print(f"{'open connection, per request':<32}     {per_request * 1e6:8.2f} µs")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark: SQL lookup (build_and_run_query) vs in-memory TextTable.
+
+Runs every one of the 128 criteria combinations several times through both
+paths and prints the average cost per lookup.
+
+Usage (from the project root):
+    python scripts/bench_lookup.py [rounds]
+"""
+import os
+import sys
+import time
+from itertools import product
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+
+from cli import (
+    get_database_path,
+    build_and_run_query,
+    forget_text_table,
+    get_text_table,
+    pack_criteria,
+)
+
+def bench(label, fn, combos, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for combo in combos:
+            fn(*combo)
+    elapsed = time.perf_counter() - start
+    per_lookup = elapsed / (rounds * len(combos))
+    print(f"{label:<28} {elapsed * 1000:10.2f} ms total  {per_lookup * 1e6:10.2f} µs/lookup")
+    return per_lookup
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    db_path = get_database_path()
+    combos = list(product(['M', 'F'], [0, 1], [0, 1], [0, 1], [0, 1], [0, 1], [0, 1]))
+
+    print(f"Database: {db_path}")
+    print(f"Lookups per path: {rounds * len(combos)}\n")
+
+    sql = bench("build_and_run_query (SQL)", lambda *c: build_and_run_query(db_path, *c), combos, rounds)
+
+    forget_text_table(db_path)
+    start = time.perf_counter()
+    table = get_text_table(db_path)
+    load_ms = (time.perf_counter() - start) * 1000
+    print(f"{'TextTable load (once)':<28} {load_ms:10.2f} ms")
+
+    codes = [(pack_criteria(*c),) for c in combos]
+    mem = bench("TextTable.get (packed code)", table.get, codes, rounds)
+    bench("TextTable.lookup (criteria)", table.lookup, combos, rounds)
+
+    print(f"\nSpeed-up (packed code vs SQL): {sql / mem:,.0f}x")
+
+if __name__ == "__main__":
+    main()
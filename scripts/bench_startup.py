@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for cli.py.
+
+Reports:
+  1. `python -X importtime -c "import cli"`: cumulative import time of cli and
+     the slowest modules it pulls in.
+  2. Wall-clock time from process launch to the first prompt
+     ("Novo aluno? PRESS ENTER TO CONTINUE").
+
+Usage (from the project root):
+    python scripts/bench_startup.py [runs]
+"""
+import os
+import sys
+import time
+import statistics
+import subprocess
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI_PATH = os.path.join(project_dir, "cli.py")
+FIRST_PROMPT = "Novo aluno?".encode("utf-8")
+
+def import_times(code="import cli"):
+    """Run code under -X importtime; returns {module: (self_us, cumulative_us)}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=project_dir, capture_output=True, text=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+def time_to_first_prompt():
+    """Seconds from launching `python cli.py` until the first prompt is printed."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, CLI_PATH], cwd=project_dir,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    try:
+        seen = b""
+        while FIRST_PROMPT not in seen:
+            chunk = os.read(proc.stdout.fileno(), 256)
+            if not chunk:
+                raise RuntimeError("cli.py exited before showing the first prompt")
+            seen += chunk
+        return time.perf_counter() - start
+    finally:
+        proc.kill()
+        proc.wait()
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    baseline = import_times("pass")
+    times = import_times()
+    added = {name: t for name, t in times.items() if name not in baseline}
+    print(f"import cli: {times['cli'][1] / 1000:.1f} ms cumulative "
+          f"({len(added)} modules beyond interpreter startup)")
+    for name, (self_us, cum_us) in sorted(added.items(), key=lambda kv: -kv[1][1])[:10]:
+        print(f"  {cum_us / 1000:8.2f} ms  {name}")
+
+    samples = [time_to_first_prompt() for _ in range(runs)]
+    print(f"\nTime to first prompt over {runs} runs: "
+          f"min {min(samples) * 1000:.1f} ms, median {statistics.median(samples) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
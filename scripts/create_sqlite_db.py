@@ -1,60 +1,28 @@
-import json
-import sqlite3
 import os
+import sys
 
 BASE_JSON = "base.json"
 DB_FILE = "base.db"
 
+# base.json / base.db live in the project root, one level above scripts/
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+from cli import sync_json_to_db
+
 def main():
-    root = os.path.dirname(__file__)
     json_path = os.path.join(root, BASE_JSON)
     db_path = os.path.join(root, DB_FILE)
 
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS sinteses (
-            id INTEGER PRIMARY KEY,
-            Texto TEXT,
-            Genero TEXT,
-            Assiduidade INTEGER,
-            Pontualidade INTEGER,
-            Participacao INTEGER,
-            Interesse INTEGER,
-            Empenho INTEGER,
-            Dificuldades INTEGER
-        )
-        """
-    )
-
-    inserted = 0
-    for item in data:
-        texto = item.get("Texto")
-        genero = item.get("Genero")
-        ass = item.get("Assiduidade")
-        pont = item.get("Pontualidade")
-        # JSON may use 'Participação' with accent; try both keys
-        particip = item.get("Participacao") if item.get("Participacao") is not None else item.get("Participação")
-        interesse = item.get("Interesse")
-        empenho = item.get("Empenho")
-        dificuldades = item.get("Dificuldades")
-
-        cur.execute(
-            "INSERT INTO sinteses (Texto,Genero,Assiduidade,Pontualidade,Participacao,Interesse,Empenho,Dificuldades) VALUES (?,?,?,?,?,?,?,?)",
-            (texto, genero, ass, pont, particip, interesse, empenho, dificuldades),
-        )
-        inserted += 1
-
-    conn.commit()
-    conn.close()
+    # Creates the table on a fresh DB (or migrates an existing one in place)
+    # and writes only the entries that changed since the last run.
+    counts = sync_json_to_db(json_path, db_path)
 
     print(f"Created SQLite DB: {db_path}")
-    print(f"Inserted rows: {inserted}")
+    print(f"Inserted rows: {counts['inserted']}")
+    print(f"Updated rows: {counts['updated']}")
+    print(f"Unchanged rows: {counts['unchanged']}")
+    print(f"Deleted rows: {counts['deleted']}")
 
 
 if __name__ == "__main__":
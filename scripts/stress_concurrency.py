@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Stress test: several processes editing and reading one base.db at once.
+
+Works on a copy of base.db. Writers repeatedly read a text's version, think
+for a moment and save with that version (optimistic update, as the
+interactive session does); a few hot combinations make them collide.
+Readers run lookups meanwhile. Reports throughput, conflicts and
+"database is locked" errors, and checks that no successful write was lost
+(the Versao increments on the hot rows equal the number of writes).
+
+Usage (from the project root):
+    python scripts/stress_concurrency.py [writers] [readers] [seconds] [hot]
+"""
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+
+from cli import (
+    CRITERIA_FIELDS,
+    SELECT_TEXT_SQL,
+    EditConflict,
+    connect_db,
+    get_database_path,
+    migrate_db,
+    read_version,
+    unpack_criteria,
+    write_text,
+)
+
+def hot_criteria(count):
+    """The first count combinations, as criteria dicts."""
+    return [dict(zip(CRITERIA_FIELDS, unpack_criteria(code))) for code in range(count)]
+
+def writer(db_path, hot, seconds, seed, results):
+    rng = random.Random(seed)
+    counts = {"writes": 0, "conflicts": 0, "locked": 0}
+    conn = connect_db(db_path)
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        criteria = rng.choice(hot)
+        try:
+            version, texto = read_version(conn, criteria)
+            time.sleep(rng.random() * 0.002)  # the teacher "edits"
+            with conn:
+                write_text(conn, criteria, f"{texto.split(' #')[0]} #{seed}-{counts['writes']}",
+                           expected=version)
+            counts["writes"] += 1
+        except EditConflict:
+            counts["conflicts"] += 1
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            counts["locked"] += 1
+    conn.close()
+    results.put(("writer", counts))
+
+def reader(db_path, seconds, seed, results):
+    rng = random.Random(seed)
+    counts = {"reads": 0, "locked": 0}
+    conn = connect_db(db_path)
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        criteria = unpack_criteria(rng.randrange(128))
+        try:
+            conn.execute(SELECT_TEXT_SQL, criteria).fetchone()
+            counts["reads"] += 1
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            counts["locked"] += 1
+    conn.close()
+    results.put(("reader", counts))
+
+def _total_versions(db_path, hot):
+    conn = connect_db(db_path)
+    try:
+        return sum(read_version(conn, criteria)[0][2] for criteria in hot)
+    finally:
+        conn.close()
+
+def run_stress(db_path, writers=4, readers=2, seconds=3.0, hot=4):
+    """Run the processes against db_path; returns the summed counts plus 'lost' and 'seconds'."""
+    conn = connect_db(db_path)
+    migrate_db(conn)
+    conn.close()
+    criteria = hot_criteria(hot)
+    before = _total_versions(db_path, criteria)
+
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=writer, args=(db_path, criteria, seconds, i, results))
+             for i in range(writers)]
+    procs += [multiprocessing.Process(target=reader, args=(db_path, seconds, 100 + i, results))
+              for i in range(readers)]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    totals = {"writes": 0, "conflicts": 0, "reads": 0, "locked": 0}
+    for _ in procs:
+        _, counts = results.get()
+        for key, value in counts.items():
+            totals[key] += value
+    for p in procs:
+        p.join()
+    totals["seconds"] = time.perf_counter() - start
+    totals["lost"] = totals["writes"] - (_total_versions(db_path, criteria) - before)
+    return totals
+
+def main():
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 3.0
+    hot = int(sys.argv[4]) if len(sys.argv) > 4 else 4
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "base.db")
+        shutil.copy(get_database_path(), db_path)
+        t = run_stress(db_path, writers, readers, seconds, hot)
+
+    print(f"{writers} escritores, {readers} leitores, {hot} combinações disputadas, {t['seconds']:.1f} s")
+    print(f"  escritas   {t['writes']:8d}  ({t['writes'] / t['seconds']:8.0f}/s)")
+    print(f"  leituras   {t['reads']:8d}  ({t['reads'] / t['seconds']:8.0f}/s)")
+    print(f"  conflitos  {t['conflicts']:8d}")
+    print(f"  bloqueios  {t['locked']:8d}")
+    print(f"  perdidas   {t['lost']:8d}")
+    return 1 if t["lost"] or t["locked"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    hiddenimports=['sqlite3'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
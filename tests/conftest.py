@@ -0,0 +1,31 @@
+"""
+Every test runs against its own copy of base.db and base.json: SINT_BASE_DIR
+points at a temporary folder, so get_database_path()/get_json_path() (and any
+subprocess started by a test) never touch the files shipped in the repository.
+The resource cache is kept in the same folder.
+"""
+import os
+import shutil
+import sys
+
+import pytest
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+
+import cli
+
+@pytest.fixture(autouse=True)
+def private_base(tmp_path, monkeypatch):
+    base_dir = tmp_path / "base"
+    base_dir.mkdir()
+    for name in cli.RESOURCE_NAMES:
+        shutil.copy2(os.path.join(project_dir, name), base_dir / name)
+    monkeypatch.setenv("SINT_BASE_DIR", str(base_dir))
+    monkeypatch.setenv("SINT_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.delenv("SINT_NO_CACHE", raising=False)
+    cli._RESOLVED.clear()
+    cli.forget_text_table()
+    yield base_dir
+    cli._RESOLVED.clear()
+    cli.forget_text_table()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for the compressed, deduplicated backups of base.db / base.json.
+Everything happens in the private base folder that tests/conftest.py provides.
+"""
+import os
+import sys
+import gzip
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cli import (
+    get_database_path,
+    get_json_path,
+    get_backup_dir,
+    backup_db,
+    backup_json,
+    list_backups,
+    prune_backups,
+)
+
+def test_backup_skips_unchanged_db(tmp_path):
+    """A second backup without changes is skipped; a change creates a new snapshot"""
+    print("\n=== Teste: Backup de base.db ===")
+    db_path = get_database_path()
+    assert backup_db(db_path)
+    assert backup_db(db_path)
+    backups = list_backups(db_path)
+    assert len(backups) == 1, backups
+
+    # The snapshot is a complete, compressed SQLite database
+    restored = tmp_path / "restored.db"
+    with gzip.open(backups[0][1], "rb") as src, open(restored, "wb") as dst:
+        dst.write(src.read())
+    conn = sqlite3.connect(restored)
+    assert conn.execute("SELECT COUNT(*) FROM sinteses").fetchone()[0] > 0
+    conn.close()
+    assert os.path.getsize(backups[0][1]) < os.path.getsize(db_path)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE sinteses SET Texto = Texto || '.' WHERE id = 1")
+    conn.commit()
+    conn.close()
+    assert backup_db(db_path)
+    assert len(list_backups(db_path)) == 2
+    print("✓ Backups só quando há alterações")
+
+def test_touched_but_identical_file_is_skipped():
+    """Same content with a new mtime is detected through the content digest"""
+    print("\n=== Teste: Backup de base.json ===")
+    json_path = get_json_path()
+    assert backup_json(json_path)
+    os.utime(json_path, None)
+    assert backup_json(json_path)
+    assert len(list_backups(json_path)) == 1
+    print("✓ Conteúdo idêntico não gera novo backup")
+
+def test_retention_policy():
+    """Keep the newest N plus one per day for the last D days"""
+    print("\n=== Teste: Política de retenção ===")
+    db_path = get_database_path()
+    folder = get_backup_dir(db_path)
+    os.makedirs(folder)
+    now = datetime(2025, 12, 17, 12, 0, 0)
+    # 5 days x 3 snapshots per day
+    for day in range(5):
+        for hour in range(3):
+            stamp = now - timedelta(days=day, hours=hour)
+            name = f"base.db.{stamp:%Y%m%d_%H%M%S_%f}.gz"
+            open(os.path.join(folder, name), "wb").close()
+
+    removed = prune_backups(db_path, keep_last=2, keep_daily=3)
+    kept = [stamp for stamp, _ in list_backups(db_path)]
+    # 2 newest (both from day 0) + newest of days 1 and 2
+    assert len(removed) == 11, len(removed)
+    assert kept == [now, now - timedelta(hours=1),
+                    now - timedelta(days=1), now - timedelta(days=2)], kept
+    print(f"✓ {len(kept)} backups mantidos, {len(removed)} removidos")
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, "-q"]))
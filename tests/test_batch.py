@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for the batch roster mode (`sintese batch roster.csv -o out.csv`).
+Uses a temporary roster and the project's base.db (read-only).
+"""
+import os
+import sys
+import csv
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cli import (
+    get_database_path,
+    build_and_run_query,
+    read_roster,
+    run_batch,
+    main,
+)
+
+ROSTER = """Nome;Género;Assiduidade;Pontualidade;Participação;Interesse;Empenho;Dificuldades
+Ana Silva;F;s;s;s;s;s;n
+Bruno Costa;M;1;1;0;1;0;1
+Carla Dias;F;sim;sim;sim;sim;sim;não
+Daniel;X;s;s;s;s;s;s
+"""
+
+def _write_roster(folder):
+    path = os.path.join(folder, "turma.csv")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(ROSTER)
+    return path
+
+def test_read_roster():
+    """Roster rows are parsed into CRITERIA_FIELDS order; bad rows are flagged"""
+    print("\n=== Teste: Leitura do CSV da turma ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = list(read_roster(_write_roster(tmp)))
+
+    assert rows[0] == (2, "Ana Silva", ("F", 1, 1, 1, 1, 1, 0))
+    assert rows[1] == (3, "Bruno Costa", ("M", 1, 1, 0, 1, 0, 1))
+    assert rows[3][2] is None, "Género inválido deve ser assinalado"
+    print("✓ 4 linhas lidas, 1 inválida")
+
+def test_run_batch_csv():
+    """Each student gets the text of their combination; repeats are resolved once"""
+    print("\n=== Teste: Modo de turma (CSV) ===")
+    db_path = get_database_path()
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = os.path.join(tmp, "sinteses.csv")
+        stats = run_batch(db_path, _write_roster(tmp), out_path)
+        with open(out_path, "r", encoding="utf-8-sig", newline="") as f:
+            out = list(csv.reader(f, delimiter=";"))
+
+    assert stats == {"alunos": 3, "combinacoes": 2, "sem_texto": 0, "invalidas": 1}, stats
+    assert out[0][0] == "Nome" and out[0][-1] == "Texto"
+    assert [r[0] for r in out[1:]] == ["Ana Silva", "Bruno Costa", "Carla Dias"]
+    expected = build_and_run_query(db_path, "F", 1, 1, 1, 1, 1, 0)
+    assert out[1][-1] == expected and out[3][-1] == expected
+    print(f"✓ {stats['alunos']} alunos, {stats['combinacoes']} combinações distintas")
+
+def test_batch_command_markdown():
+    """`main(['batch', ...])` writes Markdown when the output ends in .md"""
+    print("\n=== Teste: Comando batch (Markdown) ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = os.path.join(tmp, "sinteses.md")
+        code = main(["batch", _write_roster(tmp), "-o", out_path])
+        with open(out_path, "r", encoding="utf-8") as f:
+            content = f.read()
+
+    assert code == 0
+    assert "## Ana Silva" in content and "## Bruno Costa" in content
+    assert "## Daniel" not in content
+    print("✓ Markdown gerado")
+
+if __name__ == '__main__':
+    test_read_roster()
+    test_run_batch_csv()
+    test_batch_command_markdown()
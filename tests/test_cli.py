@@ -10,7 +10,7 @@ from unittest import mock
 from io import StringIO
 
 # Import the functions from cli
-from cli import build_and_run_query, main
+from cli import build_and_run_query, get_database_path, main
 
 def test_missing_database():
     """Test that the error occurs when database file doesn't exist"""
@@ -96,7 +96,7 @@ def test_full_simulation():
     print("-" * 50)
     
     # Do not modify or backup existing base.db — backup feature removed
-    db_existed = os.path.exists("base.db")
+    db_existed = os.path.exists(get_database_path())
     
     try:
         # Mock user inputs matching the error scenario
@@ -134,14 +134,15 @@ def test_with_correct_database():
     print("Test 4: Verify correct behavior with proper database")
     print("-" * 50)
     
-    if not os.path.exists("base.db"):
+    db_path = get_database_path()
+    if not os.path.exists(db_path):
         print("⚠️  SKIPPED: base.db doesn't exist. Run create_sqlite_db.py first.")
         print()
         return
     
     try:
         result = build_and_run_query(
-            db_path="base.db",
+            db_path=db_path,
             genero="M",
             assid=1,
             punt=1,
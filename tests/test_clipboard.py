@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests for the clipboard subsystem using a fake backend (no real clipboard needed).
+"""
+import os
+import sys
+from unittest import mock
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cli
+from cli import (
+    ClipboardQueue,
+    Session,
+    copy_to_clipboard,
+    get_clipboard_backend,
+    get_database_path,
+    get_json_path,
+    run_session,
+    set_clipboard_backend,
+)
+
+class FakeClipboard:
+    name = "fake"
+    created = 0
+
+    def __init__(self):
+        FakeClipboard.created += 1
+        self.copies = []
+
+    def copy(self, text):
+        self.copies.append(text)
+
+class BrokenClipboard:
+    name = "broken"
+
+    def __init__(self):
+        raise RuntimeError("indisponível")
+
+def test_backend_detected_once():
+    """The first working backend is kept for every later copy"""
+    print("\n=== Teste: Deteção única do backend ===")
+    FakeClipboard.created = 0
+    set_clipboard_backend(None)
+    try:
+        with mock.patch.object(cli, "_clipboard_candidates",
+                               return_value=iter([BrokenClipboard, FakeClipboard])) as candidates:
+            assert copy_to_clipboard("primeiro")
+            assert copy_to_clipboard("segundo")
+            assert copy_to_clipboard("terceiro")
+        backend = get_clipboard_backend()
+        assert candidates.call_count == 1
+        assert FakeClipboard.created == 1
+        assert backend.copies == ["primeiro", "segundo", "terceiro"]
+    finally:
+        set_clipboard_backend(None)
+    print("✓ Backend criado uma só vez")
+
+def test_no_backend():
+    """Without any working backend copy_to_clipboard() reports failure"""
+    print("\n=== Teste: Sem backend ===")
+    set_clipboard_backend(None)
+    with mock.patch.object(cli, "_clipboard_candidates", return_value=iter([BrokenClipboard])):
+        assert copy_to_clipboard("texto") is False
+    assert get_clipboard_backend() is None
+    print("✓ Falha reportada")
+
+def test_queue_flush():
+    """Queued texts are copied together in a single clipboard write"""
+    print("\n=== Teste: Fila de textos ===")
+    fake = FakeClipboard()
+    set_clipboard_backend(fake)
+    try:
+        queue = ClipboardQueue()
+        queue.add("Texto do aluno 1.")
+        queue.add("Texto do aluno 2.")
+        queue.replace_last("Texto do aluno 2, editado.")
+        assert len(queue) == 2
+        assert queue.flush()
+        assert len(queue) == 0
+        assert fake.copies == ["Texto do aluno 1.\n\nTexto do aluno 2, editado."]
+    finally:
+        set_clipboard_backend(None)
+    print("✓ Fila copiada de uma vez")
+
+def test_session_queue_mode():
+    """`session --queue` copies nothing per student and everything at the end"""
+    print("\n=== Teste: Sessão com fila ===")
+    fake = FakeClipboard()
+    set_clipboard_backend(fake)
+    db_path = get_database_path()
+    inputs = [
+        "", "M", "s", "s", "s", "s", "s", "s", "n",
+        "", "F", "s", "s", "s", "s", "s", "s", "n",
+        "q",
+    ]
+    try:
+        with mock.patch("builtins.input", side_effect=inputs):
+            session = Session(db_path, get_json_path(), queue_clipboard=True)
+            run_session(session)
+    finally:
+        set_clipboard_backend(None)
+        cli.forget_text_table(db_path)
+    assert len(fake.copies) == 1
+    assert fake.copies[0].count("\n\n") == 1
+    print("✓ Dois textos copiados no fim da sessão")
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, "-q"]))
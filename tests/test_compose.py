@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for the compositional engine: clause joining, gender agreement, the
+LRU cache and DB rows taking priority over composed text.
+"""
+import os
+import sys
+from itertools import product
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cli
+from cli import (
+    COMPOSE_CLAUSES,
+    CRITERIA_FIELDS,
+    compose_text,
+    get_database_path,
+    lookup_text,
+    parse_levels,
+    resolve_profile,
+)
+
+BINARY = dict(zip(CRITERIA_FIELDS[1:], (1, 1, 0, 1, 0, 1)))
+
+def test_compose_agreement_and_joining():
+    """Gender endings agree and clauses are joined by polarity"""
+    print("\n=== Teste: Composição ===")
+    assert compose_text("F", BINARY) == (
+        "A aluna é assídua e pontual, mas pouco participativa. "
+        "Revela interesse nas atividades propostas, mas o empenho não foi satisfatório. "
+        "Apresenta algumas dificuldades."
+    )
+    graded = dict(BINARY, Empenho=2, TPC=1, Comportamento=1, Dificuldades=0)
+    assert compose_text("M", graded) == (
+        "O aluno é assíduo e pontual, mas pouco participativo. "
+        "Revela interesse nas atividades propostas, bom empenho nas tarefas "
+        "e realiza os trabalhos de casa com regularidade. Revela um comportamento adequado."
+    )
+    # Mixed polarities (F101010): positives are grouped before the single ", mas"
+    mixed = dict(zip(CRITERIA_FIELDS[1:], (1, 0, 1, 0, 1, 0)))
+    assert compose_text("F", mixed) == (
+        "A aluna é assídua e participativa, mas pouco pontual. "
+        "Revela empenho nas tarefas, mas deverá demonstrar interesse pelas atividades propostas."
+    )
+    try:
+        compose_text("F", dict(BINARY, Empenho=7))
+        assert False, "esperava ValueError"
+    except ValueError:
+        pass
+    print("✓ Concordância e ligações corretas")
+
+def test_every_profile_composes():
+    """All level combinations produce a sentence; the clause tables stay linear"""
+    print("\n=== Teste: Todas as combinações ===")
+    fields = list(COMPOSE_CLAUSES)
+    combos = 0
+    for genero in ("M", "F"):
+        for levels in product(*(sorted(COMPOSE_CLAUSES[f]) for f in fields)):
+            texto = compose_text(genero, dict(zip(fields, levels)))
+            assert texto.endswith(".") and texto[0].isupper()
+            assert all(sentence.count(", mas") <= 1 for sentence in texto.split(". "))
+            combos += 1
+    clauses = sum(len(table) for table in COMPOSE_CLAUSES.values())
+    info = cli._COMPOSE_CACHED.cache_info()
+    print(f"✓ {combos} combinações a partir de {clauses} orações (cache: {info.currsize})")
+    assert clauses < 30 < combos
+
+def test_db_rows_take_priority():
+    """Binary profiles use the authored DB text; others are composed"""
+    print("\n=== Teste: Prioridade da base de dados ===")
+    db_path = get_database_path()
+    texto, source = resolve_profile(db_path, "F", BINARY)
+    assert source == "db"
+    assert texto == lookup_text(db_path, "F", *BINARY.values())
+
+    texto, source = resolve_profile(db_path, "F", dict(BINARY, Empenho=3))
+    assert source == "composto" and "empenho muito bom" in texto
+    assert parse_levels(["empenho=3", "TPC=0"]) == {"Empenho": 3, "TPC": 0}
+    print("✓ Texto da base quando existe")
+
+if __name__ == "__main__":
+    test_compose_agreement_and_joining()
+    test_every_profile_composes()
+    test_db_rows_take_priority()
+    print("\n✓ Todos os testes passaram")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for shared use of base.db: WAL mode, row versions bumped by trigger,
+optimistic updates that refuse to overwrite a colleague's edit, and a short
+multi-process run of scripts/stress_concurrency.py. Works on the private copy
+of base.db that tests/conftest.py provides.
+"""
+import os
+import sys
+
+import pytest
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+sys.path.insert(0, os.path.join(project_dir, "scripts"))
+
+from cli import (
+    CRITERIA_FIELDS,
+    EditConflict,
+    TextTable,
+    build_and_run_query,
+    connect_db,
+    fold_db,
+    get_database_path,
+    migrate_db,
+    read_version,
+    write_text,
+)
+
+CRITERIA = dict(zip(CRITERIA_FIELDS, ("F", 1, 1, 0, 1, 0, 1)))
+
+def test_wal_and_versions():
+    """Connections use WAL and every text change bumps Versao"""
+    print("\n=== Teste: WAL e versões ===")
+    conn = connect_db(get_database_path())
+    migrate_db(conn)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    version, texto = read_version(conn, CRITERIA)
+    assert version[0] == "sinteses" and version[2] == 0
+    with conn:
+        write_text(conn, CRITERIA, texto + " Revisto.")
+    assert read_version(conn, CRITERIA)[0][2] == 1
+    with conn:
+        conn.execute("UPDATE sinteses SET Texto = Texto || '!' WHERE id = ?", (version[1],))
+    assert read_version(conn, CRITERIA)[0][2] == 2
+    conn.close()
+    print("✓ Versao acompanha cada alteração")
+
+def test_lookups_leave_file_alone():
+    """Read-only lookups neither switch the journal mode nor create -wal/-shm files"""
+    print("\n=== Teste: Consultas sem escrita ===")
+    db_path = get_database_path()
+    with open(db_path, "rb") as f:
+        original = f.read()
+    assert build_and_run_query(db_path, "F", 1, 1, 0, 1, 0, 1)
+    assert TextTable.load(db_path).lookup("M", 0, 0, 0, 0, 0, 0)
+    with open(db_path, "rb") as f:
+        assert f.read() == original, "base.db alterado por uma consulta"
+    assert not [name for name in os.listdir(os.path.dirname(db_path)) if name.startswith("base.db-")]
+    print("✓ base.db intacto")
+
+def test_optimistic_update_detects_conflict():
+    """Two teachers edit the same text: the second save is refused"""
+    print("\n=== Teste: Conflito de edição ===")
+    db_path = get_database_path()
+    first, second = connect_db(db_path), connect_db(db_path)
+    migrate_db(first)
+    version, texto = read_version(first, CRITERIA)
+    assert read_version(second, CRITERIA)[0] == version
+
+    with first:
+        write_text(first, CRITERIA, "Texto da primeira professora.", expected=version)
+    try:
+        with second:
+            write_text(second, CRITERIA, "Texto da segunda professora.", expected=version)
+        assert False, "conflito não detetado"
+    except EditConflict as conflict:
+        assert conflict.current == "Texto da primeira professora."
+        with second:
+            write_text(second, CRITERIA, "Texto da segunda professora.", expected=conflict.version)
+    assert read_version(first, CRITERIA)[1] == "Texto da segunda professora."
+
+    # Texts from gender templates are versioned through the template
+    fold_db(first)
+    female = dict(zip(CRITERIA_FIELDS, ("F", 1, 1, 1, 1, 1, 1)))
+    male = dict(female, Genero="M")
+    version, texto = read_version(first, female)
+    assert version[0] == "templates"
+    with second:
+        write_text(second, male, read_version(second, male)[1] + " Revela interesse.", both_genders=True)
+    try:
+        with first:
+            write_text(first, female, texto + " Editado.", expected=version)
+        assert False, "conflito não detetado no modelo"
+    except EditConflict:
+        pass
+    first.close()
+    second.close()
+    print("✓ Segunda gravação recusada, texto da colega mostrado")
+
+def test_stress_no_lost_updates():
+    """Concurrent writers and readers: no locks reported, no write lost"""
+    print("\n=== Teste: Escritores e leitores concorrentes ===")
+    from stress_concurrency import run_stress
+
+    totals = run_stress(get_database_path(), writers=3, readers=1, seconds=0.5, hot=2)
+    print(f"  {totals}")
+    assert totals["writes"] and totals["reads"]
+    assert totals["locked"] == 0 and totals["lost"] == 0
+    print("✓ Sem bloqueios nem escritas perdidas")
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for the lookup daemon and its thin client (served from a thread on the
+private copy of base.db and cache dir that tests/conftest.py provides).
+"""
+import os
+import sys
+import threading
+from unittest import mock
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cli
+from cli import DaemonClient, escape_line, get_database_path, lookup_text, make_daemon_server, unescape_line
+
+def _serve(tcp_port=None):
+    db_path = get_database_path()
+    server = make_daemon_server(db_path, tcp_port)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return db_path, server, thread
+
+def _stop(server, thread):
+    client = DaemonClient.connect()
+    client.stop()
+    client.close()
+    thread.join(5)
+    server.server_close()
+
+def test_escape_roundtrip():
+    """Texts with newlines and backslashes travel on a single line"""
+    print("\n=== Teste: Escape de linhas ===")
+    for text in ("simples", "duas\nlinhas", "barra \\n literal", "fim\\", "a\r\nb"):
+        line = escape_line(text)
+        assert "\n" not in line and "\r" not in line
+        assert unescape_line(line) == text
+    print("✓ Ida e volta sem perdas")
+
+def test_daemon_get_set_and_stop():
+    """GET matches a direct lookup, SET updates the DB, STOP removes the marker"""
+    print("\n=== Teste: Daemon ===")
+    tcp_port = None if os.name == "posix" else 0
+    db_path, server, thread = _serve(tcp_port)
+    client = DaemonClient.connect()
+    assert client is not None
+    try:
+        assert client.ping() == os.getpid()
+        assert client.get("F110101") == lookup_text(db_path, "F", 1, 1, 0, 1, 0, 1)
+        try:
+            client.get("X1")
+            assert False, "esperava ValueError"
+        except ValueError:
+            pass
+
+        novo = "Texto novo\nem duas linhas, editado pelo daemon."
+        version = client.version("M000000")
+        assert client.set("M000000", novo, version)
+        assert client.get("M000000") == novo
+        cli.forget_text_table(db_path)
+        assert lookup_text(db_path, "M", 0, 0, 0, 0, 0, 0) == novo
+        # A second write based on the old version is refused
+        try:
+            client.set("M000000", "Texto escrito sobre uma versão antiga.", version)
+            assert False, "conflito não detetado"
+        except ValueError as e:
+            assert "conflito" in str(e)
+        assert client.get("M000000") == novo
+    finally:
+        client.close()
+        _stop(server, thread)
+    assert DaemonClient.connect() is None
+    cache_dir = cli.get_cache_dir()
+    assert "daemon.sock" not in os.listdir(cache_dir) and "daemon.token" not in os.listdir(cache_dir)
+    print("✓ GET, SET e STOP funcionam")
+
+def test_daemon_requires_token():
+    """Connections without the token from daemon.token are refused"""
+    print("\n=== Teste: Autenticação do daemon ===")
+    tcp_port = None if os.name == "posix" else 0
+    db_path, server, thread = _serve(tcp_port)
+    try:
+        token_path = os.path.join(cli.get_cache_dir(), "daemon.token")
+        if os.name == "posix":
+            assert os.stat(token_path).st_mode & 0o777 == 0o600
+            assert os.stat(os.path.join(cli.get_cache_dir(), "daemon.sock")).st_mode & 0o077 == 0
+        with open(token_path) as f:
+            token = f.read()
+        with open(token_path, "w") as f:
+            f.write("0" * len(token))
+        assert DaemonClient.connect() is None
+        with open(token_path, "w") as f:
+            f.write(token)
+    finally:
+        _stop(server, thread)
+    print("✓ Pedidos sem token recusados")
+
+def test_thin_client_fallback():
+    """lookup --daemon falls back to base.db when no daemon is running"""
+    print("\n=== Teste: Cliente sem daemon ===")
+    with mock.patch.object(cli, "run_lookup", return_value=(1, 0)) as run:
+        assert cli.main(["lookup", "--daemon", "F110101"]) == 0
+    assert run.call_args[0][0] is not None      # db_path used
+    assert run.call_args[0][4] is None          # no client
+
+    with open(os.path.join(cli.get_cache_dir(), "daemon.port"), "w") as f:
+        f.write("1")                            # stale port file
+    assert DaemonClient.connect() is None
+    print("✓ Recurso a base.db")
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
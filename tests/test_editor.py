@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for the editor subsystem: $EDITOR detection (cached), one temp file per
+entry in a private folder, and the built-in in-terminal line editor.
+"""
+import os
+import sys
+import tempfile
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cli
+from cli import (
+    edit_text_inline,
+    get_editor,
+    get_editor_file,
+    open_text_in_editor,
+    remove_editor_files,
+    set_editor,
+)
+
+FAKE_EDITOR = """import sys
+path = sys.argv[-1]
+with open(path, "a", encoding="utf-8") as f:
+    f.write(" Editado.")
+with open(path + ".calls", "a") as f:
+    f.write("x")
+"""
+
+def test_editor_env_is_honoured_and_cached():
+    """$EDITOR is used, detected once, and each entry reuses one temp file"""
+    print("\n=== Teste: Editor definido em $EDITOR ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "fake_editor.py")
+        with open(script, "w", encoding="utf-8") as f:
+            f.write(FAKE_EDITOR)
+        env = {"VISUAL": "", "EDITOR": f"{sys.executable} {script}"}
+        set_editor(None)
+        try:
+            with mock.patch.dict(os.environ, env), \
+                 mock.patch.object(cli, "_editor_candidates", wraps=cli._editor_candidates) as detect:
+                first = open_text_in_editor("Texto original.", entry_key=42)
+                second = open_text_in_editor(first, entry_key=42)
+                assert detect.call_count == 1
+            assert get_editor().argv[-1] == script
+        finally:
+            set_editor(None)
+
+        path = get_editor_file(42)
+        with open(path + ".calls") as f:
+            calls = f.read()
+        folder = os.path.dirname(path)
+        if os.name == "posix":
+            assert os.stat(folder).st_mode & 0o777 == 0o700, "pasta do editor acessível a outros"
+        remove_editor_files()
+        assert not os.path.exists(folder)
+        assert os.path.dirname(get_editor_file(42)) != folder
+        remove_editor_files()
+    assert first == "Texto original. Editado."
+    assert second == "Texto original. Editado. Editado."
+    assert calls == "xx", "Mesmo ficheiro temporário reutilizado"
+    print("✓ Editor detetado uma vez, ficheiro reutilizado")
+
+def test_failing_editor_falls_back():
+    """An editor that fails is skipped in favour of the next candidate"""
+    print("\n=== Teste: Editor que falha ===")
+
+    class FakeEditor:
+        def __init__(self, ok):
+            self.ok = ok
+            self.argv = ["fake-ok" if ok else "fake-broken"]
+            self.name = self.argv[0]
+
+        def edit_file(self, path):
+            return self.ok
+
+    set_editor(None)
+    try:
+        with mock.patch.object(cli, "_editor_candidates",
+                               side_effect=lambda: iter([FakeEditor(False), FakeEditor(True)])):
+            assert open_text_in_editor("Texto sem alterações.") == "Texto sem alterações."
+            assert get_editor().name == "fake-ok"
+    finally:
+        set_editor(None)
+    print("✓ Passou para o editor seguinte")
+
+def test_inline_editor_commands():
+    """Replace, append and finish without launching any editor process"""
+    print("\n=== Teste: Edição rápida no terminal ===")
+    commands = [
+        "empenho => esforço",
+        "+ Deve melhorar a organização.",
+        "não existe => nada",
+        "",
+    ]
+    with mock.patch("builtins.input", side_effect=commands), \
+         mock.patch.object(cli, "open_text_in_editor", side_effect=AssertionError("editor")):
+        result = edit_text_inline("Revela interesse e empenho nas atividades propostas.")
+    assert result == ("Revela interesse e esforço nas atividades propostas. "
+                      "Deve melhorar a organização.")
+    print("✓ Texto editado sem abrir editor")
+
+if __name__ == '__main__':
+    test_editor_env_is_honoured_and_cached()
+    test_failing_editor_falls_back()
+    test_inline_editor_commands()
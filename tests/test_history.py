@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for the edit history: every write_text()/replace_phrase() change is
+recorded in sinteses_history and undo_edit() reverts one entry.
+Works on the private copy of base.db that tests/conftest.py provides.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cli import (
+    CRITERIA_FIELDS,
+    connect_db,
+    fold_db,
+    get_database_path,
+    get_json_path,
+    list_history,
+    main,
+    migrate_db,
+    read_version,
+    replace_phrase,
+    sync_json_to_db,
+    undo_edit,
+    update_entry_in_json_and_db,
+    write_text,
+)
+
+CRITERIA = dict(zip(CRITERIA_FIELDS, ("F", 1, 1, 0, 1, 0, 1)))
+
+def _connect():
+    conn = connect_db(get_database_path())
+    migrate_db(conn)
+    return conn
+
+def test_edit_is_recorded_and_undone():
+    """One edit adds one history row; undo restores the old text"""
+    print("\n=== Teste: Histórico e desfazer ===")
+    os.environ["SINT_USER"] = "professora.teste"
+    conn = _connect()
+    original = read_version(conn, CRITERIA)[1]
+    with conn:
+        write_text(conn, CRITERIA, "Primeira revisão do texto.")
+    with conn:
+        write_text(conn, CRITERIA, "Segunda revisão do texto.")
+
+    entries = list_history(conn, "F110101")
+    assert [e[6] for e in entries] == ["Segunda revisão do texto.", "Primeira revisão do texto."]
+    assert entries[1][5] == original and entries[0][2] == "professora.teste"
+
+    # The first edit was overwritten since: refused unless forced
+    try:
+        undo_edit(conn, entries[1][0])
+        assert False, "undo aceite sobre texto alterado"
+    except ValueError:
+        pass
+    assert undo_edit(conn)[3] == "Primeira revisão do texto."
+    assert undo_edit(conn, entries[1][0])[3] == original
+    assert read_version(conn, CRITERIA)[1] == original
+    assert len(list_history(conn, "F110101")) == 4
+    conn.close()
+    del os.environ["SINT_USER"]
+    print("✓ Edições registadas e desfeitas")
+
+def test_templates_and_bulk_changes():
+    """Template edits, gender-only rows and phrase replacements are recorded too"""
+    print("\n=== Teste: Histórico de modelos e substituições ===")
+    conn = _connect()
+    fold_db(conn)
+    female = dict(zip(CRITERIA_FIELDS, ("F", 1, 1, 1, 1, 1, 1)))
+    texto = read_version(conn, female)[1]
+
+    with conn:
+        write_text(conn, female, texto + " Só para ela.", both_genders=False)
+    entry = list_history(conn, "F111111")[0]
+    assert entry[3] == "F111111" and entry[5] is None
+    undo_edit(conn)
+    assert read_version(conn, female)[1] == texto
+    assert read_version(conn, female)[0][0] == "templates"
+
+    with conn:
+        write_text(conn, female, texto.replace("A aluna", "A aluna sempre", 1), both_genders=True)
+    assert list_history(conn, "M111111")[0][3] == "*111111"
+
+    before = conn.execute("SELECT COUNT(*) FROM sinteses_history").fetchone()[0]
+    changes = replace_phrase(conn, "empenho não foi satisfatório", "empenho ficou aquém")
+    after = conn.execute("SELECT COUNT(*) FROM sinteses_history").fetchone()[0]
+    assert after - before == len(changes)
+    conn.close()
+    print("✓ Modelos e substituições no histórico")
+
+def test_undone_override_stays_undone_after_sync():
+    """Undoing a gender-only row journals the template text, so sync does not bring the row back"""
+    print("\n=== Teste: Desfazer e sincronizar ===")
+    db_path, json_path = get_database_path(), get_json_path()
+    os.remove(db_path)  # start from a base.db built from base.json
+    sync_json_to_db(json_path, db_path)
+    conn = connect_db(db_path)
+    fold_db(conn)
+    female = dict(zip(CRITERIA_FIELDS, ("F", 1, 1, 1, 1, 1, 1)))
+    texto = read_version(conn, female)[1]
+    conn.close()
+
+    assert update_entry_in_json_and_db(db_path, json_path, female, texto + " Só para ela.")
+    assert main(["undo"]) == 0
+    sync_json_to_db(json_path, db_path)
+    conn = connect_db(db_path)
+    version, restored = read_version(conn, female)
+    conn.close()
+    assert version[0] == "templates" and restored == texto
+    print("✓ Linha do género não reaparece")
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for targeted base.json edits through the append-only journal.
+Works on the private copies of base.json / base.db that tests/conftest.py provides.
+"""
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cli import (
+    CRITERIA_FIELDS,
+    get_database_path,
+    get_json_path,
+    get_json_journal_path,
+    update_entry_in_json_and_db,
+    load_json_entries,
+    compact_json_journal,
+    json_entry_criteria,
+    build_and_run_query,
+    read_json_journal,
+)
+
+CRITERIA = dict(zip(CRITERIA_FIELDS, ("M", 0, 1, 0, 1, 0, 1)))
+
+def _text_for(entries, criteria):
+    key = tuple(criteria[f] for f in CRITERIA_FIELDS)
+    return next(e["Texto"] for e in entries if json_entry_criteria(e) == key)
+
+def test_edit_appends_bounded_bytes():
+    """An edit leaves base.json untouched and appends one journal line"""
+    print("\n=== Teste: Edição via diário ===")
+    db_path, json_path = get_database_path(), get_json_path()
+    with open(json_path, "rb") as f:
+        original = f.read()
+
+    new_text = "Texto editado através do diário de edições."
+    assert update_entry_in_json_and_db(db_path, json_path, CRITERIA, new_text)
+
+    with open(json_path, "rb") as f:
+        assert f.read() == original, "base.json não deve ser reescrito"
+    journal_size = os.path.getsize(get_json_journal_path(json_path))
+    assert journal_size < 512, journal_size
+    assert _text_for(load_json_entries(json_path), CRITERIA) == new_text
+    assert build_and_run_query(db_path, *CRITERIA.values()) == new_text
+    print(f"✓ {journal_size} bytes escritos no diário")
+
+def test_torn_journal_and_compaction():
+    """A half-written last line is ignored; compaction folds edits into base.json"""
+    print("\n=== Teste: Diário truncado e compactação ===")
+    db_path, json_path = get_database_path(), get_json_path()
+    new_text = "Primeira edição que deve sobreviver."
+    assert update_entry_in_json_and_db(db_path, json_path, CRITERIA, new_text)
+    with open(get_json_journal_path(json_path), "ab") as f:
+        f.write(b'{"Genero": "F", "Texto": "incomple')
+
+    entries = load_json_entries(json_path)
+    assert _text_for(entries, CRITERIA) == new_text
+
+    # The next append starts on a fresh line instead of being glued to the fragment
+    new_text = "Edição feita depois da falha."
+    assert update_entry_in_json_and_db(db_path, json_path, CRITERIA, new_text)
+    assert [e["Texto"] for e in read_json_journal(json_path)][-1] == new_text
+    entries = load_json_entries(json_path)
+    assert _text_for(entries, CRITERIA) == new_text
+
+    os.chmod(json_path, 0o644)
+    assert compact_json_journal(json_path) == 2
+    assert not os.path.exists(get_json_journal_path(json_path))
+    if os.name == "posix":
+        assert os.stat(json_path).st_mode & 0o777 == 0o644, "permissões de base.json alteradas"
+    with open(json_path, "r", encoding="utf-8") as f:
+        compacted = json.load(f)
+    assert len(compacted) == len(entries)
+    assert _text_for(compacted, CRITERIA) == new_text
+    print("✓ Linha truncada ignorada e cortada no próximo registo, base.json compactado")
+
+def test_missing_entry_writes_nothing():
+    """An unknown combination fails without touching the journal"""
+    print("\n=== Teste: Entrada inexistente ===")
+    db_path, json_path = get_database_path(), get_json_path()
+    criteria = dict(CRITERIA, Genero="X")
+    assert not update_entry_in_json_and_db(db_path, json_path, criteria, "Texto que não deve ficar.")
+    assert not os.path.exists(get_json_journal_path(json_path))
+    # A write that fails in the DB (here: a stale version) leaves no journal line either
+    assert not update_entry_in_json_and_db(db_path, json_path, CRITERIA, "Texto que não deve ficar.",
+                                           expected=("sinteses", 0, -1))
+    assert not os.path.exists(get_json_journal_path(json_path))
+    print("✓ Nada escrito")
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, "-q"]))
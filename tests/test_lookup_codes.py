@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for compact criteria codes (F110101) and the scripted lookup interface.
+"""
+import io
+import json
+import os
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cli
+from cli import format_code, get_database_path, lookup_text, parse_code, run_lookup
+
+def test_parse_code():
+    """Codes follow CRITERIA_FIELDS order and round-trip"""
+    print("\n=== Teste: Códigos compactos ===")
+    assert parse_code("F110101") == ("F", 1, 1, 0, 1, 0, 1)
+    assert parse_code(" m000000\n") == ("M", 0, 0, 0, 0, 0, 0)
+    assert format_code(("F", 1, 1, 0, 1, 0, 1)) == "F110101"
+    for bad in ("F11010", "X110101", "F110102", ""):
+        try:
+            parse_code(bad)
+            assert False, f"aceitou {bad!r}"
+        except ValueError:
+            pass
+    print("✓ Códigos válidos e inválidos tratados")
+
+def test_lookup_keeps_order():
+    """One record per input code, in order, in every output format"""
+    print("\n=== Teste: Saída pela ordem de entrada ===")
+    db_path = get_database_path()
+    codes = ["F110101\n", "XYZ\n", "M000000\n"]
+    expected = [lookup_text(db_path, *parse_code(codes[0])), None, lookup_text(db_path, "M", 0, 0, 0, 0, 0, 0)]
+
+    out = io.StringIO()
+    with mock.patch("sys.stderr", io.StringIO()):
+        assert run_lookup(db_path, codes, out, "text") == (3, 1)
+    assert out.getvalue().split("\n") == [expected[0], "", expected[2], ""]
+
+    out = io.StringIO()
+    with mock.patch("sys.stderr", io.StringIO()):
+        run_lookup(db_path, codes, out, "nul")
+    assert out.getvalue().split("\0") == [expected[0], "", expected[2], ""]
+
+    out = io.StringIO()
+    run_lookup(db_path, codes, out, "jsonl")
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r["texto"] for r in records] == expected
+    assert [r["codigo"] for r in records] == ["F110101", "XYZ", "M000000"]
+    assert "erro" in records[1]
+    print("✓ Ordem e formatos corretos")
+
+def test_code_argument_dispatch():
+    """`sintese F110101` is routed to the lookup command"""
+    print("\n=== Teste: Código como argumento ===")
+    with mock.patch.object(cli, "run_lookup", return_value=(1, 0)) as run:
+        assert cli.main(["F110101"]) == 0
+    assert run.call_args[0][1] == ["F110101"]
+    print("✓ Código passado diretamente")
+
+if __name__ == "__main__":
+    test_parse_code()
+    test_lookup_keeps_order()
+    test_code_argument_dispatch()
+    print("\n✓ Todos os testes passaram")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for the packed 7-bit criteria code and the in-memory TextTable.
+"""
+import os
+import sys
+import sqlite3
+from itertools import product
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cli import (
+    TABLE_SIZE,
+    get_database_path,
+    UPSERT_VARIANT_SQL,
+    build_and_run_query,
+    fold_db,
+    migrate_db,
+    pack_criteria,
+    unpack_criteria,
+    get_text_table,
+    forget_text_table,
+    lookup_text,
+)
+
+ALL_COMBOS = list(product(['M', 'F'], [0, 1], [0, 1], [0, 1], [0, 1], [0, 1], [0, 1]))
+
+def test_pack_roundtrip():
+    """Every combination packs to a distinct code in [0, 128) and unpacks back"""
+    print("\n=== Teste: Código compacto de 7 bits ===")
+    codes = {pack_criteria(*c) for c in ALL_COMBOS}
+    assert codes == set(range(TABLE_SIZE))
+    for combo in ALL_COMBOS:
+        assert unpack_criteria(pack_criteria(*combo)) == combo
+    assert pack_criteria("F", 1, 1, 0, 1, 0, 1) == 0b1110101
+    print(f"✓ {len(codes)} códigos distintos")
+
+def test_table_matches_sql():
+    """The in-memory table returns exactly what the SQL path returns"""
+    print("\n=== Teste: Tabela em memória vs SQL ===")
+    db_path = get_database_path()
+    forget_text_table(db_path)
+    table = get_text_table(db_path)
+    for combo in ALL_COMBOS:
+        assert table.lookup(*combo) == build_and_run_query(db_path, *combo), combo
+    assert get_text_table(db_path) is table, "A tabela deve ser carregada uma só vez"
+    print("✓ 128 combinações coincidem")
+
+def test_folded_table_matches_sql():
+    """After fold the SQL path renders templates too, and prefers the lowest variant"""
+    print("\n=== Teste: Modelos, tabela em memória vs SQL ===")
+    db_path = get_database_path()
+    conn = sqlite3.connect(db_path)
+    migrate_db(conn)
+    assert fold_db(conn)["folded"]
+    with conn:
+        # A second variant on top of a template: variant 0 is still the rendering
+        conn.execute(UPSERT_VARIANT_SQL, ("Segunda variante, só para ela.", "F", 1, 1, 1, 1, 1, 1, 1))
+    conn.close()
+    table = get_text_table(db_path)
+    for combo in ALL_COMBOS:
+        assert table.lookup(*combo) == build_and_run_query(db_path, *combo), combo
+    assert build_and_run_query(db_path, "F", 1, 1, 1, 1, 1, 1).startswith("A aluna")
+    forget_text_table(db_path)
+    print("✓ 128 combinações coincidem depois de converter em modelos")
+
+def test_fallback_to_sql(tmp_path):
+    """An empty slot falls back to the SQL path"""
+    print("\n=== Teste: Fallback para SQL ===")
+    db_path = str(tmp_path / "base.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE sinteses (id INTEGER PRIMARY KEY, Texto TEXT, Genero TEXT, "
+        "Assiduidade INTEGER, Pontualidade INTEGER, Participacao INTEGER, "
+        "Interesse INTEGER, Empenho INTEGER, Dificuldades INTEGER)"
+    )
+    conn.commit()
+    assert lookup_text(db_path, "M", 1, 1, 1, 1, 1, 1) is None
+
+    conn.execute(
+        "INSERT INTO sinteses (Texto, Genero, Assiduidade, Pontualidade, Participacao, "
+        "Interesse, Empenho, Dificuldades) VALUES ('Texto tardio', 'M', 1, 1, 1, 1, 1, 1)"
+    )
+    conn.commit()
+    conn.close()
+    # The cached table is stale, the SQL fallback still finds the row
+    assert lookup_text(db_path, "M", 1, 1, 1, 1, 1, 1) == "Texto tardio"
+    forget_text_table(db_path)
+    print("✓ Fallback funciona")
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for progressive candidate narrowing: questions whose answers can no
+longer change the text are skipped.
+"""
+import os
+import sys
+import sqlite3
+from itertools import product
+from unittest import mock
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cli
+from cli import (
+    TextTable,
+    Session,
+    ask_criteria,
+    complete_criteria,
+    get_database_path,
+    handle_student,
+    migrate_db,
+    pack_criteria,
+)
+
+SHARED_TEXT = "O aluno é assíduo e pontual. Texto comum a estas combinações."
+
+def _shared_db(folder):
+    """Every M,1,1,* combination has the same text; all others are distinct."""
+    db_path = str(folder / "base.db")
+    conn = sqlite3.connect(db_path)
+    migrate_db(conn)
+    rows = []
+    for combo in product(['M', 'F'], [0, 1], [0, 1], [0, 1], [0, 1], [0, 1], [0, 1]):
+        texto = SHARED_TEXT if combo[:3] == ("M", 1, 1) else f"Texto {pack_criteria(*combo)}."
+        rows.append((texto,) + combo)
+    conn.executemany(cli.UPSERT_TEXT_SQL, rows)
+    conn.commit()
+    conn.close()
+    return db_path
+
+def test_candidates_are_contiguous():
+    """After n answers the candidates are the matching slice of the table"""
+    print("\n=== Teste: Candidatos por prefixo ===")
+    table = TextTable.load(get_database_path())
+    candidates = table.candidates(("F", 1))
+    assert len(candidates) == 32
+    assert candidates[0] == table.lookup("F", 1, 0, 0, 0, 0, 0)
+    assert candidates[-1] == table.lookup("F", 1, 1, 1, 1, 1, 1)
+    assert table.determined(("F", 1)) is None
+    assert table.determined(("F", 1, 1, 1, 1, 1, 1)) == table.lookup("F", 1, 1, 1, 1, 1, 1)
+    print("✓ Fatias corretas")
+
+def test_remaining_questions_skipped(tmp_path):
+    """Once the text is fixed, ask_criteria() stops asking"""
+    print("\n=== Teste: Perguntas dispensadas ===")
+    table = TextTable.load(_shared_db(tmp_path))
+    with mock.patch("builtins.input", side_effect=["M", "s", "s"]):
+        criteria = ask_criteria(table)
+    assert criteria == ("M", 1, 1, None, None, None, None)
+
+    with mock.patch("builtins.input", side_effect=["F", "s", "s", "n", "n", "n", "n"]):
+        assert ask_criteria(table) == ("F", 1, 1, 0, 0, 0, 0)
+    print("✓ 3 respostas em vez de 7")
+
+def test_skipped_questions_asked_before_editing(tmp_path):
+    """Editing after a short-cut asks the skipped questions to target one row"""
+    print("\n=== Teste: Edição após atalho ===")
+    with mock.patch("builtins.input", side_effect=["s", "n", "s", "n"]):
+        assert complete_criteria(("M", 1, 1, None, None, None, None)) == ("M", 1, 1, 1, 0, 1, 0)
+
+    session = Session(_shared_db(tmp_path), str(tmp_path / "base.json"))
+    try:
+        with mock.patch("builtins.input", side_effect=["M", "s", "s", "n"]), \
+             mock.patch.object(cli, "copy_to_clipboard", return_value=True) as copy:
+            handle_student(session)
+        copy.assert_called_once_with(SHARED_TEXT)
+        assert session.lookups == 1
+    finally:
+        session.close()
+        cli.forget_text_table(session.db_path)
+    print("✓ Texto copiado após 3 respostas")
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for the compiled text pack: build_pack() output read back through
+mmap, staleness checks against base.db and the fallback to SQLite.
+Works on the private copy of base.db that tests/conftest.py provides.
+"""
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cli
+from cli import (
+    CRITERIA_FIELDS,
+    TABLE_SIZE,
+    TextPack,
+    TextTable,
+    add_variant,
+    build_pack,
+    get_database_path,
+    get_json_path,
+    get_pack_path,
+    run_lookup,
+    unpack_criteria,
+    update_entry_in_db,
+)
+
+def test_pack_matches_table():
+    """Every text and variant read from the pack equals the SQLite table"""
+    print("\n=== Teste: Pacote compilado ===")
+    db_path = get_database_path()
+    add_variant(db_path, get_json_path(), ("F", 1, 1, 0, 1, 0, 1), "Uma segunda versão com acentuação: ç, ã, é.")
+    count, size = build_pack(db_path)
+    assert os.path.getsize(get_pack_path(db_path)) == size
+
+    table = TextTable.load(db_path)
+    pack = TextPack.open(db_path)
+    assert pack is not None
+    try:
+        for code in range(TABLE_SIZE):
+            assert pack.get(code) == table.slots[code]
+            assert pack.lookup(*unpack_criteria(code)) == table.slots[code]
+        code = cli.pack_criteria("F", 1, 1, 0, 1, 0, 1)
+        assert pack.texts(code) == list(table.variants[code])
+        assert count == TABLE_SIZE + 1
+    finally:
+        pack.close()
+    print(f"✓ {count} textos, {size} bytes")
+
+def test_stale_pack_falls_back():
+    """After an edit the pack is ignored and lookups read base.db"""
+    print("\n=== Teste: Pacote desatualizado ===")
+    db_path = get_database_path()
+    build_pack(db_path)
+
+    # Same content with a new mtime (e.g. a copy) is still current
+    os.utime(db_path, None)
+    pack = TextPack.open(db_path)
+    assert pack is not None
+    pack.close()
+
+    criteria = dict(zip(CRITERIA_FIELDS, ("M", 0, 0, 0, 0, 0, 0)))
+    assert update_entry_in_db(db_path, criteria, "Texto novo depois de compilar o pacote.")
+    assert TextPack.open(db_path) is None
+    cli.forget_text_table(db_path)
+    out = io.StringIO()
+    assert run_lookup(db_path, ["M000000"], out) == (1, 0)
+    assert out.getvalue() == "Texto novo depois de compilar o pacote.\n"
+
+    with open(get_pack_path(db_path), "r+b") as f:
+        f.write(b"XXXX")
+    assert TextPack.open(db_path) is None
+    with open(get_pack_path(db_path), "wb"):
+        pass
+    assert TextPack.open(db_path) is None
+    print("✓ Pacote ignorado quando não corresponde a base.db")
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
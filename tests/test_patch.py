@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for `sintese patch`: parsing patch lines, validating every entry and
+applying them in one transaction. Works on the private copy of base.db
+that tests/conftest.py provides.
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cli import (
+    TABLE_SIZE,
+    apply_patch,
+    connect_db,
+    fold_db,
+    forget_text_table,
+    format_code,
+    get_database_path,
+    get_json_path,
+    list_history,
+    lookup_text,
+    main,
+    migrate_db,
+    parse_patch_line,
+    read_json_journal,
+    read_patch,
+    unpack_criteria,
+)
+
+def _connect():
+    db_path = get_database_path()
+    conn = connect_db(db_path)
+    migrate_db(conn)
+    return db_path, conn
+
+def test_parse_patch_lines():
+    """Plain texts, variants, templates and sed-style substitutions"""
+    print("\n=== Teste: Linhas do patch ===")
+    assert parse_patch_line("   ") is None and parse_patch_line("# nota") is None
+    code, variante, edit = parse_patch_line("f110101[2] Texto novo para a variante.")
+    assert (code, variante, edit("antigo")) == ("F110101", 2, "Texto novo para a variante.")
+    code, _, edit = parse_patch_line("*110101 s/o empenho/a dedicação/g")
+    assert code == "*110101" and edit("o empenho e o empenho") == "a dedicação e a dedicação"
+    _, _, edit = parse_patch_line(r"M000000 s|a/b|c\|d|i")
+    assert edit("A/B a/b") == "c|d a/b"
+    try:
+        read_patch(["F110101 s/(/x/", "X123 texto", "F110101 s/a/b/z"])
+        assert False, "patch inválido aceite"
+    except ValueError as e:
+        assert [line.split(":")[0] for line in str(e).splitlines()] == ["linha 1", "linha 2", "linha 3"]
+    print("✓ Linhas interpretadas e erros agrupados")
+
+def test_apply_patch_all_or_nothing():
+    """One invalid result leaves every text as it was"""
+    print("\n=== Teste: Tudo ou nada ===")
+    db_path, conn = _connect()
+    before = lookup_text(db_path, "F", 1, 1, 0, 1, 0, 1)
+    edits = read_patch(["F110101 Um texto novo e suficientemente longo.", "M110101 curto"])
+    try:
+        apply_patch(conn, edits)
+        assert False, "texto curto aceite"
+    except ValueError as e:
+        assert "linha 2" in str(e)
+    assert conn.execute("SELECT COUNT(*) FROM sinteses WHERE Texto LIKE 'Um texto novo%'").fetchone()[0] == 0
+
+    # A dry run does not take the write lock: a colleague can write meanwhile
+    colleague = connect_db(db_path)
+    colleague.execute("BEGIN IMMEDIATE")
+    preview = apply_patch(conn, edits[:1], dry_run=True)
+    colleague.rollback()
+    colleague.close()
+    assert preview == [("F110101", 0, before, "Um texto novo e suficientemente longo.")]
+    assert apply_patch(conn, edits[:1]) == preview
+    assert len(list_history(conn, "F110101")) == 1
+    conn.close()
+    print("✓ Nada escrito com uma linha inválida")
+
+def test_template_codes():
+    """A gender code backed by a template changes that gender only; *code edits the template"""
+    print("\n=== Teste: Patch sobre modelos ===")
+    db_path, conn = _connect()
+    fold_db(conn)
+    male = lookup_text(db_path, "M", 1, 1, 1, 1, 1, 1)
+    changes = apply_patch(conn, read_patch(["F111111 s/A aluna é/A aluna é sempre criativa e/"]))
+    assert [c[0] for c in changes] == ["F111111"]
+    assert "sempre criativa" in changes[0][3] and "sempre" not in changes[0][2]
+    forget_text_table(db_path)
+    assert lookup_text(db_path, "F", 1, 1, 1, 1, 1, 1).startswith("A aluna é sempre criativa")
+    assert lookup_text(db_path, "M", 1, 1, 1, 1, 1, 1) == male
+    assert list_history(conn, "F111111")[0][5] is None  # undo removes the override row
+
+    changes = apply_patch(conn, read_patch(["*111111 s/ é / é sempre /"]))
+    assert [c[0] for c in changes] == ["*111111"]
+    forget_text_table(db_path)
+    assert lookup_text(db_path, "M", 1, 1, 1, 1, 1, 1).startswith("O aluno é sempre")
+    conn.close()
+    print("✓ Código de género altera só esse género, *código altera o modelo")
+
+def test_patch_is_journaled(tmp_path):
+    """Without --json the new texts still reach the base.json journal, so a later sync keeps them"""
+    print("\n=== Teste: Patch registado no diário ===")
+    patch_path = tmp_path / "alteracoes.txt"
+    patch_path.write_text("F110101 Um texto novo e suficientemente longo.\n", encoding="utf-8")
+    assert main(["patch", str(patch_path), "--yes"]) == 0
+    journaled = read_json_journal(get_json_path())
+    assert [e["Texto"] for e in journaled] == ["Um texto novo e suficientemente longo."]
+    print("✓ Alteração registada no diário de base.json")
+
+def test_full_patch_is_fast():
+    """A patch touching every combination applies in one quick transaction"""
+    print("\n=== Teste: Patch com 128 linhas ===")
+    db_path, conn = _connect()
+    lines = [f"{format_code(unpack_criteria(code))} s/$/ (revisto)/" for code in range(TABLE_SIZE)]
+    edits = read_patch(lines)
+    start = time.perf_counter()
+    changes = apply_patch(conn, edits)
+    elapsed = (time.perf_counter() - start) * 1000
+    assert len(changes) == TABLE_SIZE
+    assert conn.execute("SELECT COUNT(*) FROM sinteses WHERE Texto LIKE '% (revisto)'").fetchone()[0] == TABLE_SIZE
+    conn.close()
+    print(f"✓ {len(changes)} textos em {elapsed:.1f} ms")
+    assert elapsed < 1000
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for name/pronoun personalisation in the interactive flow and batch mode.
+"""
+import os
+import sys
+import tempfile
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cli
+from cli import (
+    Session,
+    compile_person_template,
+    depersonalize,
+    get_database_path,
+    get_json_path,
+    handle_student,
+    lookup_text,
+    personalize,
+    run_batch,
+)
+
+def test_personalize_forms():
+    """Name on first mention, pronoun afterwards, articles agree with the gender"""
+    print("\n=== Teste: Personalização ===")
+    texto = "A aluna é assídua. A aluna revela interesse e o esforço da aluna é visível."
+    assert personalize(texto, "Ana", "F") == "A Ana é assídua. Ela revela interesse e o esforço da Ana é visível."
+    assert personalize(texto, "Ana", "F", article=False) == "Ana é assídua. Ela revela interesse e o esforço de Ana é visível."
+    assert personalize("O aluno é pontual.", "Rui", "M") == "O Rui é pontual."
+    assert personalize(texto, "", "F") == texto
+    assert depersonalize(personalize(texto, "Ana", "F"), "Ana", "F").startswith("A aluna é assídua.")
+    assert compile_person_template(texto) is compile_person_template(texto)
+    print("✓ Nome, artigos e pronomes corretos")
+
+def test_interactive_uses_name_but_stores_generic_text():
+    """The session shows the name; an edit is saved without it"""
+    print("\n=== Teste: Nome no modo interativo ===")
+    db_path = get_database_path()
+    generic = lookup_text(db_path, "F", 1, 1, 0, 1, 0, 1)
+    session = Session(db_path, get_json_path(), ask_names=True)
+    try:
+        with mock.patch("builtins.input", side_effect=["Ana", "F", "s", "s", "n", "s", "n", "s", "n"]), \
+             mock.patch.object(cli, "copy_to_clipboard", return_value=True) as copy:
+            handle_student(session)
+        copy.assert_called_once_with(generic.replace("A aluna", "A Ana", 1))
+
+        edited = generic.replace("A aluna", "A Ana", 1) + " Bom trabalho."
+        with mock.patch("builtins.input", side_effect=["Ana", "F", "s", "s", "n", "s", "n", "s", "r", "= " + edited, "", "s"]), \
+             mock.patch.object(cli, "copy_to_clipboard", return_value=True), \
+             mock.patch.object(cli, "backup_db", return_value=True), \
+             mock.patch.object(session, "update", return_value=True) as update:
+            handle_student(session)
+        assert update.call_args[0][1] == generic + " Bom trabalho."
+    finally:
+        session.close()
+    print("✓ Nome mostrado, texto genérico guardado")
+
+def test_batch_personalizes_roster():
+    """Batch output carries each student's name; 1000 students stay fast"""
+    print("\n=== Teste: Nomes no modo de turma ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        roster = os.path.join(tmp, "turma.csv")
+        with open(roster, "w", encoding="utf-8") as f:
+            f.write("Nome;Genero;Assiduidade;Pontualidade;Participacao;Interesse;Empenho;Dificuldades\n")
+            for i in range(1000):
+                f.write(f"Aluno{i};{'MF'[i % 2]};s;n;s;n;s;n\n")
+        out = os.path.join(tmp, "sinteses.md")
+        start = time.perf_counter()
+        stats = run_batch(get_database_path(), roster, out, names=True)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with open(out, encoding="utf-8") as f:
+            content = f.read()
+    assert stats["alunos"] == 1000
+    assert "O Aluno0 é" in content and "A Aluno1 é" in content
+    assert "O aluno é" not in content
+    print(f"✓ 1000 alunos personalizados em {elapsed_ms:.1f} ms")
+
+if __name__ == "__main__":
+    test_personalize_forms()
+    test_interactive_uses_name_but_stores_generic_text()
+    test_batch_personalizes_roster()
+    print("\n✓ Todos os testes passaram")
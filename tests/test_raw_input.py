@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for the single-keypress question flow (read_key() is patched with
+key sequences, so no terminal is needed).
+"""
+import os
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cli
+from cli import QuitRequested, ask_criteria, interpret_key
+
+def _keys(*keys):
+    return mock.patch.object(cli, "read_key", side_effect=list(keys))
+
+def test_interpret_key():
+    """Keys map to answers and hotkeys depending on the question"""
+    print("\n=== Teste: Interpretação de teclas ===")
+    assert interpret_key("m", 0) == ("answer", "M")
+    assert interpret_key("F", 0) == ("answer", "F")
+    assert interpret_key("s", 0) == (None, None)
+    assert interpret_key("s", 3) == ("answer", 1)
+    assert interpret_key("N", 3) == ("answer", 0)
+    assert interpret_key("\x7f", 2) == ("back", None)
+    assert interpret_key("\x1b[D", 2) == ("back", None)
+    assert interpret_key("\x1b", 2) == ("quit", None)
+    assert interpret_key("r", 0) == ("repeat", None)
+    print("✓ Teclas corretas")
+
+def test_one_key_per_answer():
+    """Seven keypresses answer the seven questions; unknown keys are ignored"""
+    print("\n=== Teste: Uma tecla por resposta ===")
+    with _keys("x", "f", "s", "n", "s", "s", "n", "s"):
+        assert ask_criteria(raw=True) == ("F", 1, 0, 1, 1, 0, 1)
+    print("✓ 7 teclas, sem ENTER")
+
+def test_back_and_repeat():
+    """b goes back one question, r reuses the previous student's answers"""
+    print("\n=== Teste: Voltar e repetir ===")
+    with _keys("m", "s", "b", "n", "n", "n", "n", "n", "n"):
+        assert ask_criteria(raw=True) == ("M", 0, 0, 0, 0, 0, 0)
+
+    previous = ("F", 1, 1, 1, 1, 0, 0)
+    with _keys("r"):
+        assert ask_criteria(previous=previous, raw=True) == previous
+    with _keys("r", "m", "s", "s", "s", "s", "s", "s"):
+        assert ask_criteria(raw=True) == ("M", 1, 1, 1, 1, 1, 1)
+    print("✓ Voltar e repetir funcionam")
+
+def test_quit_hotkey():
+    """q raises QuitRequested and the session ends cleanly"""
+    print("\n=== Teste: Sair ===")
+    with _keys("m", "q"):
+        try:
+            ask_criteria(raw=True)
+            assert False, "esperava QuitRequested"
+        except QuitRequested:
+            pass
+
+    session = cli.Session(cli.get_database_path(), cli.get_json_path(), raw_keys=True)
+    with _keys(" ", "f", "\x1b"), mock.patch.object(session, "summary", return_value=""):
+        cli.run_session(session)
+    assert session.students == 0
+    print("✓ Sessão terminada sem erro")
+
+if __name__ == "__main__":
+    test_interpret_key()
+    test_one_key_per_answer()
+    test_back_and_repeat()
+    test_quit_hotkey()
+    print("\n✓ Todos os testes passaram")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for cached resource resolution (find_resource / `sintese --where`).
+Uses a temporary SINT_BASE_DIR and SINT_CACHE_DIR (via monkeypatch), with
+SINT_NO_CACHE cleared.
+"""
+import os
+import sys
+from unittest import mock
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cli
+from cli import resolve_resource, find_resource, main
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    """(base, cache) folders, with the resolver pointed at them and the cache enabled"""
+    base, cache = tmp_path / "found", tmp_path / "found_cache"
+    base.mkdir()
+    monkeypatch.setenv("SINT_BASE_DIR", str(base))
+    monkeypatch.setenv("SINT_CACHE_DIR", str(cache))
+    monkeypatch.delenv("SINT_NO_CACHE", raising=False)
+    cli._RESOLVED.clear()
+    yield str(base), str(cache)
+    cli._RESOLVED.clear()
+
+def _touch(folder, *names):
+    for name in names:
+        open(os.path.join(folder, name), "w").close()
+
+def test_cache_hit_needs_no_directory_listing(dirs):
+    """After one probe, a new process-level lookup is answered from the cache file"""
+    print("\n=== Teste: Cache de localização ===")
+    base, cache = dirs
+    _touch(base, "base.db", "base.json")
+    path, rule, source = resolve_resource("base.db")
+    assert (path, rule, source) == (os.path.join(base, "base.db"), "env", "probe")
+    assert os.path.exists(os.path.join(cache, "resources.cache"))
+
+    # Simulate a new start: memory cache gone, only the cache file remains
+    cli._RESOLVED.clear()
+    with mock.patch.object(cli.os, "listdir", side_effect=AssertionError("listdir")):
+        assert resolve_resource("base.json") == (os.path.join(base, "base.json"), "env", "cache")
+        assert resolve_resource("base.db")[2] == "cache"
+    print("✓ Segunda resolução só com cache")
+
+def test_stale_cache_is_reprobed(dirs):
+    """A cached path that disappeared triggers a fresh search"""
+    print("\n=== Teste: Cache desatualizada ===")
+    base, _ = dirs
+    _touch(base, "base.db")
+    assert find_resource("base.db") == os.path.join(base, "base.db")
+
+    os.remove(os.path.join(base, "base.db"))
+    cli._RESOLVED.clear()
+    path, rule, source = resolve_resource("base.db")
+    assert source == "probe" and rule != "env", (path, rule)
+    print("✓ Cache inválida ignorada")
+
+def test_where_command(dirs):
+    """`--where` reports the rule and the time taken"""
+    print("\n=== Teste: --where ===")
+    base, _ = dirs
+    _touch(base, "base.db", "base.json")
+    with mock.patch("builtins.print") as fake_print:
+        assert main(["--where"]) == 0
+    output = "\n".join(" ".join(str(a) for a in call.args) for call in fake_print.call_args_list)
+    assert os.path.join(base, "base.db") in output
+    assert "SINT_BASE_DIR" in output and " ms" in output
+    print("✓ Diagnóstico mostrado")
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for the versioned sinteses schema: in-place migration, deduplication
+and EXPLAIN QUERY PLAN checks that lookups and updates use the criteria index.
+"""
+import os
+import sys
+import sqlite3
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cli import (
+    SCHEMA_VERSION,
+    SELECT_TEXT_SQL,
+    UPDATE_TEXT_SQL,
+    migrate_db,
+    get_schema_version,
+)
+
+LEGACY_TABLE = (
+    "CREATE TABLE sinteses (id INTEGER PRIMARY KEY, Texto TEXT, Genero TEXT, "
+    "Assiduidade INTEGER, Pontualidade INTEGER, Participacao INTEGER, "
+    "Interesse INTEGER, Empenho INTEGER, Dificuldades INTEGER)"
+)
+INSERT = (
+    "INSERT INTO sinteses (Texto, Genero, Assiduidade, Pontualidade, Participacao, "
+    "Interesse, Empenho, Dificuldades) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+PARAMS = ("M", 1, 1, 1, 1, 1, 1)
+
+def _legacy_db(folder):
+    """An unversioned base.db as created by the old script run twice."""
+    db_path = os.path.join(folder, "base.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(LEGACY_TABLE)
+    for _ in range(2):
+        conn.execute(INSERT, ("Primeiro texto",) + PARAMS)
+        conn.execute(INSERT, ("Outro texto",) + ("F",) + PARAMS[1:])
+    conn.commit()
+    return conn
+
+def _plan(conn, sql, params):
+    return " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+def test_migration_deduplicates():
+    """Migrating a legacy DB keeps one row per combination and bumps user_version"""
+    print("\n=== Teste: Migração do esquema ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = _legacy_db(tmp)
+        assert get_schema_version(conn) == 0
+
+        result = migrate_db(conn)
+        assert result == {"from": 0, "to": SCHEMA_VERSION, "removed": 2}, result
+        assert conn.execute("SELECT COUNT(*) FROM sinteses").fetchone()[0] == 2
+
+        # Second run is a no-op
+        assert migrate_db(conn) == {"from": SCHEMA_VERSION, "to": SCHEMA_VERSION, "removed": 0}
+
+        try:
+            conn.execute(INSERT, ("Duplicado",) + PARAMS)
+            assert False, "Inserção duplicada devia falhar"
+        except sqlite3.IntegrityError:
+            pass
+        conn.close()
+    print("✓ Duplicados removidos e índice único criado")
+
+def test_query_plans_use_index():
+    """Lookups and updates search the unique criteria index instead of scanning"""
+    print("\n=== Teste: EXPLAIN QUERY PLAN ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = _legacy_db(tmp)
+        migrate_db(conn)
+
+        select_plan = _plan(conn, SELECT_TEXT_SQL, PARAMS)
+        update_plan = _plan(conn, UPDATE_TEXT_SQL, ("novo",) + PARAMS + (0,))
+        conn.close()
+
+    for label, plan in (("SELECT", select_plan), ("UPDATE", update_plan)):
+        print(f"  {label}: {plan}")
+        assert "INDEX idx_sinteses_criteria" in plan, plan
+        assert "SCAN" not in plan, plan
+    print("✓ Consultas e atualizações usam o índice")
+
+if __name__ == '__main__':
+    test_migration_deduplicates()
+    test_query_plans_use_index()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Tests for full-text search: the v5 FTS5 indexes kept in step by triggers,
+phrase search with snippets and the one-transaction phrase replacement.
+Works on the private copy of base.db that tests/conftest.py provides.
+"""
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cli import (
+    fold_db,
+    get_database_path,
+    has_fts,
+    lookup_text,
+    migrate_db,
+    replace_phrase,
+    replace_phrase_in,
+    replacement_edits,
+    search_texts,
+)
+
+PHRASE = "empenho não foi satisfatório"
+
+def test_triggers_keep_index_in_step():
+    """Inserts, updates and deletes on sinteses show up in the index at once"""
+    print("\n=== Teste: Índice FTS5 e gatilhos ===")
+    conn = sqlite3.connect(get_database_path())
+    migrate_db(conn)
+    assert has_fts(conn)
+    matches = search_texts(conn, PHRASE)
+    assert matches and all("[empenho não foi satisfatório]" in m[4].lower() for m in matches)
+    # Accents and case do not matter
+    assert len(search_texts(conn, "EMPENHO NAO FOI SATISFATORIO")) == len(matches)
+
+    row_id = matches[0][1]
+    with conn:
+        conn.execute("UPDATE sinteses SET Texto = 'Texto com palavra rara xilofone.' WHERE id = ?", (row_id,))
+    assert len(search_texts(conn, PHRASE)) == len(matches) - 1
+    assert [m[1] for m in search_texts(conn, "xilofone")] == [row_id]
+    with conn:
+        conn.execute("DELETE FROM sinteses WHERE id = ?", (row_id,))
+    assert search_texts(conn, "xilofone") == []
+    assert conn.execute("INSERT INTO sinteses_fts(sinteses_fts) VALUES ('integrity-check')")
+    conn.close()
+    print("✓ Índice acompanha as alterações")
+
+def test_templates_are_searched():
+    """Folded texts are found once, with '*' for both genders"""
+    print("\n=== Teste: Pesquisa em modelos ===")
+    conn = sqlite3.connect(get_database_path())
+    migrate_db(conn)
+    before = len(search_texts(conn, PHRASE))
+    folded = fold_db(conn)["folded"]
+    matches = search_texts(conn, PHRASE)
+    templates = [m for m in matches if m[0] == "templates"]
+    assert templates and all(m[2].startswith("*") for m in templates)
+    assert len(matches) + len(templates) == before, (folded, len(matches), before)
+    conn.close()
+    print(f"✓ {len(templates)} modelos encontrados")
+
+def test_inflected_words_in_templates():
+    """After fold, a word of one gender is found in the templates' renderings, with or without accents"""
+    print("\n=== Teste: Palavras flexionadas em modelos ===")
+    db_path = get_database_path()
+    conn = sqlite3.connect(db_path)
+    migrate_db(conn)
+    before = len(search_texts(conn, "assídua"))
+    fold_db(conn)
+    matches = search_texts(conn, "assídua")
+    assert len(matches) == before and all(m[2].startswith("F") for m in matches), matches
+    assert [m[1] for m in search_texts(conn, "assidua")] == [m[1] for m in matches]
+
+    changes = replace_phrase(conn, "assidua", "sempre presente")
+    assert len(changes) == before
+    assert search_texts(conn, "assídua") == []
+    conn.close()
+    male = lookup_text(db_path, "M", 1, 1, 1, 1, 1, 1)
+    assert "assíduo" in male and "sempre presente" not in male
+    assert "sempre presente" in lookup_text(db_path, "F", 1, 1, 1, 1, 1, 1)
+    print(f"✓ {before} textos encontrados e alterados depois de converter em modelos")
+
+def test_replace_phrase_in_one_transaction():
+    """Every match is rewritten at once; an invalid result changes nothing"""
+    print("\n=== Teste: Substituir frase ===")
+    assert replace_phrase_in("O empenho foi bom. o empenho", "o empenho", "a dedicação") == \
+        "A dedicação foi bom. a dedicação"
+    assert replace_phrase_in("Assídua e assíduo; desempenho.", "assidua", "pontual") == "Pontual e assíduo; desempenho."
+    assert replace_phrase_in("O desempenho e o empenho.", "empenho", "esforço") == "O desempenho e o esforço."
+    db_path = get_database_path()
+    conn = sqlite3.connect(db_path)
+    migrate_db(conn)
+    count = len(search_texts(conn, PHRASE))
+
+    preview = replace_phrase(conn, PHRASE, "empenho ficou aquém", dry_run=True)
+    assert len(preview) == count
+    assert len(search_texts(conn, PHRASE)) == count
+
+    try:
+        replace_phrase(conn, search_texts(conn, PHRASE)[0][5], "")
+        assert False, "texto vazio aceite"
+    except ValueError:
+        pass
+    assert len(search_texts(conn, PHRASE)) == count
+
+    changes = replace_phrase(conn, PHRASE, "empenho ficou aquém")
+    assert len(changes) == count
+    assert search_texts(conn, PHRASE) == []
+    assert len(search_texts(conn, "empenho ficou aquém")) == count
+    conn.close()
+
+    code = changes[0][0]
+    criteria = (code[0],) + tuple(int(c) for c in code[1:])
+    assert "empenho ficou aquém" in lookup_text(db_path, *criteria)
+    edits = replacement_edits(changes)
+    assert len(edits) == count and edits[0][1] == changes[0][3]
+    print(f"✓ {count} textos alterados numa transação")
+
+def test_scan_without_fts():
+    """Without the FTS5 tables the texts are scanned for the phrase"""
+    print("\n=== Teste: Pesquisa sem FTS5 ===")
+    conn = sqlite3.connect(get_database_path())
+    migrate_db(conn)
+    expected = {m[1] for m in search_texts(conn, PHRASE)}
+    conn.execute("DROP TABLE sinteses_fts")
+    assert not has_fts(conn)
+    matches = search_texts(conn, PHRASE)
+    assert {m[1] for m in matches} == expected
+    assert all("[empenho não foi satisfatório]" in m[4].lower() for m in matches)
+    conn.close()
+    print("✓ Mesmo resultado sem índice")
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent interactive session (`sintese session`).
+Runs against the private copy of base.db that tests/conftest.py provides, so
+edits never touch the real one.
+"""
+import os
+import sys
+import sqlite3
+from unittest import mock
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cli
+from cli import Session, run_session, get_database_path, get_json_path, build_and_run_query
+
+def test_session_reuses_one_connection():
+    """Several students in one session open the database only once"""
+    print("\n=== Teste: Sessão com uma só ligação ===")
+    db_path = get_database_path()
+    inputs = [
+        "",  "M", "s", "s", "s", "s", "s", "s", "n",   # aluno 1, sem edição
+        "",  "F", "n", "n", "n", "n", "n", "n", "n",   # aluno 2, sem edição
+        "q",
+    ]
+    real_connect = sqlite3.connect
+    with mock.patch("builtins.input", side_effect=inputs), \
+         mock.patch.object(cli, "copy_to_clipboard", return_value=True), \
+         mock.patch.object(sqlite3, "connect", side_effect=real_connect) as connect:
+        session = Session(db_path, get_json_path())
+        run_session(session)
+
+    assert connect.call_count == 1, f"{connect.call_count} ligações abertas"
+    assert session.students == 2 and session.lookups == 2
+    assert "2 alunos, 2 consultas" in session.summary()
+    print(f"✓ {session.summary()}")
+
+def test_session_update():
+    """Session.update writes through the session connection and refreshes lookups"""
+    print("\n=== Teste: Edição dentro da sessão ===")
+    db_path = get_database_path()
+    session = Session(db_path, get_json_path())
+    criteria = dict(zip(cli.CRITERIA_FIELDS, ("F", 1, 0, 1, 0, 1, 0)))
+    new_text = "Texto editado durante a sessão de teste."
+    try:
+        assert session.lookup("F", 1, 0, 1, 0, 1, 0) != new_text
+        assert session.update(criteria, new_text)
+        assert session.lookup("F", 1, 0, 1, 0, 1, 0) == new_text
+    finally:
+        session.close()
+    assert build_and_run_query(db_path, "F", 1, 0, 1, 0, 1, 0) == new_text
+    print("✓ Edição guardada e visível na sessão")
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, "-q"]))
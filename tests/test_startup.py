@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Startup budget for cli.py: a plain launch must not import modules that only
+the editing, batch, sync or backup paths need, and must reach the first
+prompt quickly. See scripts/bench_startup.py for the full report.
+"""
+import os
+import sys
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(project_dir, "scripts"))
+
+from bench_startup import import_times, time_to_first_prompt
+
+# Generous enough for slow CI machines; a typical run is several times faster.
+IMPORT_BUDGET_MS = 150
+FIRST_PROMPT_BUDGET_MS = 1500
+
+LAZY_MODULES = (
+    "json", "subprocess", "tempfile", "platform", "shutil", "csv",
+    "unicodedata", "hashlib", "gzip", "argparse", "tkinter", "pyperclip",
+    "socket", "socketserver", "sqlite3", "mmap",
+)
+
+def test_lazy_imports():
+    """`import cli` pulls in none of the modules reserved for other code paths"""
+    print("\n=== Teste: Importações diferidas ===")
+    baseline = import_times("pass")
+    times = import_times()
+    eager = [m for m in LAZY_MODULES if m in times and m not in baseline]
+    assert not eager, f"Importados no arranque: {eager}"
+
+    import_ms = times["cli"][1] / 1000
+    print(f"✓ import cli: {import_ms:.1f} ms")
+    assert import_ms < IMPORT_BUDGET_MS, import_ms
+
+def test_time_to_first_prompt():
+    """Launching cli.py shows the first prompt within the budget"""
+    print("\n=== Teste: Tempo até ao primeiro prompt ===")
+    elapsed_ms = min(time_to_first_prompt() for _ in range(3)) * 1000
+    print(f"✓ {elapsed_ms:.1f} ms até ao primeiro prompt")
+    assert elapsed_ms < FIRST_PROMPT_BUDGET_MS, elapsed_ms
+
+if __name__ == '__main__':
+    test_lazy_imports()
+    test_time_to_first_prompt()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental base.json → base.db sync (`sintese sync`).
+Works on the private copies that tests/conftest.py provides, or on fresh
+files under pytest's tmp_path.
+"""
+import os
+import sys
+import json
+import sqlite3
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cli import (
+    CRITERIA_FIELDS,
+    append_json_edits,
+    connect_db,
+    get_database_path,
+    get_json_path,
+    json_entry_criteria,
+    list_history,
+    migrate_db,
+    parse_code,
+    read_version,
+    sync_json_to_db,
+    write_text,
+)
+
+def _write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+def _load_project_json():
+    with open(get_json_path(), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def test_sync_counts(tmp_path):
+    """First sync inserts everything; edits, additions and removals are counted"""
+    print("\n=== Teste: Sincronização incremental ===")
+    data = _load_project_json()
+    json_path = str(tmp_path / "base.json")
+    db_path = str(tmp_path / "base.db")
+
+    _write_json(json_path, data)
+    counts = sync_json_to_db(json_path, db_path)
+    assert counts == {"inserted": len(data), "updated": 0, "unchanged": 0, "deleted": 0, "kept": 0}, counts
+
+    # Unchanged file: nothing written
+    counts = sync_json_to_db(json_path, db_path)
+    assert counts == {"inserted": 0, "updated": 0, "unchanged": len(data), "deleted": 0, "kept": 0}, counts
+
+    # Edit one text, drop another entry
+    edited = data[0]
+    removed = data[1]
+    new_data = [dict(edited, Texto="Texto alterado na sincronização.")] + data[2:]
+    _write_json(json_path, new_data)
+    counts = sync_json_to_db(json_path, db_path)
+    assert counts == {"inserted": 0, "updated": 1, "unchanged": len(data) - 2, "deleted": 1, "kept": 0}, counts
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT COUNT(*) FROM sinteses").fetchone()[0]
+    texto = conn.execute(
+        "SELECT Texto FROM sinteses WHERE Genero = ? AND Assiduidade = ? AND Pontualidade = ? "
+        "AND Participacao = ? AND Interesse = ? AND Empenho = ? AND Dificuldades = ?",
+        json_entry_criteria(edited),
+    ).fetchone()[0]
+    conn.close()
+    assert rows == len(data) - 1
+    assert texto == "Texto alterado na sincronização."
+
+    # Put the removed entry back, keeping the DB rows that are missing otherwise
+    _write_json(json_path, [removed])
+    counts = sync_json_to_db(json_path, db_path, prune=False)
+    assert counts == {"inserted": 1, "updated": 0, "unchanged": len(data) - 1, "deleted": 0, "kept": 0}, counts
+    print("✓ Contagens corretas")
+
+def _criteria(code):
+    return dict(zip(CRITERIA_FIELDS, parse_code(code)))
+
+def test_db_edits_survive_sync():
+    """A text edited in base.db is not put back by a later sync of an older base.json"""
+    print("\n=== Teste: Edições em base.db sobrevivem à sincronização ===")
+    json_path = get_json_path()
+    db_path = get_database_path()
+
+    # Never synced, the edit history tells which texts were changed in
+    # base.db; afterwards the texts recorded by the last sync do
+    for synced_before in (False, True):
+        if synced_before:
+            sync_json_to_db(json_path, db_path)
+        mine = f"Edição feita na base de dados ({synced_before})."
+        conn = connect_db(db_path)
+        migrate_db(conn)
+        with conn:
+            write_text(conn, _criteria("F110101"), mine)
+        conn.close()
+        theirs = f"Edição feita no base.json por outro comando ({synced_before})."
+        append_json_edits(json_path, [(_criteria("M110101"), theirs)])
+
+        counts = sync_json_to_db(json_path, db_path)
+        assert counts["kept"] == 1 and counts["updated"] >= 1, counts
+        conn = connect_db(db_path)
+        assert read_version(conn, _criteria("F110101"))[1] == mine
+        assert read_version(conn, _criteria("M110101"))[1] == theirs
+        assert list_history(conn, "M110101", limit=1)[0][6] == theirs
+        conn.close()
+    print("✓ Texto editado em base.db mantido; alteração do base.json aplicada e registada")
+
+def test_unchanged_sync_is_fast(tmp_path):
+    """Re-syncing an unchanged file does no parsing and finishes in milliseconds"""
+    print("\n=== Teste: Sincronização sem alterações ===")
+    data = _load_project_json()
+    json_path = str(tmp_path / "base.json")
+    db_path = str(tmp_path / "base.db")
+    # Pad the file so parsing it would be noticeable
+    _write_json(json_path, data * 400)
+    sync_json_to_db(json_path, db_path)
+
+    start = time.perf_counter()
+    counts = sync_json_to_db(json_path, db_path)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    assert counts["inserted"] == counts["updated"] == counts["deleted"] == 0
+    print(f"✓ {len(data) * 400} entradas verificadas em {elapsed_ms:.1f} ms")
+    assert elapsed_ms < 500, elapsed_ms
+
+def test_missing_json(tmp_path):
+    """Without base.json the sync fails clearly and creates no database"""
+    print("\n=== Teste: base.json em falta ===")
+    db_path = str(tmp_path / "base.db")
+    try:
+        sync_json_to_db(str(tmp_path / "base.json"), db_path)
+        assert False, "sincronização sem base.json"
+    except FileNotFoundError:
+        pass
+    assert not os.path.exists(db_path)
+    print("✓ FileNotFoundError")
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, "-q"]))
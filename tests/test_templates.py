@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for gender templates: folding M/F pairs, rendering, carrying an edit
+over to the template, and sync with folded rows. Works on the private copies
+of the data that tests/conftest.py provides.
+"""
+import os
+import sqlite3
+import sys
+from itertools import product
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cli import (
+    CRITERIA_FIELDS,
+    Session,
+    UnknownGenderWords,
+    fold_db,
+    fold_pair,
+    forget_text_table,
+    get_database_path,
+    get_json_path,
+    lookup_text,
+    render_template,
+    retemplate,
+    sync_json_to_db,
+)
+
+M_TEXT = "O aluno é assíduo e pontual. Revela interesse."
+F_TEXT = "A aluna é assídua e pontual. Revela interesse."
+FLAGS = (1, 1, 0, 1, 0, 1)
+
+def _folded_base():
+    db_path = get_database_path()
+    json_path = get_json_path()
+    sync_json_to_db(json_path, db_path)
+    conn = sqlite3.connect(db_path)
+    report = fold_db(conn)
+    conn.close()
+    forget_text_table(db_path)
+    return db_path, json_path, report
+
+def test_fold_and_render():
+    """A clean pair folds into one template that renders back to both texts"""
+    print("\n=== Teste: Modelos de género ===")
+    template, reason = fold_pair(M_TEXT, F_TEXT)
+    assert template == "{O|A} alun{o|a} é assídu{o|a} e pontual. Revela interesse.", template
+    assert reason is None
+    assert render_template(template, "M") == M_TEXT
+    assert render_template(template, "F") == F_TEXT
+
+    assert fold_pair(M_TEXT, F_TEXT.replace("interesse", "empenho"))[0] is None
+    assert fold_pair(M_TEXT, F_TEXT + " Mais.")[0] is None
+
+    edited = retemplate(template, "F", "A aluna é muito assídua e pontual. Revela interesse.")
+    assert render_template(edited, "M") == "O aluno é muito assíduo e pontual. Revela interesse."
+
+    # A new inflected word with no known masculine form is not copied into the M text
+    try:
+        retemplate(template, "F", F_TEXT.replace("pontual", "pontual e criativa"))
+        assert False, "palavra sem forma masculina aceite"
+    except UnknownGenderWords as e:
+        assert e.words == ["criativa"]
+    print("✓ Modelo e edição nos dois géneros")
+
+def test_fold_db_reports_and_keeps_lookups():
+    """Folding halves the rows, reports drifting pairs and keeps every lookup"""
+    print("\n=== Teste: Conversão de base.db ===")
+    db_path = get_database_path()
+    before = {combo: lookup_text(db_path, *combo) for combo in _all_combos()}
+    forget_text_table(db_path)
+
+    conn = sqlite3.connect(db_path)
+    report = fold_db(conn)
+    templates = conn.execute("SELECT COUNT(*) FROM templates").fetchone()[0]
+    rows = conn.execute("SELECT COUNT(*) FROM sinteses").fetchone()[0]
+    conn.close()
+    forget_text_table(db_path)
+
+    assert templates == report["folded"] and rows == 2 * len(report["unfolded"])
+    assert {combo: lookup_text(db_path, *combo) for combo in _all_combos()} == before
+    print(f"✓ {report['folded']} modelos, {len(report['unfolded'])} pares por juntar")
+
+def test_one_edit_updates_both_genders():
+    """An edit of a folded text is one write that changes both renderings"""
+    print("\n=== Teste: Edição nos dois géneros ===")
+    db_path, json_path, report = _folded_base()
+    session = Session(db_path, json_path)
+    try:
+        criteria = dict(zip(CRITERIA_FIELDS, ("F",) + FLAGS))
+        novo = session.lookup("F", *FLAGS).replace("A aluna é", "A aluna é muito")
+        preview = session.other_gender_preview(criteria, novo)
+        assert preview.startswith("O aluno é muito assíduo")
+        assert session.update(criteria, novo)
+        assert session.lookup("M", *FLAGS) == preview
+
+        only_f = novo + " Só para a aluna."
+        assert session.update(criteria, only_f, both_genders=False)
+        assert session.lookup("F", *FLAGS) == only_f
+        assert session.lookup("M", *FLAGS) == preview
+
+        # Unknown inflected words keep the edit to this gender even when both were asked for
+        creative = only_f + " É criativa."
+        assert session.update(criteria, creative)
+        assert session.flush_edits()
+        forget_text_table(db_path)
+        assert lookup_text(db_path, "F", *FLAGS) == creative
+        assert lookup_text(db_path, "M", *FLAGS) == preview
+    finally:
+        session.close()
+
+    counts = sync_json_to_db(json_path, db_path)
+    assert counts["inserted"] == 0 and counts["deleted"] == 0, counts
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM templates").fetchone()[0] == report["folded"]
+    conn.close()
+    print("✓ Uma escrita, dois géneros")
+
+def _all_combos():
+    return list(product(["M", "F"], *[[0, 1]] * 6))
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
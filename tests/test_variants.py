@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for text variants: the v3 schema, the non-repeating rotation and its
+use in sessions and batch mode. Works on the private copy of base.db that
+tests/conftest.py provides.
+"""
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cli
+from cli import (
+    Session,
+    TextTable,
+    VariantRotation,
+    add_variant,
+    get_database_path,
+    get_json_path,
+    list_variants,
+    pack_criteria,
+    run_batch,
+)
+
+CRITERIA = ("F", 1, 1, 0, 1, 0, 1)
+EXTRA = ["Segunda versão do texto para esta aluna.", "Terceira versão do texto para esta aluna."]
+
+def _variant_db():
+    db_path = get_database_path()
+    json_path = get_json_path()
+    for texto in EXTRA:
+        add_variant(db_path, json_path, CRITERIA, texto)
+    return db_path, json_path
+
+def test_rotation_never_repeats_within_a_round():
+    """Every variant is handed out once before any repeats, even with hundreds"""
+    print("\n=== Teste: Rotação sem repetições ===")
+    rotation = VariantRotation()
+    for count in (1, 3, 64, 300):
+        picks = [rotation.pick(count, count) for _ in range(count)]
+        assert sorted(picks) == list(range(count))
+        assert rotation.pick(count, count) == 0  # new round
+    print("✓ Cada variante uma vez por ronda")
+
+def test_variants_schema_and_table():
+    """Variants are stored per (criteria, Variante) and loaded into the table"""
+    print("\n=== Teste: Esquema com variantes ===")
+    db_path, json_path = _variant_db()
+    variants = list_variants(db_path, CRITERIA)
+    assert [v for v, _ in variants] == [0, 1, 2]
+    assert [t for _, t in variants[1:]] == EXTRA
+
+    conn = sqlite3.connect(db_path)
+    plan = " ".join(r[-1] for r in conn.execute(
+        "EXPLAIN QUERY PLAN " + cli.UPDATE_TEXT_SQL, ("x",) + CRITERIA + (2,)))
+    conn.close()
+    assert "idx_sinteses_criteria" in plan, plan
+
+    table = TextTable.load(db_path)
+    code = pack_criteria(*CRITERIA)
+    assert table.slots[code] == variants[0][1]
+    assert len(table.variants[code]) == 3
+    assert table.determined(CRITERIA[:6]) is None
+    with open(json_path + ".journal", encoding="utf-8") as f:
+        assert f.read().count('"Variante"') == 2
+    print("✓ 3 variantes guardadas e carregadas")
+
+def test_session_and_batch_rotate(tmp_path):
+    """Students with the same profile get different variants until all are used"""
+    print("\n=== Teste: Rotação em sessão e turma ===")
+    db_path, json_path = _variant_db()
+    cli.forget_text_table(db_path)
+    session = Session(db_path, json_path)
+    try:
+        texts = [session.lookup(*CRITERIA) for _ in range(4)]
+        assert len(set(texts[:3])) == 3 and texts[3] == texts[0]
+
+        session.lookup(*CRITERIA)  # variant 1 of the second round
+        assert session.last_variant == 1
+        criteria = dict(zip(cli.CRITERIA_FIELDS, CRITERIA), Variante=1)
+        assert session.update(criteria, "Versão editada da segunda variante.")
+        session.flush_edits()
+        assert list_variants(db_path, CRITERIA)[1][1] == "Versão editada da segunda variante."
+        assert list_variants(db_path, CRITERIA)[0][1] == texts[0]
+    finally:
+        session.close()
+
+    roster = str(tmp_path / "turma.csv")
+    with open(roster, "w", encoding="utf-8") as f:
+        f.write("Nome;Genero;Assiduidade;Pontualidade;Participacao;Interesse;Empenho;Dificuldades\n")
+        for i in range(3):
+            f.write(f"Aluna {i};F;s;s;n;s;n;s\n")
+    out = str(tmp_path / "sinteses.md")
+    stats = run_batch(db_path, roster, out)
+    with open(out, encoding="utf-8") as f:
+        paragraphs = [p for p in f.read().split("\n\n") if p and not p.startswith("## ")]
+    assert stats["alunos"] == 3 and stats["combinacoes"] == 1
+    assert len(set(paragraphs)) == 3
+    print("✓ Textos diferentes para o mesmo perfil")
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tests for the write-behind edit queue: session edits are journaled to
+base.db.pending, committed together in one transaction and replayed after a
+crash. Runs against the private copy of base.db that tests/conftest.py
+provides.
+"""
+import os
+import shutil
+
+import sys
+
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cli
+from cli import (
+    CRITERIA_FIELDS,
+    EditQueue,
+    Session,
+    connect_db,
+    fold_db,
+    get_database_path,
+    get_json_path,
+    get_pending_edits_path,
+    migrate_db,
+    read_version,
+    write_text,
+)
+
+def _criteria(code):
+    return dict(zip(CRITERIA_FIELDS, cli.parse_code(code)))
+
+def _stored(db_path, code):
+    conn = connect_db(db_path)
+    try:
+        return read_version(conn, _criteria(code))[1]
+    finally:
+        conn.close()
+
+def test_edits_are_batched():
+    """Edits wait in the journal and are committed together at the threshold"""
+    print("\n=== Teste: Edições em lote ===")
+    db_path = get_database_path()
+    os.environ["SINT_FLUSH_EDITS"] = "3"
+    try:
+        session = Session(db_path, get_json_path())
+    finally:
+        del os.environ["SINT_FLUSH_EDITS"]
+    try:
+        codes = ["F110101", "M110101", "F000000"]
+        for i, code in enumerate(codes[:2]):
+            assert session.update(_criteria(code), f"Texto {i} editado durante a sessão.")
+        assert os.path.exists(get_pending_edits_path(db_path))
+        assert _stored(db_path, "F110101") != "Texto 0 editado durante a sessão."
+        assert session.lookup(*cli.parse_code("F110101")) == "Texto 0 editado durante a sessão."
+        assert "2 pendentes" in session.summary()
+
+        assert session.update(_criteria(codes[2]), "Texto 2 editado durante a sessão.")
+        assert not os.path.exists(get_pending_edits_path(db_path))
+        assert [_stored(db_path, c) for c in codes] == [
+            f"Texto {i} editado durante a sessão." for i in range(3)]
+        assert session.edits.flushes == 1 and "3 gravadas em 1 transações" in session.summary()
+        # The committed renderings reach the base.json journal too, so a later sync keeps them
+        journaled = cli.read_json_journal(get_json_path())
+        assert {e["Texto"] for e in journaled} >= {f"Texto {i} editado durante a sessão." for i in range(3)}
+    finally:
+        session.close()
+        cli.forget_text_table(db_path)
+    print("✓ 3 edições, 1 transação")
+
+def test_crash_recovery():
+    """A journal left by a crash is applied on the next start, once"""
+    print("\n=== Teste: Recuperação após falha ===")
+    db_path = get_database_path()
+    session = Session(db_path, get_json_path())
+    session.update(_criteria("F111111"), "Texto que sobreviveu à falha.")
+    session.conn.close()  # the process dies: no flush
+    cli.forget_text_table(db_path)
+
+    # Crash after the commit but before the journal was removed: not a conflict
+    journal = get_pending_edits_path(db_path)
+    shutil.copy(journal, journal + ".copia")
+    queue = EditQueue(db_path)
+    assert queue.recovered == 1
+    conn = connect_db(db_path)
+    assert queue.flush(conn) == ([(_criteria("F111111"), "Texto que sobreviveu à falha.")], [])
+    conn.close()
+    shutil.move(journal + ".copia", journal)
+
+    # A torn last line does not swallow the next edit appended after it
+    with open(journal, "ab") as f:
+        f.write(b'{"criteria": {"Genero": "F", "Assid')
+    EditQueue(db_path).add(_criteria("M000000"), "Edição feita depois da falha.")
+    assert EditQueue(db_path).recovered == 2
+
+    session = Session(db_path, get_json_path())
+    try:
+        assert session.edits.flushed == 2 and not os.path.exists(journal)
+        assert _stored(db_path, "F111111") == "Texto que sobreviveu à falha."
+        assert _stored(db_path, "M000000") == "Edição feita depois da falha."
+    finally:
+        session.close()
+        cli.forget_text_table(db_path)
+    print("✓ Diário reaplicado sem conflitos")
+
+def test_conflicts_and_chained_edits():
+    """A colleague's change wins over a queued edit; edits of one template chain"""
+    print("\n=== Teste: Conflitos no lote ===")
+    db_path = get_database_path()
+    conn = connect_db(db_path)
+    migrate_db(conn)
+    fold_db(conn)
+    queue = EditQueue(db_path)
+    for code, text in (("F111111", "Primeira edição da aluna, no modelo."),
+                       ("M111111", "Segunda edição, agora do aluno."),
+                       ("F110101", "Edição que vai colidir com a colega.")):
+        queue.add(_criteria(code), text, True, read_version(conn, _criteria(code))[0])
+    colleague = connect_db(db_path)
+    with colleague:
+        write_text(colleague, _criteria("F110101"), "Texto da colega.")
+    colleague.close()
+
+    written, conflicts = queue.flush(conn)
+    assert [(c["Genero"], mine, theirs) for c, mine, theirs in conflicts] == [
+        ("F", "Edição que vai colidir com a colega.", "Texto da colega.")]
+    assert read_version(conn, _criteria("M111111"))[1] == "Segunda edição, agora do aluno."
+    assert read_version(conn, _criteria("F110101"))[1] == "Texto da colega."
+    assert queue.flushed == 2
+    assert [text for _, text, _, _ in queue.pending] == ["Edição que vai colidir com a colega."]
+    assert "Edição que vai colidir" in open(queue.path, encoding="utf-8").read()
+
+    # Undecided conflicts survive a restart; choosing to overwrite writes them
+    queue = EditQueue(db_path)
+    assert len(queue) == 1
+    queue.flush(conn)
+    queue.resolve(lambda criteria, mine: True)
+    assert queue.flush(conn)[1] == []
+    assert read_version(conn, _criteria("F110101"))[1] == "Edição que vai colidir com a colega."
+    assert not os.path.exists(queue.path)
+    conn.close()
+    print("✓ Conflito comunicado e guardado até ser resolvido, restantes gravadas")
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))